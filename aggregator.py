@@ -1,37 +1,182 @@
 import asyncio
 import logging
-from collections import defaultdict
+from collections import Counter, OrderedDict, defaultdict, deque
+from dataclasses import dataclass, field
 from typing import Callable, Awaitable
 
+from clock import Clock
+
 logger = logging.getLogger(__name__)
 
 
+# How long a completed order id is remembered, so fills that arrive after
+# their order update still flush on the short completion grace.
+COMPLETED_ORDERS_LIMIT = 10_000
+
+
+# Adaptive windows: the gaps between a wallet's consecutive fills that are
+# short enough to belong to one execution are kept per wallet (or per wallet
+# and coin), and the window is a margin over their 90th percentile. An order
+# that filled in one piece adds a zero gap, so wallets that mostly trade in
+# clean single fills converge on min_sec while slow executors grow towards
+# max_sec.
+ADAPTIVE_SAMPLES = 64
+ADAPTIVE_MIN_SAMPLES = 5
+ADAPTIVE_QUANTILE = 0.9
+ADAPTIVE_MARGIN = 1.5
+
+
+class WindowLearner:
+    def __init__(
+        self,
+        default_sec: float,
+        min_sec: float = 0.5,
+        max_sec: float = 8.0,
+        per_coin: bool = False,
+    ):
+        self.default_sec = default_sec
+        self.min_sec = min_sec
+        self.max_sec = max_sec
+        self.per_coin = per_coin
+        self._gaps: dict[tuple, deque] = {}
+        self._last_fill: dict[tuple, float] = {}
+        self._burst: dict[tuple, int] = {}
+        self._windows: dict[tuple, float] = {}
+
+    def _key(self, wallet: str, coin: str) -> tuple:
+        return (wallet, coin if self.per_coin else None)
+
+    def observe(self, wallet: str, coin: str, now: float) -> float:
+        # Records a fill arriving at `now` and returns the window to use.
+        key = self._key(wallet, coin)
+        last = self._last_fill.get(key)
+        self._last_fill[key] = now
+        if last is not None and now - last <= self.max_sec:
+            self._sample(key, now - last)
+            self._burst[key] += 1
+        else:
+            if self._burst.get(key) == 1:
+                self._sample(key, 0.0)
+            self._burst[key] = 1
+        return self._windows.get(key, self.default_sec)
+
+    def _sample(self, key: tuple, gap: float):
+        gaps = self._gaps.get(key)
+        if gaps is None:
+            gaps = self._gaps[key] = deque(maxlen=ADAPTIVE_SAMPLES)
+        gaps.append(gap)
+        if len(gaps) >= ADAPTIVE_MIN_SAMPLES:
+            ordered = sorted(gaps)
+            gap = ordered[min(len(ordered) - 1, int(ADAPTIVE_QUANTILE * len(ordered)))]
+            self._windows[key] = min(self.max_sec, max(self.min_sec, gap * ADAPTIVE_MARGIN))
+
+    def window(self, wallet: str, coin: str = "") -> float:
+        return self._windows.get(self._key(wallet, coin), self.default_sec)
+
+    def stats(self) -> dict[tuple, tuple[float, int]]:
+        # (wallet, coin or None) -> (current window, gap samples)
+        return {
+            key: (self._windows.get(key, self.default_sec), len(self._gaps.get(key, ())))
+            for key in self._last_fill
+        }
+
+
 class FillAggregator:
-    def __init__(self, on_batch: Callable[[str, list], Awaitable[None]], window_sec: float = 2.0):
+    # mode="window" batches fills per (wallet, coin, dir) until window_sec
+    # passes without a new one. mode="oid" batches per (wallet, oid) instead
+    # and flushes after idle_sec without a fill, or completion_grace_sec
+    # after complete_order() reports the order filled or cancelled. With a
+    # WindowLearner, window mode uses the wallet's learned window instead.
+    def __init__(
+        self,
+        on_batch: Callable[[str, list], Awaitable[None]],
+        window_sec: float = 2.0,
+        clock: Clock | None = None,
+        mode: str = "window",
+        idle_sec: float = 10.0,
+        completion_grace_sec: float = 0.25,
+        learner: WindowLearner | None = None,
+    ):
         self.on_batch = on_batch
         self.window_sec = window_sec
-        self._pending: dict[tuple[str, str, str], list] = defaultdict(list)
-        self._timers: dict[tuple[str, str, str], asyncio.Task] = {}
+        self.learner = learner
+        self.clock = clock or Clock()
+        self.mode = mode
+        self.idle_sec = idle_sec
+        self.completion_grace_sec = completion_grace_sec
+        self._pending: dict[tuple, list] = defaultdict(list)
+        self._timers: dict[tuple, asyncio.Task] = {}
+        self._order_keys: dict[int, tuple] = {}
+        self._completed: OrderedDict[int, None] = OrderedDict()
 
     async def add_fill(self, wallet: str, fill: dict):
-        coin = fill.get("coin", "")
-        direction = fill.get("dir", "")
+        key = self._key(wallet, fill)
+        oid = self._oid(fill)
+        if oid is not None:
+            self._order_keys[oid] = key
+            delay = self.completion_grace_sec if oid in self._completed else self.idle_sec
+        elif self.learner:
+            delay = self.learner.observe(wallet, key[1], self.clock.time())
+        else:
+            delay = self.window_sec
 
-        key = (wallet, coin, direction)
         self._pending[key].append(fill)
+        self._schedule(key, delay)
+
+    def _oid(self, fill: dict) -> int | None:
+        # The order a fill is batched under; None in window mode and for
+        # fills without an oid, which oid mode batches like window mode.
+        return fill.get("oid") if self.mode == "oid" else None
+
+    def _key(self, wallet: str, fill: dict) -> tuple:
+        oid = self._oid(fill)
+        if oid is not None:
+            return (wallet, oid)
+        return (wallet, fill.get("coin", ""), fill.get("dir", ""))
+
+    def discard(self, wallet: str, fill: dict) -> list:
+        # Takes a pending fill back out by tid, for fills that turn out to
+        # belong to something reported separately (TWAP slices).
+        key = self._key(wallet, fill)
+        pending = self._pending.get(key)
+        if not pending:
+            return []
+        tid = fill.get("tid")
+        removed = [f for f in pending if f.get("tid") == tid]
+        if removed:
+            pending[:] = [f for f in pending if f.get("tid") != tid]
+            if not pending:
+                self._pending.pop(key, None)
+                timer = self._timers.pop(key, None)
+                if timer:
+                    timer.cancel()
+        return removed
+
+    async def complete_order(self, oid: int):
+        self._completed[oid] = None
+        self._completed.move_to_end(oid)
+        while len(self._completed) > COMPLETED_ORDERS_LIMIT:
+            self._completed.popitem(last=False)
+
+        key = self._order_keys.get(oid)
+        if key is not None and key in self._pending:
+            self._schedule(key, self.completion_grace_sec)
 
+    def _schedule(self, key: tuple, delay: float):
         if key in self._timers:
             self._timers[key].cancel()
 
-        self._timers[key] = asyncio.create_task(self._flush_after_delay(key))
+        self._timers[key] = asyncio.create_task(self._flush_after_delay(key, delay))
 
-    async def _flush_after_delay(self, key: tuple[str, str, str]):
-        await asyncio.sleep(self.window_sec)
+    async def _flush_after_delay(self, key: tuple, delay: float):
+        await self.clock.sleep(delay)
         await self._flush(key)
 
-    async def _flush(self, key: tuple[str, str, str]):
+    async def _flush(self, key: tuple):
         fills = self._pending.pop(key, [])
         self._timers.pop(key, None)
+        if self.mode == "oid" and self._order_keys.get(key[1]) == key:
+            del self._order_keys[key[1]]
 
         if not fills:
             return
@@ -41,3 +186,561 @@ class FillAggregator:
             await self.on_batch(wallet, fills)
         except Exception as e:
             logger.error(f"Error processing batch: {e}")
+
+
+FUNDING_INTERVAL_MS = 3_600_000
+
+
+# Hyperliquid pays funding for every open position at the top of the hour,
+# so a watched book produces a burst of userFundings events at once. This
+# collects each burst per funding interval and hands it over as one digest:
+# per wallet, or for every wallet together when group_wallets is set.
+class FundingDigest:
+    def __init__(
+        self,
+        on_digest: Callable[[list[tuple[str, dict]]], Awaitable[None]],
+        window_sec: float = 60.0,
+        group_wallets: bool = False,
+        clock: Clock | None = None,
+    ):
+        self.on_digest = on_digest
+        self.window_sec = window_sec
+        self.group_wallets = group_wallets
+        self.clock = clock or Clock()
+        self._pending: dict[tuple[str | None, int], list] = defaultdict(list)
+        self._timers: dict[tuple[str | None, int], asyncio.Task] = {}
+
+    async def add_funding(self, wallet: str, funding: dict):
+        time_ms = funding.get("time") or int(self.clock.time() * 1000)
+        interval = time_ms - time_ms % FUNDING_INTERVAL_MS
+        key = (None if self.group_wallets else wallet, interval)
+        self._pending[key].append((wallet, funding))
+
+        # The window starts with the first payment of the interval and is not
+        # extended, so a digest is never held back by a slow trickle.
+        if key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_after_delay(key))
+
+    async def _flush_after_delay(self, key: tuple[str | None, int]):
+        await self.clock.sleep(self.window_sec)
+        await self._flush(key)
+
+    async def _flush(self, key: tuple[str | None, int]):
+        entries = self._pending.pop(key, [])
+        self._timers.pop(key, None)
+
+        if not entries:
+            return
+
+        try:
+            await self.on_digest(entries)
+        except Exception as e:
+            logger.error(f"Error processing funding digest: {e}")
+
+
+# Second tier on top of FillAggregator: coin-level batches for one wallet
+# that flush within window_sec of each other are combined into a single
+# basket, so closing twenty positions at once is one message, not twenty.
+# A lone batch is passed through unchanged.
+class BasketAggregator:
+    def __init__(
+        self,
+        on_batch: Callable[[str, list], Awaitable[None]],
+        on_basket: Callable[[str, list[list]], Awaitable[None]],
+        window_sec: float = 1.0,
+        clock: Clock | None = None,
+    ):
+        self.on_batch = on_batch
+        self.on_basket = on_basket
+        self.window_sec = window_sec
+        self.clock = clock or Clock()
+        self._pending: dict[str, list[list]] = defaultdict(list)
+        self._timers: dict[str, asyncio.Task] = {}
+
+    async def add_batch(self, wallet: str, fills: list):
+        self._pending[wallet].append(fills)
+        if wallet not in self._timers:
+            self._timers[wallet] = asyncio.create_task(self._flush_after_delay(wallet))
+
+    async def _flush_after_delay(self, wallet: str):
+        await self.clock.sleep(self.window_sec)
+        await self._flush(wallet)
+
+    async def _flush(self, wallet: str):
+        batches = self._pending.pop(wallet, [])
+        self._timers.pop(wallet, None)
+
+        if not batches:
+            return
+
+        try:
+            if len(batches) == 1:
+                await self.on_batch(wallet, batches[0])
+            else:
+                await self.on_basket(wallet, batches)
+        except Exception as e:
+            logger.error(f"Error processing basket: {e}")
+
+
+# Optional tier for wallets that copy each other: batches with the same coin
+# and direction from different wallets that flush within window_sec are sent
+# as one cluster. Pending clusters are indexed by (coin, dir), so matching a
+# batch is a single dict lookup, like the per-key lookup in FillAggregator.
+class ClusterAggregator:
+    def __init__(
+        self,
+        on_batch: Callable[[str, list], Awaitable[None]],
+        on_cluster: Callable[[list[tuple[str, list]]], Awaitable[None]],
+        window_sec: float = 2.0,
+        clock: Clock | None = None,
+    ):
+        self.on_batch = on_batch
+        self.on_cluster = on_cluster
+        self.window_sec = window_sec
+        self.clock = clock or Clock()
+        self._pending: dict[tuple[str, str], list[tuple[str, list]]] = defaultdict(list)
+        self._timers: dict[tuple[str, str], asyncio.Task] = {}
+
+    async def add_batch(self, wallet: str, fills: list):
+        first = fills[0]
+        key = (first.get("coin", ""), first.get("dir", ""))
+        self._pending[key].append((wallet, fills))
+        if key not in self._timers:
+            self._timers[key] = asyncio.create_task(self._flush_after_delay(key))
+
+    async def _flush_after_delay(self, key: tuple[str, str]):
+        await self.clock.sleep(self.window_sec)
+        await self._flush(key)
+
+    async def _flush(self, key: tuple[str, str]):
+        entries = self._pending.pop(key, [])
+        self._timers.pop(key, None)
+
+        if not entries:
+            return
+
+        # The same wallet can flush twice for one key inside the window.
+        by_wallet: dict[str, list] = {}
+        for wallet, fills in entries:
+            by_wallet.setdefault(wallet, []).extend(fills)
+
+        try:
+            if len(by_wallet) == 1:
+                wallet, fills = next(iter(by_wallet.items()))
+                await self.on_batch(wallet, fills)
+            else:
+                await self.on_cluster(list(by_wallet.items()))
+        except Exception as e:
+            logger.error(f"Error processing cluster: {e}")
+
+
+@dataclass
+class TwapState:
+    wallet: str
+    twap_id: int
+    coin: str = ""
+    direction: str = ""
+    target_sz: float | None = None
+    minutes: int | None = None
+    filled_sz: float = 0.0
+    notional: float = 0.0
+    closed_pnl: float = 0.0
+    slices: int = 0
+    first_fill_ms: int | None = None
+    last_fill_ms: int | None = None
+    reached: int = 0
+
+    @property
+    def avg_px(self) -> float:
+        return self.notional / self.filled_sz if self.filled_sz > 0 else 0.0
+
+    @property
+    def progress(self) -> float | None:
+        if not self.target_sz:
+            return None
+        return min(self.filled_sz / self.target_sz * 100, 100.0)
+
+    @property
+    def elapsed_sec(self) -> float:
+        if self.first_fill_ms is None or self.last_fill_ms is None:
+            return 0.0
+        return (self.last_fill_ms - self.first_fill_ms) / 1000
+
+
+# TWAPs fill one small slice every ~30 seconds for up to hours. Rather than a
+# message per slice batch, this tracks each TWAP's progress and reports when
+# it crosses one of the milestone percentages and when it completes. The
+# target size comes from userTwapHistory; without it only completion is
+# reported. A TWAP that stops filling for idle_sec without a status update is
+# reported as ended.
+class TwapAggregator:
+    def __init__(
+        self,
+        on_progress: Callable[[TwapState, str], Awaitable[None]],
+        milestones: tuple[float, ...] = (25.0, 50.0, 75.0),
+        idle_sec: float = 600.0,
+        clock: Clock | None = None,
+    ):
+        self.on_progress = on_progress
+        self.milestones = tuple(sorted(milestones))
+        self.idle_sec = idle_sec
+        self.clock = clock or Clock()
+        self._states: dict[tuple[str, int], TwapState] = {}
+        self._timers: dict[tuple[str, int], asyncio.Task] = {}
+
+    def _state(self, wallet: str, twap_id: int) -> TwapState:
+        key = (wallet, twap_id)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = TwapState(wallet, twap_id)
+        return state
+
+    async def add_slice(self, wallet: str, twap_id: int, fill: dict):
+        state = self._state(wallet, twap_id)
+        sz = float(fill.get("sz", 0))
+        state.coin = state.coin or fill.get("coin", "")
+        state.direction = state.direction or fill.get("dir", "")
+        state.filled_sz += sz
+        state.notional += sz * float(fill.get("px", 0))
+        state.closed_pnl += float(fill.get("closedPnl", 0))
+        state.slices += 1
+        time_ms = fill.get("time")
+        if time_ms is not None:
+            if state.first_fill_ms is None:
+                state.first_fill_ms = time_ms
+            state.last_fill_ms = max(state.last_fill_ms or time_ms, time_ms)
+
+        progress = state.progress
+        if progress is not None and progress >= 100.0:
+            await self._finish((wallet, twap_id), "completed")
+            return
+
+        crossed = None
+        while (
+            progress is not None
+            and state.reached < len(self.milestones)
+            and progress >= self.milestones[state.reached]
+        ):
+            crossed = self.milestones[state.reached]
+            state.reached += 1
+        if crossed is not None:
+            await self._notify(state, f"{crossed:g}%")
+
+        self._restart_idle((wallet, twap_id))
+
+    async def update(self, wallet: str, entry: dict, snapshot: bool = False):
+        twap_id = entry.get("twapId")
+        if twap_id is None:
+            return
+        key = (wallet, twap_id)
+        status = (entry.get("status") or {}).get("status", "")
+        info = entry.get("state") or {}
+
+        if status == "activated":
+            state = self._state(wallet, twap_id)
+            state.coin = info.get("coin", state.coin)
+            try:
+                state.target_sz = float(info["sz"])
+            except (KeyError, TypeError, ValueError):
+                pass
+            state.minutes = info.get("minutes", state.minutes)
+            return
+
+        state = self._states.get(key)
+        if state is None:
+            return
+        # The final executed size from the exchange wins over slices we saw.
+        try:
+            executed = float(info["executedSz"])
+            if executed > state.filled_sz:
+                state.notional = float(info.get("executedNtl", state.notional))
+                state.filled_sz = executed
+        except (KeyError, TypeError, ValueError):
+            pass
+
+        if snapshot or not state.slices:
+            self._drop(key)
+            return
+        await self._finish(key, "completed" if status == "finished" else status or "ended")
+
+    def _restart_idle(self, key: tuple[str, int]):
+        if key in self._timers:
+            self._timers[key].cancel()
+        self._timers[key] = asyncio.create_task(self._idle_after_delay(key))
+
+    async def _idle_after_delay(self, key: tuple[str, int]):
+        await self.clock.sleep(self.idle_sec)
+        self._timers.pop(key, None)
+        await self._finish(key, "ended")
+
+    def _drop(self, key: tuple[str, int]) -> TwapState | None:
+        timer = self._timers.pop(key, None)
+        if timer and timer is not asyncio.current_task():
+            timer.cancel()
+        return self._states.pop(key, None)
+
+    async def _finish(self, key: tuple[str, int], reason: str):
+        state = self._drop(key)
+        if state is not None:
+            await self._notify(state, reason)
+
+    async def _notify(self, state: TwapState, reason: str):
+        try:
+            await self.on_progress(state, reason)
+        except Exception as e:
+            logger.error(f"Error processing TWAP progress: {e}")
+
+
+@dataclass
+class _Card:
+    message_id: int
+    fills: list
+    updated_at: float
+    edited_at: float
+    unsent: list
+
+
+# Optional last tier for window-mode batches: the first batch for a
+# (wallet, coin, dir) is sent as a new message and later batches within
+# session_sec of the previous one edit that message with the running totals.
+# Edits are at most one per min_edit_interval_sec per card; batches arriving
+# in between are coalesced and only the latest totals are pushed. Cards are
+# kept in an OrderedDict by last update so expired ones are dropped from the
+# front.
+class LiveCards:
+    def __init__(
+        self,
+        on_send: Callable[[str, list], Awaitable[int | None]],
+        on_edit: Callable[[int, str, list, list], Awaitable[bool]],
+        min_edit_interval_sec: float = 3.0,
+        session_sec: float = 300.0,
+        clock: Clock | None = None,
+    ):
+        self.on_send = on_send
+        self.on_edit = on_edit
+        self.min_edit_interval_sec = min_edit_interval_sec
+        self.session_sec = session_sec
+        self.clock = clock or Clock()
+        self.sent = 0
+        self.edits = 0
+        self._cards: OrderedDict[tuple, _Card] = OrderedDict()
+        self._timers: dict[tuple, asyncio.Task] = {}
+
+    def is_open(self, wallet: str, coin: str, direction: str) -> bool:
+        # Whether a batch for this key would edit an existing card.
+        card = self._cards.get((wallet, coin, direction))
+        return card is not None and self.clock.time() - card.updated_at < self.session_sec
+
+    async def add_batch(self, wallet: str, fills: list):
+        if not fills:
+            return
+        now = self.clock.time()
+        self._expire(now)
+        key = (wallet, fills[0].get("coin", ""), fills[0].get("dir", ""))
+        card = self._cards.get(key)
+        if card is None:
+            await self._open(key, list(fills), now)
+            return
+
+        card.fills.extend(fills)
+        card.unsent.extend(fills)
+        card.updated_at = now
+        self._cards.move_to_end(key)
+        if key in self._timers:
+            return
+        delay = card.edited_at + self.min_edit_interval_sec - now
+        if delay <= 0:
+            await self._edit(key)
+        else:
+            self._timers[key] = asyncio.create_task(self._edit_after_delay(key, delay))
+
+    def _expire(self, now: float):
+        while self._cards:
+            key, card = next(iter(self._cards.items()))
+            if now - card.updated_at < self.session_sec or key in self._timers:
+                break
+            del self._cards[key]
+
+    async def _open(self, key: tuple, fills: list, now: float):
+        try:
+            message_id = await self.on_send(key[0], fills)
+        except Exception as e:
+            logger.error(f"Error sending live card: {e}")
+            return
+        self.sent += 1
+        if message_id is not None:
+            self._cards[key] = _Card(message_id, fills, now, now, [])
+            self._cards.move_to_end(key)
+
+    async def _edit_after_delay(self, key: tuple, delay: float):
+        await self.clock.sleep(delay)
+        self._timers.pop(key, None)
+        await self._edit(key)
+
+    async def _edit(self, key: tuple):
+        card = self._cards.get(key)
+        if card is None or not card.unsent:
+            return
+        unsent, card.unsent = card.unsent, []
+        card.edited_at = self.clock.time()
+        try:
+            edited = await self.on_edit(card.message_id, key[0], card.fills, unsent)
+        except Exception as e:
+            logger.error(f"Error editing live card: {e}")
+            edited = False
+        if edited:
+            self.edits += 1
+            return
+        # The message is gone or cannot be edited; start a new card.
+        self._cards.pop(key, None)
+        await self._open(key, card.fills, self.clock.time())
+
+
+class _Rate:
+    __slots__ = ("start", "current", "previous")
+
+    def __init__(self, start: float):
+        self.start = start
+        self.current = 0
+        self.previous = 0
+
+
+@dataclass
+class FloodSummary:
+    wallet: str
+    started_at: float
+    ended_at: float = 0.0
+    # Held so they can be acknowledged once the summary is sent.
+    events: list = field(default_factory=list)
+    fills: int = 0
+    volume: float = 0.0
+    closed_pnl: float = 0.0
+    fees: float = 0.0
+    fundings: int = 0
+    funding: float = 0.0
+    transfers: int = 0
+    coins: Counter = field(default_factory=Counter)
+    # Set on the last summary, sent when the wallet leaves summary mode.
+    resumed: bool = False
+
+    def add(self, event_type: str, data: dict):
+        self.events.append(data)
+        if event_type == "fills":
+            px, sz = float(data.get("px", 0)), float(data.get("sz", 0))
+            self.fills += 1
+            self.volume += px * sz
+            self.closed_pnl += float(data.get("closedPnl", 0))
+            self.fees += float(data.get("fee", 0))
+            self.coins[data.get("coin", "???")] += 1
+        elif event_type == "funding":
+            self.fundings += 1
+            self.funding += float(data.get("usdc", 0))
+        elif event_type == "transfers":
+            self.transfers += 1
+
+
+# Per-wallet flood protection. Each wallet's event rate is a sliding-window
+# counter: the previous fixed window's count, weighted by how much of it
+# still overlaps the sliding window, plus the current window's count. A
+# wallet going over max_events per window_sec switches to summary mode,
+# where its events are rolled into one FloodSummary every summary_sec. It
+# switches back at the end of an interval once the rate is below
+# resume_events, so a wallet hovering around the limit does not flap.
+# admit() runs on the WebSocket reader's path, so the switch is announced
+# from a task rather than awaited there.
+class FloodGuard:
+    def __init__(
+        self,
+        on_summary: Callable[[FloodSummary], Awaitable[None]],
+        on_switch: Callable[[str, float], Awaitable[None]],
+        max_events: int,
+        window_sec: float = 60.0,
+        resume_events: int | None = None,
+        summary_sec: float = 300.0,
+        clock: Clock | None = None,
+    ):
+        self.on_summary = on_summary
+        self.on_switch = on_switch
+        self.max_events = max_events
+        self.window_sec = window_sec
+        self.resume_events = resume_events if resume_events is not None else max_events // 2
+        self.summary_sec = summary_sec
+        self.clock = clock or Clock()
+        self.switches = 0
+        self._rates: dict[str, _Rate] = {}
+        self._summaries: dict[str, FloodSummary] = {}
+        self._since: dict[str, float] = {}
+        self._timers: dict[str, asyncio.Task] = {}
+        self._notices: set[asyncio.Task] = set()
+
+    def rate(self, wallet: str, now: float | None = None) -> float:
+        now = self.clock.time() if now is None else now
+        rate = self._rates.get(wallet)
+        if rate is None:
+            return 0.0
+        self._roll(rate, now)
+        overlap = 1 - (now - rate.start) / self.window_sec
+        return rate.previous * overlap + rate.current
+
+    def summarizing_since(self, wallet: str) -> float | None:
+        return self._since.get(wallet)
+
+    def _roll(self, rate: _Rate, now: float):
+        start = now - now % self.window_sec
+        if start != rate.start:
+            rate.previous = rate.current if start - rate.start == self.window_sec else 0
+            rate.current = 0
+            rate.start = start
+
+    async def admit(self, wallet: str, event_type: str, data: dict) -> bool:
+        # True when the event should be delivered as usual, False when it was
+        # rolled into the wallet's summary.
+        now = self.clock.time()
+        rate = self._rates.get(wallet)
+        if rate is None:
+            rate = self._rates[wallet] = _Rate(now - now % self.window_sec)
+        self._roll(rate, now)
+        rate.current += 1
+
+        summary = self._summaries.get(wallet)
+        if summary is None:
+            current = self.rate(wallet, now)
+            if current <= self.max_events:
+                return True
+            logger.info(f"{wallet} at {current:.0f} events per {self.window_sec:g}s; switching to summary mode")
+            self.switches += 1
+            self._since[wallet] = now
+            summary = self._summaries[wallet] = FloodSummary(wallet, now)
+            self._timers[wallet] = asyncio.create_task(self._summarize(wallet))
+            notice = asyncio.create_task(self._announce(wallet, current))
+            self._notices.add(notice)
+            notice.add_done_callback(self._notices.discard)
+        summary.add(event_type, data)
+        return False
+
+    async def _announce(self, wallet: str, rate: float):
+        try:
+            await self.on_switch(wallet, rate)
+        except Exception as e:
+            logger.error(f"Error announcing summary mode: {e}")
+
+    async def _summarize(self, wallet: str):
+        while True:
+            await self.clock.sleep(self.summary_sec)
+            now = self.clock.time()
+            summary = self._summaries[wallet]
+            summary.ended_at = now
+            summary.resumed = self.rate(wallet, now) < self.resume_events
+            if summary.resumed:
+                logger.info(f"{wallet} back under {self.resume_events} events per {self.window_sec:g}s")
+                del self._summaries[wallet]
+                del self._since[wallet]
+                self._timers.pop(wallet, None)
+            else:
+                self._summaries[wallet] = FloodSummary(wallet, now)
+            try:
+                await self.on_summary(summary)
+            except Exception as e:
+                logger.error(f"Error sending flood summary: {e}")
+            if summary.resumed:
+                return
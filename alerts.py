@@ -0,0 +1,329 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from bisect import bisect_left, insort
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+ABOVE = "above"
+BELOW = "below"
+
+
+@dataclass
+class PriceAlert:
+    id: int
+    coin: str
+    price: float
+    direction: str
+    created_at: float
+
+
+class _CoinBook:
+    # Pending alerts for one coin, split by direction and kept sorted so the
+    # ones a tick triggers are always a contiguous run at the end of the
+    # list: "above" alerts are stored by negated price (highest threshold
+    # first), "below" alerts by price (lowest first). A tick costs one
+    # bisect per side plus the alerts it pops.
+    __slots__ = ("up", "down", "last")
+
+    def __init__(self):
+        self.up: list[tuple[float, int]] = []
+        self.down: list[tuple[float, int]] = []
+        self.last: float | None = None
+
+    def __len__(self) -> int:
+        return len(self.up) + len(self.down)
+
+    def add(self, entry_id: int, price: float, direction: str):
+        if direction == ABOVE:
+            insort(self.up, (-price, entry_id))
+        else:
+            insort(self.down, (price, entry_id))
+
+    def remove(self, entry_id: int, price: float, direction: str):
+        side, key = (self.up, -price) if direction == ABOVE else (self.down, price)
+        index = bisect_left(side, (key, entry_id))
+        if index < len(side) and side[index] == (key, entry_id):
+            del side[index]
+
+    def cross(self, price: float) -> list[int]:
+        # Ids of alerts whose threshold the price has reached: above alerts
+        # at or below it, below alerts at or above it.
+        self.last = price
+        triggered = []
+        for side, key in ((self.up, -price), (self.down, price)):
+            index = bisect_left(side, (key,))
+            if index < len(side):
+                triggered.extend(alert_id for _, alert_id in side[index:])
+                del side[index:]
+        return triggered
+
+
+class _ThresholdIndex:
+    # Per-coin books of price thresholds checked against allMids ticks. Only
+    # coins with pending thresholds are looked at, so a tick costs
+    # O(log n + k) per such coin however many thresholds are set.
+    def __init__(self):
+        self._books: dict[str, _CoinBook] = {}
+        self._mids: dict[str, str] = {}
+
+    def last_price(self, coin: str) -> float | None:
+        raw = self._mids.get(coin)
+        return float(raw) if raw is not None else None
+
+    def resolve_coin(self, coin: str) -> str | None:
+        # Coin names are case-sensitive on Hyperliquid (kPEPE, xyz:TSLA);
+        # match the user's spelling against the last tick.
+        if coin in self._mids:
+            return coin
+        lowered = coin.lower()
+        return next((name for name in self._mids if name.lower() == lowered), None)
+
+    def _index(self, coin: str, entry_id: int, price: float, direction: str):
+        book = self._books.get(coin)
+        if book is None:
+            book = self._books[coin] = _CoinBook()
+        book.add(entry_id, price, direction)
+        # The next tick is checked even if the mid has not moved, in case
+        # the new threshold is already behind it.
+        book.last = None
+
+    def _unindex(self, coin: str, entry_id: int, price: float, direction: str):
+        book = self._books.get(coin)
+        if book is not None:
+            book.remove(entry_id, price, direction)
+
+    def _cross(self, mids: dict[str, str]) -> list[tuple[int, float]]:
+        # Evaluates one allMids tick and returns (id, price) for every
+        # threshold it crossed; crossed thresholds leave the index.
+        self._mids = mids
+        crossed = []
+        for coin, book in self._books.items():
+            raw = mids.get(coin)
+            if raw is None:
+                continue
+            try:
+                price = float(raw)
+            except (TypeError, ValueError):
+                continue
+            if book.last == price or not book:
+                book.last = price
+                continue
+            crossed.extend((entry_id, price) for entry_id in book.cross(price))
+        return crossed
+
+
+class PriceAlerts(_ThresholdIndex):
+    # One-shot "tell me when COIN crosses X" alerts, evaluated on every
+    # allMids tick.
+    def __init__(self, path: str | Path | None = None):
+        super().__init__()
+        self.path = Path(path) if path else None
+        self._alerts: dict[int, PriceAlert] = {}
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._alerts)
+
+    def load(self):
+        if not self.path or not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                data = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Ignoring unreadable alerts file {self.path}: {e}")
+            return
+        for raw in data.get("alerts", []):
+            self._insert(PriceAlert(**raw))
+        self._next_id = max(data.get("next_id", 1), max(self._alerts, default=0) + 1)
+
+    def _serialize(self) -> str:
+        return json.dumps({
+            "next_id": self._next_id,
+            "alerts": [asdict(alert) for alert in self._alerts.values()],
+        }, indent=2)
+
+    def _write(self, payload: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def save(self):
+        if self.path:
+            self._write(self._serialize())
+
+    async def snapshot(self):
+        # Serialize on the loop so the thread only does I/O on a stable copy.
+        if self.path:
+            await asyncio.to_thread(self._write, self._serialize())
+
+    def alerts(self) -> list[PriceAlert]:
+        return sorted(self._alerts.values(), key=lambda alert: (alert.coin, alert.price))
+
+    def add(self, coin: str, price: float, direction: str, save: bool = True) -> PriceAlert:
+        alert = PriceAlert(self._next_id, coin, price, direction, time.time())
+        self._next_id += 1
+        self._insert(alert)
+        if save:
+            self.save()
+        return alert
+
+    def _insert(self, alert: PriceAlert):
+        self._alerts[alert.id] = alert
+        self._index(alert.coin, alert.id, alert.price, alert.direction)
+
+    def restore(self, alert: PriceAlert):
+        self._insert(alert)
+
+    def remove(self, alert_id: int) -> PriceAlert | None:
+        alert = self._alerts.pop(alert_id, None)
+        if alert is None:
+            return None
+        self._unindex(alert.coin, alert.id, alert.price, alert.direction)
+        self.save()
+        return alert
+
+    def check(self, mids: dict[str, str]) -> list[tuple[PriceAlert, float]]:
+        # Returns the triggered alerts with the price that triggered them;
+        # they are removed from the book.
+        return [(self._alerts.pop(alert_id), price) for alert_id, price in self._cross(mids)]
+
+
+@dataclass
+class LiquidationWarning:
+    wallet: str
+    coin: str
+    szi: float
+    liquidation_px: float
+    price: float
+
+    @property
+    def distance(self) -> float:
+        # Fraction of the mid the price still has to move to liquidate.
+        return abs(self.price - self.liquidation_px) / self.price
+
+
+@dataclass(slots=True)
+class _Position:
+    id: int
+    wallet: str
+    coin: str
+    szi: float
+    liquidation_px: float
+    # The threshold currently in the index: the warning level while armed,
+    # the reset level after a warning was given.
+    price: float = 0.0
+    direction: str = BELOW
+    armed: bool = True
+
+
+class LiquidationWatch(_ThresholdIndex):
+    # Open positions of watched wallets, indexed per coin by the mid at which
+    # each comes within `pct` of its liquidation price: below that level for
+    # longs, above it for shorts. A position warns once per approach and is
+    # re-armed when the mid retreats past `reset_pct` or the position's size
+    # changes. Both are fractions of the mid and must stay below 1 for the
+    # long-side levels, liq / (1 - pct), to exist.
+    def __init__(self, pct: float, reset_pct: float | None = None):
+        super().__init__()
+        reset_pct = reset_pct if reset_pct is not None else 2 * pct
+        if not 0 < pct <= reset_pct < 1:
+            raise ValueError(f"Need 0 < pct <= reset_pct < 1, got {pct:g} and {reset_pct:g}")
+        self.pct = pct
+        self.reset_pct = reset_pct
+        self._positions: dict[tuple[str, str], _Position] = {}
+        self._by_id: dict[int, _Position] = {}
+        self._next_id = 1
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def positions(self, wallet: str | None = None) -> list[_Position]:
+        return [p for p in self._positions.values() if wallet is None or p.wallet == wallet]
+
+    def update(self, wallet: str, coin: str, szi: float, liquidation_px: float | None):
+        # Records the latest position for wallet and coin; a closed position
+        # or one that cannot be liquidated (no liquidation price) is dropped.
+        current = self._positions.get((wallet, coin))
+        liquidatable = bool(szi) and liquidation_px is not None and liquidation_px > 0
+        if current and liquidatable and current.szi == szi:
+            # A cross-margin liquidation price moves with the rest of the
+            # account on every resync. The levels follow it, but a position
+            # that already warned stays quiet until the mid retreats.
+            if current.liquidation_px != liquidation_px:
+                self._unindex(current.coin, current.id, current.price, current.direction)
+                current.liquidation_px = liquidation_px
+                self._set_threshold(current, self.pct if current.armed else self.reset_pct, current.armed)
+            return
+        if current:
+            self._drop(current)
+        if not liquidatable:
+            return
+        position = _Position(self._next_id, wallet, coin, szi, liquidation_px)
+        self._next_id += 1
+        self._positions[(wallet, coin)] = self._by_id[position.id] = position
+        self._arm(position)
+
+    def replace(self, wallet: str, positions: list[dict], complete: bool = True):
+        # Resync for one wallet from hyperliquid_api position dicts. Unless
+        # the list is incomplete, positions missing from it have closed.
+        seen = set()
+        for raw in positions:
+            try:
+                szi = float(raw.get("szi") or 0)
+                liquidation_px = float(raw["liquidation_px"]) if raw.get("liquidation_px") else None
+            except (TypeError, ValueError):
+                continue
+            seen.add(raw.get("coin"))
+            self.update(wallet, raw.get("coin"), szi, liquidation_px)
+        if not complete:
+            return
+        for position in self.positions(wallet):
+            if position.coin not in seen:
+                self._drop(position)
+
+    def forget(self, wallet: str):
+        for position in self.positions(wallet):
+            self._drop(position)
+
+    def check(self, mids: dict[str, str]) -> list[LiquidationWarning]:
+        warnings = []
+        for position_id, price in self._cross(mids):
+            position = self._by_id[position_id]
+            if not position.armed:
+                self._arm(position)
+                continue
+            warnings.append(LiquidationWarning(
+                position.wallet, position.coin, position.szi, position.liquidation_px, price,
+            ))
+            self._set_threshold(position, self.reset_pct, armed=False)
+        return warnings
+
+    def _arm(self, position: _Position):
+        self._set_threshold(position, self.pct, armed=True)
+
+    def _set_threshold(self, position: _Position, pct: float, armed: bool):
+        # A long is within pct of liquidation once mid <= liq / (1 - pct), a
+        # short once mid >= liq / (1 + pct). The reset level is the same
+        # distance on the far side, crossed the other way.
+        long = position.szi > 0
+        price = position.liquidation_px / (1 - pct) if long else position.liquidation_px / (1 + pct)
+        near = BELOW if long else ABOVE
+        position.armed = armed
+        position.price = price
+        position.direction = near if armed else (ABOVE if near == BELOW else BELOW)
+        self._index(position.coin, position.id, position.price, position.direction)
+
+    def _drop(self, position: _Position):
+        self._positions.pop((position.wallet, position.coin), None)
+        self._by_id.pop(position.id, None)
+        self._unindex(position.coin, position.id, position.price, position.direction)
@@ -0,0 +1,229 @@
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from pathlib import Path
+
+from clock import Clock
+
+logger = logging.getLogger(__name__)
+
+HOUR_MS = 3_600_000
+DAY_MS = 24 * HOUR_MS
+HOURLY_RETENTION_MS = 7 * DAY_MS
+DAILY_RETENTION_MS = 400 * DAY_MS
+SNAPSHOT_VERSION = 1
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class Totals:
+    __slots__ = ("realized_pnl", "fees", "funding", "volume", "fills")
+
+    def __init__(self, realized_pnl=0.0, fees=0.0, funding=0.0, volume=0.0, fills=0):
+        self.realized_pnl = realized_pnl
+        self.fees = fees
+        self.funding = funding
+        self.volume = volume
+        self.fills = fills
+
+    @property
+    def net(self) -> float:
+        return self.realized_pnl - self.fees + self.funding
+
+    def merge(self, other: "Totals"):
+        self.realized_pnl += other.realized_pnl
+        self.fees += other.fees
+        self.funding += other.funding
+        self.volume += other.volume
+        self.fills += other.fills
+
+    def to_list(self) -> list:
+        return [self.realized_pnl, self.fees, self.funding, self.volume, self.fills]
+
+
+# Bucket start (ms) -> coin -> Totals, per wallet.
+Buckets = dict[int, dict[str, Totals]]
+
+
+class Analytics:
+    # Rolling realized PnL, fees, funding, volume and fill counts per wallet
+    # and coin, bucketed by UTC hour and day from the event timestamps. Every
+    # event touches exactly one hourly and one daily bucket.
+    def __init__(
+        self,
+        path: str | Path,
+        snapshot_interval: float = 60.0,
+        clock: Clock | None = None,
+    ):
+        self.path = Path(path)
+        self.snapshot_interval = snapshot_interval
+        self.clock = clock or Clock()
+        self._hours: dict[str, Buckets] = defaultdict(dict)
+        self._days: dict[str, Buckets] = defaultdict(dict)
+        self._dirty = False
+        self._task: asyncio.Task | None = None
+
+    def _buckets(self, wallet: str, time_ms: int, coin: str) -> tuple[Totals, Totals]:
+        hour = self._hours[wallet].setdefault(time_ms - time_ms % HOUR_MS, {})
+        day = self._days[wallet].setdefault(time_ms - time_ms % DAY_MS, {})
+        hourly = hour.get(coin)
+        if hourly is None:
+            hourly = hour[coin] = Totals()
+        daily = day.get(coin)
+        if daily is None:
+            daily = day[coin] = Totals()
+        return hourly, daily
+
+    def record(self, wallet: str, event_type: str, data: dict):
+        time_ms = data.get("time")
+        if not isinstance(time_ms, int):
+            return
+        coin = data.get("coin", "???")
+
+        if event_type in ("fills", "liquidations"):
+            pnl = _float(data.get("closedPnl"))
+            fee = _float(data.get("fee"))
+            volume = _float(data.get("px")) * _float(data.get("sz"))
+            for totals in self._buckets(wallet, time_ms, coin):
+                totals.realized_pnl += pnl
+                totals.fees += fee
+                totals.volume += volume
+                totals.fills += 1
+        elif event_type == "funding":
+            usdc = _float(data.get("usdc"))
+            for totals in self._buckets(wallet, time_ms, coin):
+                totals.funding += usdc
+        else:
+            return
+        self._dirty = True
+
+    def totals(self, wallet: str, start_ms: int, end_ms: int | None = None) -> dict[str, Totals]:
+        # Per-coin totals for buckets starting in [start_ms, end_ms). Whole
+        # days come from the daily buckets and the ragged ends from hourly
+        # ones, so a query touches at most a few dozen buckets. Hourly buckets
+        # older than HOURLY_RETENTION_MS are pruned, so a ragged end that old
+        # is widened to its whole day rather than silently left out.
+        now_ms = int(self.clock.time() * 1000)
+        end_ms = end_ms if end_ms is not None else now_ms + 1
+        start_ms -= start_ms % HOUR_MS
+        hourly_cutoff = now_ms - HOURLY_RETENTION_MS
+        if start_ms < hourly_cutoff:
+            start_ms -= start_ms % DAY_MS
+        if end_ms < hourly_cutoff:
+            end_ms = -(-end_ms // DAY_MS) * DAY_MS
+        first_day = -(-start_ms // DAY_MS) * DAY_MS
+        last_day = end_ms - end_ms % DAY_MS
+
+        spans = []
+        if first_day < last_day:
+            spans.append((self._days.get(wallet, {}), DAY_MS, first_day, last_day))
+            spans.append((self._hours.get(wallet, {}), HOUR_MS, start_ms, first_day))
+            spans.append((self._hours.get(wallet, {}), HOUR_MS, last_day, end_ms))
+        else:
+            spans.append((self._hours.get(wallet, {}), HOUR_MS, start_ms, end_ms))
+
+        result: dict[str, Totals] = {}
+        for buckets, width, low, high in spans:
+            if len(buckets) < (high - low) // width:
+                keys = (k for k in buckets if low <= k < high)
+            else:
+                keys = (k for k in range(low, high, width) if k in buckets)
+            for key in keys:
+                for coin, totals in buckets[key].items():
+                    merged = result.get(coin)
+                    if merged is None:
+                        merged = result[coin] = Totals()
+                    merged.merge(totals)
+        return result
+
+    def prune(self, now_ms: int | None = None):
+        now_ms = now_ms if now_ms is not None else int(self.clock.time() * 1000)
+        for store, retention in ((self._hours, HOURLY_RETENTION_MS), (self._days, DAILY_RETENTION_MS)):
+            cutoff = now_ms - retention
+            for wallet in list(store):
+                buckets = store[wallet]
+                for key in [k for k in buckets if k < cutoff]:
+                    del buckets[key]
+                if not buckets:
+                    del store[wallet]
+
+    def load(self):
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path) as f:
+                snapshot = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logger.error(f"Ignoring unreadable analytics snapshot {self.path}: {e}")
+            return
+        if snapshot.get("version") != SNAPSHOT_VERSION:
+            return
+        for name, store in (("hours", self._hours), ("days", self._days)):
+            for wallet, buckets in snapshot.get(name, {}).items():
+                store[wallet] = {
+                    int(key): {coin: Totals(*values) for coin, values in coins.items()}
+                    for key, coins in buckets.items()
+                }
+
+    def _serialize(self) -> str:
+        return json.dumps({
+            "version": SNAPSHOT_VERSION,
+            "hours": self._dump(self._hours),
+            "days": self._dump(self._days),
+        }, separators=(",", ":"))
+
+    @staticmethod
+    def _dump(store: dict[str, Buckets]) -> dict:
+        return {
+            wallet: {
+                str(key): {coin: totals.to_list() for coin, totals in coins.items()}
+                for key, coins in buckets.items()
+            }
+            for wallet, buckets in store.items()
+        }
+
+    def _write(self, payload: str):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    async def snapshot(self):
+        if not self._dirty:
+            return
+        self.prune()
+        self._dirty = False
+        # Serialize on the loop so the thread only does I/O on a stable copy.
+        await asyncio.to_thread(self._write, self._serialize())
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._snapshot_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.snapshot()
+
+    async def _snapshot_loop(self):
+        while True:
+            await asyncio.sleep(self.snapshot_interval)
+            try:
+                await self.snapshot()
+            except Exception as e:
+                logger.error(f"Analytics snapshot failed: {e}")
@@ -0,0 +1,132 @@
+import argparse
+import random
+import time
+
+from alerts import ABOVE, BELOW, LiquidationWatch, PriceAlerts
+from benchmarks.harness import percentile
+from benchmarks.scenarios import BASE_PRICES, COINS
+
+# allMids carries every listed coin; only a handful have alerts.
+FILLER_COINS = 200
+
+
+def make_mids(prices: dict[str, float]) -> dict[str, str]:
+    return {coin: f"{price:.6g}" for coin, price in prices.items()}
+
+
+def random_alert(rng: random.Random, coin: str, price: float) -> tuple[str, float, str]:
+    offset = rng.uniform(0.0005, 0.05)
+    if rng.random() < 0.5:
+        return coin, price * (1 + offset), ABOVE
+    return coin, price * (1 - offset), BELOW
+
+
+def random_position(rng: random.Random, price: float) -> tuple[float, float]:
+    # Leverage between 2x and 30x puts liquidation 3-50% away from the mid.
+    distance = rng.uniform(0.03, 0.5)
+    if rng.random() < 0.5:
+        return rng.uniform(0.1, 10), price * (1 - distance)
+    return -rng.uniform(0.1, 10), price * (1 + distance)
+
+
+def naive_check(alerts: list[tuple[str, float, str]], mids: dict[str, str]) -> int:
+    # The scan the index replaces: every alert compared on every tick.
+    triggered = 0
+    for coin, threshold, direction in alerts:
+        price = float(mids[coin])
+        if (price >= threshold) if direction == ABOVE else (price <= threshold):
+            triggered += 1
+    return triggered
+
+
+def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    prices = dict(BASE_PRICES)
+    prices.update({f"COIN{i}": rng.uniform(0.01, 100) for i in range(FILLER_COINS)})
+    book = PriceAlerts()
+    book.check(make_mids(prices))
+    specs = [random_alert(rng, coin, prices[coin]) for coin in rng.choices(COINS, k=args.alerts)]
+    for spec in specs:
+        book.add(*spec, save=False)
+    watch = LiquidationWatch(args.liq_pct / 100)
+    for i in range(args.positions):
+        coin = rng.choice(COINS)
+        watch.update(f"0x{i:040x}", coin, *random_position(rng, prices[coin]))
+    watch.check(make_mids(prices))
+
+    tick_times = []
+    watch_times = []
+    triggered = 0
+    warnings = 0
+    started = time.perf_counter()
+    for _ in range(args.ticks):
+        for coin in COINS:
+            prices[coin] *= 1 + rng.gauss(0, args.volatility)
+        mids = make_mids(prices)
+        t0 = time.perf_counter()
+        fired = book.check(mids)
+        tick_times.append(time.perf_counter() - t0)
+        triggered += len(fired)
+        if args.positions:
+            t0 = time.perf_counter()
+            warnings += len(watch.check(mids))
+            watch_times.append(time.perf_counter() - t0)
+        # Re-arm outside the timed section to keep the book at --alerts.
+        for alert, price in fired:
+            book.add(*random_alert(rng, alert.coin, price), save=False)
+    elapsed = time.perf_counter() - started
+
+    result = {
+        "alerts": len(book),
+        "ticks": args.ticks,
+        "triggered": triggered,
+        "tick_p50_us": percentile(tick_times, 50) * 1e6,
+        "tick_p99_us": percentile(tick_times, 99) * 1e6,
+        "tick_max_us": max(tick_times) * 1e6,
+        "ticks_per_sec": args.ticks / sum(tick_times),
+        "elapsed_sec": elapsed,
+    }
+    if watch_times:
+        result.update({
+            "positions": len(watch),
+            "warnings": warnings,
+            "liq_p50_us": percentile(watch_times, 50) * 1e6,
+            "liq_p99_us": percentile(watch_times, 99) * 1e6,
+        })
+    if args.naive_ticks:
+        mids = make_mids(prices)
+        t0 = time.perf_counter()
+        for _ in range(args.naive_ticks):
+            naive_check(specs, mids)
+        result["naive_tick_us"] = (time.perf_counter() - t0) / args.naive_ticks * 1e6
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure price-alert evaluation cost per allMids tick.")
+    parser.add_argument("--alerts", type=int, default=100_000)
+    parser.add_argument("--ticks", type=int, default=20_000)
+    parser.add_argument("--volatility", type=float, default=0.0005, help="Per-tick price move (stddev, fraction).")
+    parser.add_argument("--positions", type=int, default=0, help="Also watch this many positions for liquidation proximity.")
+    parser.add_argument("--liq-pct", type=float, default=5.0, help="Liquidation proximity threshold in percent.")
+    parser.add_argument("--naive-ticks", type=int, default=20, help="Ticks to time a full scan over (0: skip).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = run(args)
+    print(f"alerts={result['alerts']} ticks={result['ticks']} triggered={result['triggered']}")
+    print(
+        f"tick p50={result['tick_p50_us']:.1f}us p99={result['tick_p99_us']:.1f}us "
+        f"max={result['tick_max_us']:.1f}us ticks/sec={result['ticks_per_sec']:,.0f}"
+    )
+    if "positions" in result:
+        print(
+            f"positions={result['positions']} warnings={result['warnings']} "
+            f"liquidation check p50={result['liq_p50_us']:.1f}us p99={result['liq_p99_us']:.1f}us"
+        )
+    if "naive_tick_us" in result:
+        print(f"full scan per tick: {result['naive_tick_us']:,.0f}us")
+
+
+if __name__ == "__main__":
+    main()
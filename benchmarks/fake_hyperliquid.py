@@ -0,0 +1,556 @@
+import argparse
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+
+from aiohttp import WSMsgType, web
+
+from benchmarks.scenarios import BASE_PRICES, COINS
+
+logger = logging.getLogger(__name__)
+
+CHANNEL_MIX = {
+    "userFills": 0.7,
+    "userFundings": 0.2,
+    "userNonFundingLedgerUpdates": 0.1,
+}
+LIST_KEYS = {
+    "userFills": "fills",
+    "userFundings": "fundings",
+    "userNonFundingLedgerUpdates": "nonFundingLedgerUpdates",
+    # Accepted so a TWAP-enabled client can subscribe; no events are generated.
+    "userTwapSliceFills": "twapSliceFills",
+    "userTwapHistory": "history",
+}
+# userEvents carries fills and funding on the "user" channel without a user
+# field, so like the real API a connection may only hold one of them.
+USER_EVENTS = "userEvents"
+# Every generated fill is a whole order, so each userFills frame is followed
+# by a "filled" update per fill; the frame's data is a bare list.
+ORDER_UPDATES = "orderUpdates"
+# Market-wide mids, sent to subscribers with every batch of events.
+ALL_MIDS = "allMids"
+
+
+@dataclass
+class Incident:
+    mode: str
+    started_at: float
+    ended_at: float | None = None
+    resubscribed_at: float | None = None
+
+
+@dataclass
+class FakeConfig:
+    # Events per second for each wallet, unless overridden in wallet_rates.
+    rate: float = 1.0
+    wallet_rates: dict[str, float] = field(default_factory=dict)
+    # Wallets to generate events for. When empty, events are generated for
+    # whatever wallets are currently subscribed.
+    wallets: list[str] = field(default_factory=list)
+    # One-way delay applied to every WS frame and /info response.
+    latency: float = 0.0
+    # Mean seconds between injected disconnects (0 disables).
+    disconnect_every: float = 0.0
+    # Relative weights of the incident types the chaos loop injects:
+    # "drop" aborts the socket, "stall" keeps the socket and protocol pings
+    # alive but stops all application frames for stall_duration, and
+    # "half_open" stops reading and writing entirely until the client gives
+    # up or half_open_timeout passes.
+    chaos_modes: dict[str, float] = field(default_factory=lambda: {"drop": 1.0})
+    stall_duration: float = 10.0
+    half_open_timeout: float = 120.0
+    # Fraction of subscribe requests silently ignored: no subscription and
+    # no subscriptionResponse, as if the request was lost.
+    drop_subscribe_rate: float = 0.0
+    # Recent events replayed as an isSnapshot frame on subscribe.
+    snapshot_size: int = 10
+    tick: float = 0.02
+    seed: int = 0
+
+
+class _Connection:
+    def __init__(self, ws: web.WebSocketResponse, transport):
+        self.ws = ws
+        self.transport = transport
+        self.subscriptions: set[tuple[str, str]] = set()
+        self.frozen = False
+        self.outbox: asyncio.Queue = asyncio.Queue()
+        self.writer: asyncio.Task | None = None
+
+
+class FakeHyperliquid:
+    def __init__(self, config: FakeConfig | None = None):
+        self.config = config or FakeConfig()
+        self.rng = random.Random(self.config.seed)
+        self.connections: set[_Connection] = set()
+        self.mids = dict(BASE_PRICES)
+        self.emitted = 0
+        self.delivered = 0
+        self.disconnects = 0
+        self.dropped_subscribes = 0
+        self.incidents: list[Incident] = []
+        # Number of subscriptions a client holds once fully (re)subscribed;
+        # used to timestamp recovery after an incident.
+        self.expected_subscriptions = 0
+        self.on_emit = None
+        self._seq = 0
+        self._subscribers: dict[tuple[str, str], set[_Connection]] = defaultdict(set)
+        self._recent: dict[tuple[str, str], deque] = {}
+        self._last_funding_ms: dict[str, int] = {}
+        self._weights_dirty = True
+        self._wallet_list: list[str] = []
+        self._cum_weights: list[float] = []
+        self._runner: web.AppRunner | None = None
+        self._tasks: list[asyncio.Task] = []
+        self.host = "127.0.0.1"
+        self.port = 0
+
+    @property
+    def ws_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/ws"
+
+    @property
+    def api_url(self) -> str:
+        return f"http://{self.host}:{self.port}/info"
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0):
+        app = web.Application()
+        app.router.add_get("/ws", self._ws_handler)
+        app.router.add_post("/info", self._info_handler)
+        self._runner = web.AppRunner(app, handle_signals=False)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.host = host
+        self.port = site._server.sockets[0].getsockname()[1]
+        self._tasks.append(asyncio.create_task(self._generate_loop()))
+        if self.config.disconnect_every > 0:
+            self._tasks.append(asyncio.create_task(self._chaos_loop()))
+        logger.info(f"Fake Hyperliquid listening on {self.ws_url}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        for conn in list(self.connections):
+            self._forget(conn)
+            conn.transport.abort()
+        if self._runner:
+            await self._runner.cleanup()
+
+    def subscribed_wallets(self) -> set[str]:
+        return {user for conn in self.connections for _, user in conn.subscriptions if user}
+
+    def drop_connections(self, conns: list[_Connection] | None = None):
+        for conn in list(self.connections) if conns is None else conns:
+            self.disconnects += 1
+            self._forget(conn)
+            conn.transport.abort()
+
+    async def inject(self, mode: str, victims: int | None = None):
+        # victims limits the incident to that many randomly chosen
+        # connections; by default every connection is hit.
+        incident = Incident(mode, time.monotonic())
+        self.incidents.append(incident)
+        conns = list(self.connections)
+        if victims is not None and victims < len(conns):
+            conns = self.rng.sample(conns, victims)
+        logger.info(f"Injecting {mode} on {len(conns)} connection(s)")
+
+        if mode == "drop":
+            self.drop_connections(conns)
+            incident.ended_at = time.monotonic()
+            return
+
+        for conn in conns:
+            conn.frozen = True
+            if mode == "half_open":
+                conn.transport.pause_reading()
+
+        if mode == "stall":
+            await asyncio.sleep(self.config.stall_duration)
+            for conn in conns:
+                conn.frozen = False
+            incident.ended_at = time.monotonic()
+            if incident.resubscribed_at is None:
+                incident.resubscribed_at = incident.ended_at
+            return
+
+        # A real half-open socket lingers until the peer gives up on it or
+        # the kernel times it out; once the client has moved to a new
+        # connection, abort the old one.
+        deadline = time.monotonic() + self.config.half_open_timeout
+        while (
+            time.monotonic() < deadline
+            and incident.resubscribed_at is None
+            and any(c in self.connections for c in conns)
+        ):
+            await asyncio.sleep(0.05)
+        for conn in conns:
+            if conn in self.connections:
+                self.disconnects += 1
+                self._forget(conn)
+                conn.transport.abort()
+        incident.ended_at = time.monotonic()
+
+    def _mark_resubscribed(self, conn: _Connection):
+        if not self.expected_subscriptions or len(conn.subscriptions) < self.expected_subscriptions:
+            return
+        now = time.monotonic()
+        for incident in self.incidents:
+            if incident.resubscribed_at is None:
+                incident.resubscribed_at = now
+
+    def _forget(self, conn: _Connection):
+        self.connections.discard(conn)
+        for key in conn.subscriptions:
+            self._subscribers[key].discard(conn)
+        conn.subscriptions.clear()
+        if conn.writer:
+            conn.writer.cancel()
+        self._weights_dirty = True
+
+    async def _ws_handler(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        conn = _Connection(ws, request.transport)
+        conn.writer = asyncio.create_task(self._writer(conn))
+        self.connections.add(conn)
+        try:
+            async for msg in ws:
+                if msg.type != WSMsgType.TEXT:
+                    continue
+                try:
+                    payload = json.loads(msg.data)
+                except json.JSONDecodeError:
+                    continue
+                self._handle_client_message(conn, payload)
+        finally:
+            self._forget(conn)
+        return ws
+
+    def _handle_client_message(self, conn: _Connection, payload: dict):
+        method = payload.get("method")
+        if method == "ping":
+            self._send(conn, {"channel": "pong"})
+            return
+
+        subscription = payload.get("subscription") or {}
+        sub_type = subscription.get("type")
+        user = (subscription.get("user") or "").lower()
+        if method not in ("subscribe", "unsubscribe") or (
+            sub_type not in LIST_KEYS and sub_type not in (USER_EVENTS, ORDER_UPDATES, ALL_MIDS)
+        ):
+            self._send(conn, {"channel": "error", "data": f"Invalid subscription {payload}"})
+            return
+
+        key = (sub_type, user)
+        if method == "subscribe" and sub_type == USER_EVENTS and any(
+            t == USER_EVENTS and u != user for t, u in conn.subscriptions
+        ):
+            self._send(conn, {"channel": "error", "data": f"Already subscribed to {USER_EVENTS}"})
+            return
+        if method == "subscribe" and key in conn.subscriptions:
+            self._send(conn, {"channel": "error", "data": f"Already subscribed: {json.dumps(subscription)}"})
+            return
+        if method == "subscribe" and self.rng.random() < self.config.drop_subscribe_rate:
+            self.dropped_subscribes += 1
+            return
+        if method == "subscribe":
+            conn.subscriptions.add(key)
+            self._subscribers[key].add(conn)
+            self._mark_resubscribed(conn)
+        else:
+            conn.subscriptions.discard(key)
+            self._subscribers[key].discard(conn)
+        self._weights_dirty = True
+        self._send(conn, {
+            "channel": "subscriptionResponse",
+            "data": {"method": method, "subscription": subscription},
+        })
+
+        recent = self._recent.get(key)
+        if method == "subscribe" and self.config.snapshot_size and sub_type in LIST_KEYS:
+            self._send(conn, {
+                "channel": sub_type,
+                "data": {"isSnapshot": True, "user": user, LIST_KEYS[sub_type]: list(recent or [])},
+            })
+
+    def _send(self, conn: _Connection, message: dict):
+        if conn.frozen:
+            return
+        due = time.monotonic() + self.config.latency
+        conn.outbox.put_nowait((due, json.dumps(message)))
+
+    async def _writer(self, conn: _Connection):
+        while True:
+            due, raw = await conn.outbox.get()
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await conn.ws.send_str(raw)
+            except Exception:
+                return
+
+    async def _info_handler(self, request: web.Request) -> web.Response:
+        if self.config.latency:
+            await asyncio.sleep(self.config.latency)
+        try:
+            payload = await request.json()
+        except json.JSONDecodeError:
+            return web.json_response({"error": "invalid json"}, status=400)
+
+        info_type = payload.get("type")
+        if info_type == "perpDexs":
+            return web.json_response([None])
+        if info_type == "allMids":
+            return web.json_response({coin: f"{px:.6g}" for coin, px in self.mids.items()})
+        if info_type == "clearinghouseState":
+            return web.json_response(self._clearinghouse_state(payload.get("user", "")))
+        return web.json_response({"error": f"unsupported type {info_type}"}, status=422)
+
+    def _clearinghouse_state(self, user: str) -> dict:
+        rng = random.Random(user.lower())
+        positions = []
+        for coin in rng.sample(COINS, rng.randint(0, 4)):
+            px = BASE_PRICES[coin]
+            leverage = rng.choice([2, 3, 5, 10, 20])
+            szi = rng.uniform(-5000, 5000) / px
+            liq = px * (1 - 0.9 / leverage) if szi > 0 else px * (1 + 0.9 / leverage)
+            positions.append({
+                "type": "oneWay",
+                "position": {
+                    "coin": coin,
+                    "szi": f"{szi:.4f}",
+                    "entryPx": f"{px:.6g}",
+                    "leverage": {"type": "cross", "value": leverage},
+                    "liquidationPx": f"{liq:.6g}",
+                    "unrealizedPnl": f"{(self.mids[coin] - px) * szi:.4f}",
+                    "returnOnEquity": "0.0",
+                    "cumFunding": {"sinceOpen": "0.0"},
+                },
+            })
+        return {"assetPositions": positions}
+
+    def _rate_for(self, wallet: str) -> float:
+        return self.config.wallet_rates.get(wallet, self.config.rate)
+
+    def _refresh_weights(self):
+        wallets = self.config.wallets or sorted(self.subscribed_wallets())
+        self._wallet_list = [w.lower() for w in wallets]
+        total = 0.0
+        self._cum_weights = []
+        for wallet in self._wallet_list:
+            total += self._rate_for(wallet)
+            self._cum_weights.append(total)
+        self._weights_dirty = False
+
+    async def _generate_loop(self):
+        carry = 0.0
+        last = time.monotonic()
+        while True:
+            await asyncio.sleep(self.config.tick)
+            now = time.monotonic()
+            elapsed, last = now - last, now
+            if self._weights_dirty:
+                self._refresh_weights()
+            if not self._wallet_list:
+                continue
+
+            expected = self._cum_weights[-1] * elapsed + carry
+            count = int(expected)
+            carry = expected - count
+            if count:
+                self.emit_batch(count)
+
+    def emit_batch(self, count: int):
+        for coin in self.mids:
+            self.mids[coin] *= 1 + self.rng.gauss(0, 0.0002)
+        mids_subscribers = [c for c in self._subscribers.get((ALL_MIDS, ""), ()) if not c.frozen]
+        if mids_subscribers:
+            message = {"channel": ALL_MIDS, "data": {"mids": {coin: f"{px:.6g}" for coin, px in self.mids.items()}}}
+            for conn in mids_subscribers:
+                self._send(conn, message)
+
+        frames: dict[tuple[str, str], list[dict]] = defaultdict(list)
+        wallets = self.rng.choices(self._wallet_list, cum_weights=self._cum_weights, k=count)
+        channels = self.rng.choices(list(CHANNEL_MIX), weights=list(CHANNEL_MIX.values()), k=count)
+        for wallet, channel in zip(wallets, channels):
+            frames[(channel, wallet)].append(self._make_event(channel, wallet))
+
+        for key, events in frames.items():
+            subscribers = [c for c in self._subscribers.get(key, ()) if not c.frozen]
+            recent = self._recent.get(key)
+            if recent is None and self.config.snapshot_size:
+                recent = self._recent[key] = deque(maxlen=self.config.snapshot_size)
+            if recent is not None:
+                recent.extend(events)
+            self.emitted += len(events)
+            channel, wallet = key
+            event_subscribers = []
+            if channel in ("userFills", "userFundings"):
+                event_subscribers = [c for c in self._subscribers.get((USER_EVENTS, wallet), ()) if not c.frozen]
+            if self.on_emit:
+                for event in events:
+                    self.on_emit(wallet, channel, event, bool(subscribers or event_subscribers))
+            if subscribers:
+                message = {"channel": channel, "data": {"user": wallet, LIST_KEYS[channel]: events}}
+                for conn in subscribers:
+                    self.delivered += len(events)
+                    self._send(conn, message)
+            if channel == "userFills":
+                self._send_order_updates(wallet, events)
+            if event_subscribers:
+                if channel == "userFills":
+                    messages = [{"channel": "user", "data": {"fills": events}}]
+                else:
+                    messages = [{"channel": "user", "data": {"funding": event}} for event in events]
+                for conn in event_subscribers:
+                    self.delivered += len(events)
+                    for message in messages:
+                        self._send(conn, message)
+
+    def _send_order_updates(self, wallet: str, fills: list[dict]):
+        subscribers = [c for c in self._subscribers.get((ORDER_UPDATES, wallet), ()) if not c.frozen]
+        if not subscribers:
+            return
+        message = {
+            "channel": ORDER_UPDATES,
+            "data": [
+                {
+                    "order": {
+                        "coin": fill["coin"],
+                        "side": fill["side"],
+                        "limitPx": fill["px"],
+                        "sz": "0.0",
+                        "oid": fill["oid"],
+                        "timestamp": fill["time"],
+                        "origSz": fill["sz"],
+                    },
+                    "status": "filled",
+                    "statusTimestamp": fill["time"],
+                }
+                for fill in fills
+            ],
+        }
+        for conn in subscribers:
+            self._send(conn, message)
+
+    def _make_event(self, channel: str, wallet: str) -> dict:
+        self._seq += 1
+        now_ms = int(time.time() * 1000)
+        coin = self.rng.choice(COINS)
+        px = self.mids[coin]
+        if channel == "userFills":
+            direction = self.rng.choice(["Open Long", "Open Short", "Close Long", "Close Short"])
+            sz = self.rng.uniform(10, 5000) / px
+            return {
+                "coin": coin,
+                "px": f"{px:.6g}",
+                "sz": f"{sz:.6g}",
+                "side": "B" if direction in ("Open Long", "Close Short") else "A",
+                "time": now_ms,
+                "startPosition": "0.0",
+                "dir": direction,
+                "closedPnl": f"{self.rng.uniform(-100, 100) if direction.startswith('Close') else 0:.6f}",
+                "hash": f"0x{self._seq:064x}",
+                "oid": self._seq,
+                "crossed": True,
+                "fee": f"{px * sz * 0.00035:.6f}",
+                "tid": self._seq,
+                "feeToken": "USDC",
+            }
+        if channel == "userFundings":
+            # Keep (time, coin) unique per wallet so events are identifiable.
+            now_ms = max(now_ms, self._last_funding_ms.get(wallet, 0) + 1)
+            self._last_funding_ms[wallet] = now_ms
+            szi = self.rng.uniform(-5000, 5000) / px
+            rate = self.rng.uniform(-0.00005, 0.00012)
+            return {
+                "time": now_ms,
+                "coin": coin,
+                "usdc": f"{-szi * px * rate:.6f}",
+                "szi": f"{szi:.4f}",
+                "fundingRate": f"{rate:.10f}",
+            }
+        return {
+            "time": now_ms,
+            "hash": f"0x{self._seq:064x}",
+            "delta": {
+                "type": self.rng.choice(["deposit", "withdraw"]),
+                "usdc": f"{self.rng.uniform(10, 50000):.2f}",
+            },
+        }
+
+    async def _chaos_loop(self):
+        modes = list(self.config.chaos_modes)
+        weights = list(self.config.chaos_modes.values())
+        while True:
+            await asyncio.sleep(self.rng.expovariate(1 / self.config.disconnect_every))
+            if self.connections:
+                await self.inject(self.rng.choices(modes, weights=weights)[0])
+
+
+def parse_wallet_rates(values: list[str]) -> dict[str, float]:
+    rates = {}
+    for value in values:
+        wallet, _, rate = value.partition("=")
+        rates[wallet.lower()] = float(rate)
+    return rates
+
+
+async def serve(config: FakeConfig, host: str, port: int):
+    server = FakeHyperliquid(config)
+    await server.start(host, port)
+    print(f"WS:  {server.ws_url}\nAPI: {server.api_url}")
+    try:
+        while True:
+            await asyncio.sleep(10)
+            logger.info(
+                f"emitted={server.emitted} delivered={server.delivered} "
+                f"connections={len(server.connections)} wallets={len(server.subscribed_wallets())}"
+            )
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Hyperliquid WS and /info API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=1.0, help="Events/sec per subscribed wallet.")
+    parser.add_argument(
+        "--wallet-rate",
+        action="append",
+        default=[],
+        metavar="WALLET=RATE",
+        help="Per-wallet event rate override (repeatable).",
+    )
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--disconnect-every", type=float, default=0.0, help="Mean seconds between drops.")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(name)s %(levelname)s %(message)s")
+    config = FakeConfig(
+        rate=args.rate,
+        wallet_rates=parse_wallet_rates(args.wallet_rate),
+        latency=args.latency_ms / 1000,
+        disconnect_every=args.disconnect_every,
+        seed=args.seed,
+    )
+    try:
+        asyncio.run(serve(config, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
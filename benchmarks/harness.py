@@ -0,0 +1,531 @@
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+os.environ.setdefault("TELEGRAM_BOT_TOKEN", "bench-token")
+os.environ.setdefault("TELEGRAM_USER_ID", "1")
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="hl-notify-bench-"))
+
+import bot  # noqa: E402
+import storage  # noqa: E402
+from alerts import PriceAlerts  # noqa: E402
+from aggregator import (  # noqa: E402
+    BasketAggregator,
+    ClusterAggregator,
+    FillAggregator,
+    FloodGuard,
+    FundingDigest,
+    LiveCards,
+    TwapAggregator,
+    WindowLearner,
+)
+from benchmarks.scenarios import Scenario  # noqa: E402
+from clock import Clock, VirtualClock  # noqa: E402
+from delivery import Delivery  # noqa: E402
+from ipc import IPCClient, RemoteBot  # noqa: E402
+from journal import Journal  # noqa: E402
+from ws_manager import WSManager  # noqa: E402
+
+STAGES = ["ingest", "aggregate", "format", "send", "end_to_end", "liquidation"]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarize(values: list[float]) -> dict:
+    return {
+        "count": len(values),
+        "p50_ms": percentile(values, 50) * 1000,
+        "p90_ms": percentile(values, 90) * 1000,
+        "p99_ms": percentile(values, 99) * 1000,
+        "max_ms": max(values) * 1000 if values else 0.0,
+    }
+
+
+class FakeBot:
+    # cpu is busy time per call on the loop making it, standing in for the
+    # request encoding, TLS and response parsing of a real Bot API call.
+    def __init__(self, latency: float = 0.0, clock: Clock | None = None, cpu: float = 0.0):
+        self.latency = latency
+        self.clock = clock or Clock()
+        self.cpu = cpu
+        self.sent: list[str] = []
+        self.edits = 0
+
+    def _burn(self):
+        deadline = time.perf_counter() + self.cpu
+        while time.perf_counter() < deadline:
+            pass
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self._burn()
+        if self.latency:
+            await self.clock.sleep(self.latency)
+        self.sent.append(text)
+        return SimpleNamespace(message_id=len(self.sent))
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        self._burn()
+        if self.latency:
+            await self.clock.sleep(self.latency)
+        self.sent[message_id - 1] = text
+        self.edits += 1
+
+
+class IPCBot(FakeBot):
+    # Counts messages like FakeBot, but the calls are made by a delivery
+    # process (benchmarks.ipc_peer) at the other end of the IPC socket.
+    def __init__(self, remote: RemoteBot):
+        super().__init__()
+        self.remote = remote
+
+    async def send_message(self, chat_id, text, **kwargs):
+        message = await self.remote.send_message(chat_id, text, **kwargs)
+        self.sent.append(text)
+        return message
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        await self.remote.edit_message_text(text, chat_id=chat_id, message_id=message_id, **kwargs)
+        self.edits += 1
+
+
+async def start_delivery_peer(send_latency: float, send_cpu: float) -> tuple[asyncio.subprocess.Process, IPCClient]:
+    path = os.path.join(tempfile.mkdtemp(prefix="hl-notify-ipc-"), "ipc.sock")
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "benchmarks.ipc_peer",
+        "--socket", path,
+        "--send-latency-ms", str(send_latency * 1000),
+        "--send-cpu-ms", str(send_cpu * 1000),
+        cwd=ROOT,
+    )
+    client = IPCClient(path)
+    await client.start()
+    try:
+        await client.wait_connected(10)
+    except asyncio.TimeoutError:
+        process.kill()
+        await client.stop()
+        raise RuntimeError("Delivery peer did not come up") from None
+    return process, client
+
+
+async def stop_delivery_peer(process: asyncio.subprocess.Process, client: IPCClient):
+    await client.stop()
+    process.terminate()
+    await process.wait()
+
+
+# Ingest and format are pure CPU and always timed with perf_counter. Waiting
+# stages (aggregate, send, end_to_end) use `now`, which is the scenario clock
+# when replaying in simulated time.
+class Probe:
+    def __init__(self, now=time.perf_counter):
+        self.now = now
+        self.samples: dict[str, list[float]] = defaultdict(list)
+        self.arrivals: dict[int, float] = {}
+        self.held: set[int] = set()
+        self.frame_started = 0.0
+        self.frame_arrival = 0.0
+        self.events = 0
+
+    def start_frame(self, arrival: float | None = None):
+        # Replays pass the frame's scheduled offset, so time spent waiting
+        # behind earlier frames counts towards end-to-end latency.
+        self.frame_started = time.perf_counter()
+        self.frame_arrival = self.now() if arrival is None else arrival
+
+    def end_frame(self):
+        self.record("ingest", time.perf_counter() - self.frame_started)
+
+    def record(self, stage: str, seconds: float):
+        self.samples[stage].append(seconds)
+
+    def wrap_fill(self, add_fill):
+        async def wrapper(wallet: str, fill: dict):
+            self.events += 1
+            self.arrivals[id(fill)] = self.frame_arrival
+            await add_fill(wallet, fill)
+        return wrapper
+
+    def wrap_event(self, on_event):
+        async def wrapper(wallet: str, event_type: str, data: dict):
+            self.events += 1
+            self.arrivals[id(data)] = self.frame_arrival
+            await on_event(wallet, event_type, data)
+        return wrapper
+
+    def wrap_deliver(self, deliver_event):
+        # Timed where the event is actually handed to Telegram, which with
+        # delivery lanes happens after on_event has returned.
+        async def wrapper(wallet: str, event_type: str, data: dict):
+            await deliver_event(wallet, event_type, data)
+            # Events held for a digest are timed when the digest goes out.
+            if id(data) not in self.held:
+                elapsed = self.now() - self.arrivals.pop(id(data), self.now())
+                self.record("end_to_end", elapsed)
+                if event_type == "liquidations":
+                    self.record("liquidation", elapsed)
+        return wrapper
+
+    def wrap_hold(self, add):
+        async def wrapper(wallet: str, data: dict):
+            self.held.add(id(data))
+            await add(wallet, data)
+        return wrapper
+
+    def wrap_digest(self, on_digest):
+        async def wrapper(entries: list[tuple[str, dict]]):
+            first = min(self.arrivals.pop(id(d), self.now()) for _, d in entries)
+            self.held.difference_update(id(d) for _, d in entries)
+            self.record("aggregate", self.now() - first)
+            await on_digest(entries)
+            self.record("end_to_end", self.now() - first)
+        return wrapper
+
+    def wrap_batch(self, on_batch):
+        async def wrapper(wallet: str, fills: list[dict]):
+            first = min(self.arrivals.pop(id(f), self.now()) for f in fills)
+            self.record("aggregate", self.now() - first)
+            await on_batch(wallet, fills)
+            self.record("end_to_end", self.now() - first)
+        return wrapper
+
+    def wrap_basket(self, on_basket):
+        async def wrapper(wallet: str, batches: list[list[dict]]):
+            fills = [f for batch in batches for f in batch]
+            first = min(self.arrivals.pop(id(f), self.now()) for f in fills)
+            self.record("aggregate", self.now() - first)
+            await on_basket(wallet, batches)
+            self.record("end_to_end", self.now() - first)
+        return wrapper
+
+    def wrap_cluster(self, on_cluster):
+        async def wrapper(entries: list[tuple[str, list[dict]]]):
+            fills = [f for _, batch in entries for f in batch]
+            first = min(self.arrivals.pop(id(f), self.now()) for f in fills)
+            self.record("aggregate", self.now() - first)
+            await on_cluster(entries)
+            self.record("end_to_end", self.now() - first)
+        return wrapper
+
+    def wrap_twap(self, on_twap_fill):
+        async def wrapper(wallet: str, twap_id: int, fill: dict, seen: bool):
+            # A seen slice was already counted when it arrived on userFills.
+            if not seen:
+                self.events += 1
+            await on_twap_fill(wallet, twap_id, fill, seen)
+            self.record("end_to_end", self.now() - self.frame_arrival)
+        return wrapper
+
+    def wrap_sync(self, stage: str, func):
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - started)
+        return wrapper
+
+    def wrap_send(self, send):
+        async def wrapper(*args, **kwargs):
+            started = self.now()
+            try:
+                return await send(*args, **kwargs)
+            finally:
+                self.record("send", self.now() - started)
+        return wrapper
+
+
+def seed_wallets(wallets: list[str], funding_digest: bool = False):
+    storage._save({
+        "wallets": {
+            wallet: {
+                "label": None,
+                "events": {**storage.DEFAULT_EVENTS},
+                "funding_filters": {**storage.DEFAULT_FUNDING_FILTERS},
+                "funding_digest": funding_digest,
+            }
+            for wallet in wallets
+        }
+    })
+
+
+def install(
+    probe: Probe,
+    window_sec: float,
+    send_latency: float,
+    rest_latency: float,
+    url: str | None = None,
+    clock: Clock | None = None,
+    journal=None,
+    funding_digest: str = "off",
+    basket_window: float = 0.0,
+    cluster_window: float = 0.0,
+    aggregation_mode: str = "window",
+    idle_sec: float = 10.0,
+    twap: bool = False,
+    adaptive: bool = False,
+    live_cards: bool = False,
+    delivery: bool = True,
+    flood_max_events: int = 0,
+    send_cpu: float = 0.0,
+    remote: RemoteBot | None = None,
+    delivery_queue: bool = True,
+    order_updates: bool = False,
+    price_alerts: PriceAlerts | None = None,
+) -> tuple[WSManager, FillAggregator, FakeBot]:
+    clock = clock or Clock()
+    # With a remote bot, latency and CPU cost are paid in the peer process.
+    fake_bot = IPCBot(remote) if remote else FakeBot(send_latency, clock, cpu=send_cpu)
+    fake_bot.send_message = probe.wrap_send(fake_bot.send_message)
+
+    async def fake_position_info(wallet: str, coin: str):
+        if rest_latency:
+            await clock.sleep(rest_latency)
+        return {"coin": coin, "leverage": 10, "liquidation_px": "1.0"}
+
+    bot.app = type("FakeApplication", (), {"bot": fake_bot})()
+    bot.get_position_info = fake_position_info
+    # Prefetches are aged on the scenario clock, which restarts at zero.
+    bot.position_prefetch.clear()
+    bot.card_positions.clear()
+    for name in (
+        "format_aggregated_fills",
+        "format_basket",
+        "format_cluster",
+        "format_liquidation",
+        "format_funding",
+        "format_funding_digest",
+        "format_transfer",
+        "format_twap_progress",
+    ):
+        original = getattr(bot, f"_bench_{name}", None) or getattr(bot, name)
+        setattr(bot, f"_bench_{name}", original)
+        setattr(bot, name, probe.wrap_sync("format", original))
+    original = getattr(bot, "_bench_deliver_event", None) or bot.deliver_event
+    bot._bench_deliver_event = original
+    bot.deliver_event = probe.wrap_deliver(original)
+    # Started by the caller, inside its event loop.
+    bot.delivery = Delivery(queued=delivery_queue) if delivery else None
+
+    bot.live_cards = None
+    if live_cards:
+        bot.live_cards = LiveCards(
+            on_send=bot.send_fill_card,
+            on_edit=bot.edit_fill_card,
+            clock=clock,
+        )
+    on_batch = probe.wrap_batch(bot.deliver_fills)
+    bot.basket_aggregator = None
+    if basket_window > 0:
+        bot.basket_aggregator = BasketAggregator(
+            on_batch=on_batch,
+            on_basket=probe.wrap_basket(bot.deliver_basket),
+            window_sec=basket_window,
+            clock=clock,
+        )
+        on_batch = bot.basket_aggregator.add_batch
+    bot.cluster_aggregator = None
+    if cluster_window > 0:
+        bot.cluster_aggregator = ClusterAggregator(
+            on_batch=on_batch,
+            on_cluster=probe.wrap_cluster(bot.deliver_cluster),
+            window_sec=cluster_window,
+            clock=clock,
+        )
+        on_batch = bot.cluster_aggregator.add_batch
+    aggregator = FillAggregator(
+        on_batch=on_batch,
+        window_sec=window_sec,
+        clock=clock,
+        mode=aggregation_mode,
+        idle_sec=idle_sec,
+        learner=WindowLearner(window_sec) if adaptive else None,
+    )
+    bot.fill_aggregator = aggregator
+    bot.journal = journal
+    bot.funding_digest = None
+    if funding_digest != "off":
+        digest = FundingDigest(
+            on_digest=probe.wrap_digest(bot.deliver_funding_digest),
+            group_wallets=funding_digest == "global",
+            clock=clock,
+        )
+        digest.add_funding = probe.wrap_hold(digest.add_funding)
+        bot.funding_digest = digest
+    bot.flood_guard = None
+    if flood_max_events > 0:
+        bot.flood_guard = FloodGuard(
+            on_summary=bot.deliver_flood_summary,
+            on_switch=bot.send_flood_notice,
+            max_events=flood_max_events,
+            clock=clock,
+        )
+    bot.twap_aggregator = None
+    twap_callbacks = {}
+    if twap:
+        bot.twap_aggregator = TwapAggregator(on_progress=bot.send_twap_progress, clock=clock)
+        twap_callbacks = {
+            "on_twap_fill": probe.wrap_twap(bot.handle_twap_fill),
+            "on_twap_update": bot.handle_twap_update,
+        }
+    bot.price_alerts = price_alerts
+    manager = WSManager(
+        on_event=probe.wrap_event(bot.handle_event),
+        on_fill=probe.wrap_fill(bot.handle_fill),
+        on_order_update=bot.handle_order_update if order_updates else None,
+        on_mids=bot.handle_mids if price_alerts is not None else None,
+        needs_mids=lambda: bool(bot.price_alerts),
+        clock=clock,
+        **twap_callbacks,
+        **({"url": url} if url else {}),
+    )
+    # handle_mids drops the allMids subscription once no alert is left.
+    bot.ws_manager = manager
+    return manager, aggregator, fake_bot
+
+
+def instrument_live(manager: WSManager, probe: Probe):
+    handle_message = manager._handle_message
+
+    async def timed(raw, *args):
+        probe.start_frame()
+        await handle_message(raw, *args)
+        probe.end_frame()
+
+    manager._handle_message = timed
+
+
+async def replay(
+    scenario: Scenario,
+    window_sec: float = 2.0,
+    send_latency: float = 0.0,
+    rest_latency: float = 0.0,
+    realtime: bool = False,
+    journal_dir: str | None = None,
+    funding_digest: str = "off",
+    basket_window: float = 0.0,
+    cluster_window: float = 0.0,
+    aggregation_mode: str = "window",
+    idle_sec: float = 10.0,
+    twap: bool = False,
+    adaptive: bool = False,
+    live_cards: bool = False,
+    delivery: bool = True,
+    flood_max_events: int = 0,
+    send_cpu: float = 0.0,
+    ipc: bool = False,
+    delivery_queue: bool = True,
+) -> dict:
+    # By default frames are replayed on a VirtualClock at their recorded
+    # offsets, so hour-long scenarios finish in seconds and aggregation
+    # windows behave exactly as they would live. realtime=True instead pushes
+    # frames as fast as possible through the wall clock. ipc=True sends
+    # through a separate delivery process, as BOT_ROLE=ingest does; socket
+    # round trips take wall time, so it needs realtime.
+    if ipc and not realtime:
+        raise ValueError("ipc replays need realtime=True")
+    seed_wallets(scenario.wallets, funding_digest=funding_digest != "off")
+    peer = await start_delivery_peer(send_latency, send_cpu) if ipc else None
+    clock = None if realtime else VirtualClock()
+    probe = Probe() if realtime else Probe(now=clock.time)
+    journal = None
+    if journal_dir:
+        journal = Journal(tempfile.mkdtemp(dir=journal_dir))
+        journal.open()
+        await journal.start()
+    manager, aggregator, fake_bot = install(
+        probe, window_sec, send_latency, rest_latency,
+        clock=clock, journal=journal, funding_digest=funding_digest,
+        basket_window=basket_window, cluster_window=cluster_window,
+        aggregation_mode=aggregation_mode, idle_sec=idle_sec, twap=twap, adaptive=adaptive,
+        live_cards=live_cards, delivery=delivery, flood_max_events=flood_max_events,
+        send_cpu=send_cpu, remote=RemoteBot(peer[1]) if peer else None,
+        delivery_queue=delivery_queue,
+    )
+    if bot.delivery:
+        await bot.delivery.start()
+    for wallet in scenario.wallets:
+        manager._subscription_times[wallet] = 0.0
+
+    started = time.perf_counter()
+    cpu_started = time.process_time()
+    for frame in scenario.frames:
+        if clock:
+            await clock.advance_to(frame.offset)
+        probe.start_frame(frame.offset if clock else None)
+        if clock:
+            await clock.run_until_complete(manager._handle_message(frame.raw))
+        else:
+            await manager._handle_message(frame.raw)
+        probe.end_frame()
+        # A live socket yields to the loop between frames; let timers run.
+        await asyncio.sleep(0)
+    ingest_elapsed = time.perf_counter() - started
+
+    if clock:
+        await clock.run_until_idle()
+    while bot.delivery and bot.delivery.pending:
+        if clock:
+            await clock.run_until_idle()
+        await asyncio.sleep(0)
+    pending_tiers = (
+        aggregator,
+        bot.cluster_aggregator,
+        bot.basket_aggregator,
+        bot.funding_digest,
+        bot.twap_aggregator,
+        bot.live_cards,
+        bot.flood_guard,
+    )
+    for pending in pending_tiers:
+        while pending and pending._timers:
+            await asyncio.gather(*list(pending._timers.values()), return_exceptions=True)
+    if bot.delivery:
+        await bot.delivery.stop()
+    if journal:
+        await journal.stop()
+    total_elapsed = time.perf_counter() - started
+    # CPU of this process only; with ipc the delivery peer's is not counted.
+    cpu_sec = time.process_time() - cpu_started
+    if peer:
+        await stop_delivery_peer(*peer)
+
+    return {
+        "frames": len(scenario.frames),
+        "events": probe.events,
+        "messages": len(fake_bot.sent),
+        "edits": fake_bot.edits,
+        "ingest_sec": ingest_elapsed,
+        "frames_per_sec": len(scenario.frames) / ingest_elapsed if ingest_elapsed else 0.0,
+        "cpu_us_per_event": cpu_sec / probe.events * 1e6 if probe.events else 0.0,
+        "total_sec": total_elapsed,
+        "simulated_sec": clock.time() if clock else total_elapsed,
+        "events_per_sec": probe.events / total_elapsed if total_elapsed else 0.0,
+        "stages": {stage: summarize(probe.samples.get(stage, [])) for stage in STAGES},
+    }
+
+
+async def measure_peak_memory(scenario: Scenario, **kwargs) -> float:
+    tracemalloc.start()
+    try:
+        await replay(scenario, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / 1024
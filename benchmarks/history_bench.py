@@ -0,0 +1,98 @@
+import argparse
+import asyncio
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.scenarios import BASE_PRICES, COINS, START_MS, make_wallet
+from history import HistoryStore
+
+DAY_MS = 86_400_000
+HOUR_MS = 3_600_000
+
+
+async def build(store: HistoryStore, args: argparse.Namespace) -> float:
+    rng = random.Random(args.seed)
+    wallets = [make_wallet(rng) for _ in range(args.wallets)]
+    positions = {wallet: rng.sample(COINS, args.coins) for wallet in wallets}
+    started = time.perf_counter()
+    for day in range(args.days):
+        for hour in range(24):
+            t = START_MS + day * DAY_MS + hour * HOUR_MS
+            for wallet, coins in positions.items():
+                for coin in coins:
+                    szi = rng.uniform(-5000, 5000) / BASE_PRICES[coin]
+                    rate = rng.uniform(-0.00005, 0.00012)
+                    store.append(wallet, "funding", {
+                        "time": t,
+                        "coin": coin,
+                        "usdc": -szi * BASE_PRICES[coin] * rate,
+                        "szi": szi,
+                        "fundingRate": rate,
+                    })
+        await store.flush()
+    return time.perf_counter() - started
+
+
+def timed(func, repeat: int) -> tuple[float, object]:
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - t0)
+    return best, result
+
+
+async def run(args: argparse.Namespace) -> dict:
+    directory = tempfile.mkdtemp(prefix="hl-notify-history-bench-", dir=args.dir)
+    store = HistoryStore(directory)
+    store.open()
+    build_sec = await build(store, args)
+
+    end_ms = START_MS + args.days * DAY_MS
+    wallet = random.Random(args.seed).choice(sorted(next(iter(store._zones.values()))))
+    queries = {
+        # Total funding paid on ETH over the last 30 days across all wallets.
+        "eth_funding_30d": lambda: store.total(
+            "funding", "usdc", start_ms=end_ms - 30 * DAY_MS, end_ms=end_ms, coins=["ETH"],
+        ),
+        # A partial-day range forces the binary search on the time column.
+        "all_funding_36h": lambda: store.total(
+            "funding", "usdc", start_ms=end_ms - 36 * HOUR_MS, end_ms=end_ms,
+        ),
+        "wallet_summary_all": lambda: store.summary(wallet),
+    }
+    results = {"rows": store.rows_written, "build_sec": build_sec, "queries": {}}
+    for name, query in queries.items():
+        store.clear_cache()
+        cold, _ = timed(query, 1)
+        warm, _ = timed(query, args.repeat)
+        results["queries"][name] = {"cold_ms": cold * 1000, "warm_ms": warm * 1000}
+    shutil.rmtree(directory, ignore_errors=True)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure history store ingest and query latency.")
+    parser.add_argument("--wallets", type=int, default=300)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--coins", type=int, default=5, help="Open positions per wallet.")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--dir", help="Directory to create the store in (default: system temp).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(
+        f"rows={result['rows']:,} build={result['build_sec']:.1f}s "
+        f"({result['rows'] / result['build_sec']:,.0f} rows/sec)"
+    )
+    print(f"{'query':<22}{'cold ms':>10}{'warm ms':>10}")
+    for name, timing in result["queries"].items():
+        print(f"{name:<22}{timing['cold_ms']:>10.1f}{timing['warm_ms']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+import argparse
+import asyncio
+import logging
+import signal
+
+from benchmarks.harness import FakeBot
+from ipc import IPCServer
+
+
+# The delivery process of a split replay: serves Bot API calls from the
+# benchmark's ingest side with a FakeBot until terminated.
+async def run(args: argparse.Namespace):
+    server = IPCServer(args.socket, FakeBot(args.send_latency_ms / 1000, cpu=args.send_cpu_ms / 1000))
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    await server.start()
+    try:
+        await stopping.wait()
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake delivery process for split-mode benchmarks.")
+    parser.add_argument("--socket", required=True)
+    parser.add_argument("--send-latency-ms", type=float, default=0.0)
+    parser.add_argument("--send-cpu-ms", type=float, default=0.0)
+    # The benchmark side reports everything that matters.
+    logging.getLogger("ipc").setLevel(logging.ERROR)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import argparse
+import asyncio
+import random
+import shutil
+import tempfile
+import time
+
+from benchmarks.harness import percentile
+from benchmarks.scenarios import COINS, make_fill, make_wallet
+from journal import Journal
+
+
+async def run(args: argparse.Namespace) -> dict:
+    rng = random.Random(args.seed)
+    wallets = [make_wallet(rng) for _ in range(100)]
+    fills = [
+        make_fill(rng, rng.choice(COINS), "Open Long", 1_767_225_600_000 + i, i, i)
+        for i in range(1000)
+    ]
+    directory = tempfile.mkdtemp(prefix="hl-notify-journal-bench-", dir=args.dir)
+    journal = Journal(
+        directory,
+        segment_bytes=int(args.segment_mb * 1024 * 1024),
+        flush_interval=args.flush_ms / 1000,
+    )
+    journal.open()
+    await journal.start()
+
+    append_times = []
+    started = time.perf_counter()
+    for i in range(args.count):
+        t0 = time.perf_counter()
+        offset = journal.append(wallets[i % len(wallets)], "fills", fills[i % len(fills)])
+        append_times.append(time.perf_counter() - t0)
+        if args.ack:
+            journal.ack(offset)
+        if i % args.batch == 0:
+            # Yield like a real ingest loop so the group commit can run.
+            await asyncio.sleep(0)
+    appended = time.perf_counter() - started
+    await journal.stop()
+    durable = time.perf_counter() - started
+
+    result = {
+        "appends": args.count,
+        "appends_per_sec": args.count / appended,
+        "durable_appends_per_sec": args.count / durable,
+        "append_p50_us": percentile(append_times, 50) * 1e6,
+        "append_p99_us": percentile(append_times, 99) * 1e6,
+        "fsyncs": journal.fsyncs,
+        "bytes": journal.size_bytes,
+    }
+    shutil.rmtree(directory, ignore_errors=True)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure journal append and group-commit throughput.")
+    parser.add_argument("--count", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, default=100, help="Appends between loop yields.")
+    parser.add_argument("--flush-ms", type=float, default=50.0, help="Group commit interval.")
+    parser.add_argument("--segment-mb", type=float, default=8.0)
+    parser.add_argument("--ack", action="store_true", help="Acknowledge each entry right after appending.")
+    parser.add_argument("--dir", help="Directory to create the journal in (default: system temp).")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(
+        f"appends={result['appends']} appends/sec={result['appends_per_sec']:,.0f} "
+        f"durable appends/sec={result['durable_appends_per_sec']:,.0f}"
+    )
+    print(
+        f"append p50={result['append_p50_us']:.1f}us p99={result['append_p99_us']:.1f}us "
+        f"fsyncs={result['fsyncs']} size={result['bytes'] / 1024 / 1024:.1f} MiB"
+    )
+
+
+if __name__ == "__main__":
+    main()
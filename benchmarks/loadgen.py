@@ -0,0 +1,177 @@
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from benchmarks.fake_hyperliquid import FakeConfig, FakeHyperliquid, parse_wallet_rates
+from benchmarks.harness import (
+    STAGES,
+    Probe,
+    bot,
+    install,
+    instrument_live,
+    seed_wallets,
+    start_delivery_peer,
+    stop_delivery_peer,
+    storage,
+    summarize,
+)
+from alerts import PriceAlerts
+from benchmarks.alerts_bench import random_alert
+from ipc import RemoteBot
+from benchmarks.scenarios import BASE_PRICES, COINS, make_wallet
+
+
+def generate_wallets(count: int, seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    return [make_wallet(rng) for _ in range(count)]
+
+
+async def run(args: argparse.Namespace) -> dict:
+    wallets = generate_wallets(args.wallets, args.seed)
+    seed_wallets(wallets)
+    server = FakeHyperliquid(FakeConfig(
+        rate=args.rate,
+        wallet_rates=parse_wallet_rates(args.wallet_rate),
+        wallets=wallets,
+        latency=args.latency_ms / 1000,
+        disconnect_every=args.disconnect_every,
+        seed=args.seed,
+    ))
+    await server.start()
+
+    price_alerts = None
+    if args.price_alerts:
+        rng = random.Random(args.seed)
+        price_alerts = PriceAlerts()
+        for coin in rng.choices(COINS, k=args.price_alerts):
+            price_alerts.add(*random_alert(rng, coin, BASE_PRICES[coin]), save=False)
+
+    probe = Probe()
+    wire_latency: list[float] = []
+    send_latency, send_cpu = args.send_latency_ms / 1000, args.send_cpu_ms / 1000
+    peer = await start_delivery_peer(send_latency, send_cpu) if args.ipc else None
+    manager, aggregator, fake_bot = install(
+        probe,
+        window_sec=args.window,
+        send_latency=send_latency,
+        rest_latency=0.0,
+        url=server.ws_url,
+        send_cpu=send_cpu,
+        remote=RemoteBot(peer[1]) if peer else None,
+        delivery_queue=not args.no_delivery_queue,
+        price_alerts=price_alerts,
+        aggregation_mode="oid" if args.order_updates else "window",
+        order_updates=args.order_updates,
+    )
+    instrument_live(manager, probe)
+
+    on_event, on_fill = manager.on_event, manager.on_fill
+
+    async def timed_event(wallet, event_type, data):
+        wire_latency.append(time.time() - data.get("time", 0) / 1000)
+        await on_event(wallet, event_type, data)
+
+    async def timed_fill(wallet, fill):
+        wire_latency.append(time.time() - fill.get("time", 0) / 1000)
+        await on_fill(wallet, fill)
+
+    manager.on_event, manager.on_fill = timed_event, timed_fill
+
+    await bot.delivery.start()
+    await manager.start()
+    started = time.perf_counter()
+    emitted_start = server.emitted
+    try:
+        await asyncio.sleep(args.duration)
+    finally:
+        elapsed = time.perf_counter() - started
+        emitted = server.emitted - emitted_start
+        received = probe.events
+        await manager.stop()
+        await bot.delivery.stop()
+        await server.stop()
+        if peer:
+            await stop_delivery_peer(*peer)
+
+    stages = {stage: summarize(probe.samples.get(stage, [])) for stage in STAGES}
+    stages["wire"] = summarize(wire_latency)
+    return {
+        "wallets": len(wallets),
+        "duration_sec": elapsed,
+        "server_events_per_sec": emitted / elapsed,
+        "client_events_per_sec": received / elapsed,
+        "messages": len(fake_bot.sent),
+        "disconnects": server.disconnects,
+        "alerts_triggered": args.price_alerts - len(price_alerts) if price_alerts is not None else 0,
+        "stages": stages,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Drive the WS pipeline with synthetic load from a local fake Hyperliquid.",
+    )
+    parser.add_argument("--wallets", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=1.0, help="Events/sec per wallet.")
+    parser.add_argument("--wallet-rate", action="append", default=[], metavar="WALLET=RATE")
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--disconnect-every", type=float, default=0.0)
+    parser.add_argument("--window", type=float, default=2.0)
+    parser.add_argument("--send-latency-ms", type=float, default=0.0)
+    parser.add_argument("--send-cpu-ms", type=float, default=0.0, help="Simulated CPU time per Telegram call.")
+    parser.add_argument(
+        "--ipc",
+        action="store_true",
+        help="Send through a separate delivery process over a Unix socket, as BOT_ROLE=ingest does.",
+    )
+    parser.add_argument(
+        "--no-delivery-queue",
+        action="store_true",
+        help="Send normal events inline from the WebSocket handler, as DELIVERY_QUEUE_ENABLED=false does.",
+    )
+    parser.add_argument(
+        "--price-alerts",
+        type=int,
+        default=0,
+        help="Set this many price alerts around the starting mids and check them on allMids.",
+    )
+    parser.add_argument(
+        "--order-updates",
+        action="store_true",
+        help="Batch fills per order and subscribe to orderUpdates to flush them on completion.",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument(
+        "--seed-only",
+        action="store_true",
+        help="Only write the generated wallets to DATA_DIR/config.json for a real bot run.",
+    )
+    parser.add_argument("--save", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    if args.seed_only:
+        seed_wallets(generate_wallets(args.wallets, args.seed))
+        print(f"Wrote {args.wallets} wallets to {storage.CONFIG_PATH}")
+        return
+
+    result = asyncio.run(run(args))
+    print(
+        f"wallets={result['wallets']} server events/sec={result['server_events_per_sec']:,.0f} "
+        f"client events/sec={result['client_events_per_sec']:,.0f} messages={result['messages']} "
+        f"disconnects={result['disconnects']}"
+    )
+    if args.price_alerts:
+        print(f"price alerts={args.price_alerts} triggered={result['alerts_triggered']}")
+    for stage, s in result["stages"].items():
+        if s["count"]:
+            print(f"{stage:<12}{s['count']:>9}  p50={s['p50_ms']:.3f}ms p99={s['p99_ms']:.3f}ms max={s['max_ms']:.3f}ms")
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import eventloop
+from benchmarks.scenarios import SCENARIOS
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def run_replay(loop: str, args: argparse.Namespace) -> dict:
+    # Each run is a fresh interpreter, so the loop policy of one run never
+    # leaks into the next.
+    with tempfile.NamedTemporaryFile(suffix=".json") as out:
+        cmd = [
+            sys.executable, "-m", "benchmarks.replay",
+            "--loop", loop,
+            "--no-memory",
+            "--save", out.name,
+            "--send-latency-ms", str(args.send_latency_ms),
+            "--window", str(args.window),
+        ]
+        for name in args.scenario or SCENARIOS:
+            cmd += ["--scenario", name]
+        if not args.simulated:
+            cmd.append("--realtime")
+        if args.ipc:
+            cmd.append("--ipc")
+        subprocess.run(cmd, cwd=ROOT, check=True, stdout=subprocess.DEVNULL)
+        return json.loads(Path(out.name).read_text())
+
+
+def summarize_runs(runs: list[dict]) -> dict:
+    # Median over repeats of the metrics the comparison cares about.
+    rows = {}
+    for name in runs[0]["scenarios"]:
+        results = [run["scenarios"][name] for run in runs]
+        rows[name] = {
+            "frames_per_sec": statistics.median(r["frames_per_sec"] for r in results),
+            "events_per_sec": statistics.median(r["events_per_sec"] for r in results),
+            "e2e_p50_ms": statistics.median(r["stages"]["end_to_end"]["p50_ms"] for r in results),
+            "e2e_p99_ms": statistics.median(r["stages"]["end_to_end"]["p99_ms"] for r in results),
+            "cpu_us_per_event": statistics.median(r["cpu_us_per_event"] for r in results),
+        }
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the replay suite on the asyncio and uvloop event loops.")
+    parser.add_argument("--scenario", action="append", choices=list(SCENARIOS), help="Scenario to run (default: all).")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per loop; medians are reported.")
+    # Latencies on the simulated clock do not depend on the loop, so the
+    # comparison runs on the wall clock by default.
+    parser.add_argument("--simulated", action="store_true", help="Replay in simulated time (latencies not comparable).")
+    parser.add_argument("--ipc", action="store_true", help="Send through a separate delivery process.")
+    parser.add_argument("--send-latency-ms", type=float, default=0.0)
+    parser.add_argument("--window", type=float, default=2.0)
+    parser.add_argument("--save", help="Write the comparison as JSON to this path.")
+    args = parser.parse_args()
+
+    results = {}
+    for loop in eventloop.LOOPS:
+        runs = [run_replay(loop, args) for _ in range(args.repeat)]
+        actual = runs[0]["meta"]["loop"]
+        if actual != loop:
+            print(f"{loop} is not installed (uv pip install {loop}); skipping it")
+            continue
+        results[loop] = summarize_runs(runs)
+
+    print(f"{'scenario':<22}{'loop':<9}{'frames/s':>11}{'events/s':>11}{'e2e p50 ms':>12}{'e2e p99 ms':>12}{'cpu us/ev':>11}")
+    for name in next(iter(results.values())):
+        for loop, rows in results.items():
+            r = rows[name]
+            print(
+                f"{name:<22}{loop:<9}{r['frames_per_sec']:>11,.0f}{r['events_per_sec']:>11,.0f}"
+                f"{r['e2e_p50_ms']:>12.2f}{r['e2e_p99_ms']:>12.2f}{r['cpu_us_per_event']:>11.1f}"
+            )
+    if len(results) == 2:
+        base, fast = results["asyncio"], results["uvloop"]
+        cpu = statistics.median(fast[n]["cpu_us_per_event"] / base[n]["cpu_us_per_event"] for n in base)
+        frames = statistics.median(fast[n]["frames_per_sec"] / base[n]["frames_per_sec"] for n in base)
+        print(f"\nuvloop vs asyncio (median over scenarios): frames/sec x{frames:.2f}, cpu/event x{cpu:.2f}")
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import asyncio
+import json
+import time
+
+import websockets
+
+from benchmarks.harness import bot  # noqa: F401  (loads config with bench defaults)
+from config import HL_WS_URL
+from ws_manager import SUBSCRIPTION_TYPES
+
+
+async def record(wallets: list[str], out: str, duration: float, url: str):
+    async with websockets.connect(url) as ws:
+        for wallet in wallets:
+            for sub_type in SUBSCRIPTION_TYPES:
+                await ws.send(json.dumps({
+                    "method": "subscribe",
+                    "subscription": {"type": sub_type, "user": wallet.lower()},
+                }))
+
+        started = time.monotonic()
+        count = 0
+        with open(out, "w") as f:
+            while time.monotonic() - started < duration:
+                try:
+                    raw = await asyncio.wait_for(ws.recv(), timeout=1)
+                except asyncio.TimeoutError:
+                    continue
+                f.write(json.dumps({"t": round(time.monotonic() - started, 6), "raw": raw}) + "\n")
+                count += 1
+    print(f"Recorded {count} frames to {out}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record live Hyperliquid WS frames for replay.")
+    parser.add_argument("wallets", nargs="+", help="Wallet addresses to subscribe to.")
+    parser.add_argument("--out", default="frames.jsonl")
+    parser.add_argument("--duration", type=float, default=600, help="Seconds to record.")
+    parser.add_argument("--url", default=HL_WS_URL)
+    args = parser.parse_args()
+    asyncio.run(record(args.wallets, args.out, args.duration, args.url))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,276 @@
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import tempfile
+from datetime import datetime, timezone
+
+import eventloop
+from benchmarks.harness import STAGES, measure_peak_memory, replay
+from benchmarks.scenarios import SCENARIOS, load_recorded
+
+# Relative change tolerated before a metric counts as a regression. Latency
+# comparisons also need to move by at least MIN_LATENCY_DELTA_MS so that
+# sub-millisecond jitter does not fail a run.
+DEFAULT_TOLERANCE = 0.15
+MIN_LATENCY_DELTA_MS = 0.05
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Replay Hyperliquid WS frames through the notification pipeline.",
+    )
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=[*SCENARIOS, "all"],
+        help="Synthetic scenario to run (repeatable, default: all).",
+    )
+    parser.add_argument("--frames", action="append", default=[], help="Recorded frames file (JSONL).")
+    parser.add_argument("--window", type=float, default=2.0, help="Aggregation window in seconds.")
+    parser.add_argument("--send-latency-ms", type=float, default=0.0, help="Simulated Telegram send latency.")
+    parser.add_argument(
+        "--send-cpu-ms",
+        type=float,
+        default=0.0,
+        help="Simulated CPU time per Telegram call, spent on the loop that makes it.",
+    )
+    parser.add_argument("--rest-latency-ms", type=float, default=0.0, help="Simulated position lookup latency.")
+    parser.add_argument(
+        "--realtime",
+        action="store_true",
+        help="Push frames as fast as possible on the wall clock instead of replaying in simulated time.",
+    )
+    parser.add_argument(
+        "--journal",
+        action="store_true",
+        help="Append every accepted event to an on-disk journal, as the bot does by default.",
+    )
+    parser.add_argument(
+        "--funding-digest",
+        choices=["off", "wallet", "global"],
+        default="off",
+        help="Opt every wallet into the hourly funding digest, per wallet or as one global summary.",
+    )
+    parser.add_argument(
+        "--basket-window",
+        type=float,
+        default=0.0,
+        help="Combine coin batches from one wallet flushing within this many seconds (0: off).",
+    )
+    parser.add_argument(
+        "--cluster-window",
+        type=float,
+        default=0.0,
+        help="Combine same coin and direction batches across wallets within this many seconds (0: off).",
+    )
+    parser.add_argument(
+        "--aggregation",
+        choices=["window", "oid"],
+        default="window",
+        help="Batch fills per coin and direction over --window, or per order id.",
+    )
+    parser.add_argument("--idle", type=float, default=10.0, help="Idle flush timeout for --aggregation oid.")
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="Learn the aggregation window per wallet, starting from --window.",
+    )
+    parser.add_argument(
+        "--twap",
+        action="store_true",
+        help="Subscribe to the TWAP channels and report slices as progress milestones.",
+    )
+    parser.add_argument(
+        "--live-cards",
+        action="store_true",
+        help="Edit one message per wallet, coin and direction instead of sending each batch.",
+    )
+    parser.add_argument(
+        "--flood-max-events",
+        type=int,
+        default=0,
+        help="Switch a wallet to summary mode above this many events per minute (0: off).",
+    )
+    parser.add_argument(
+        "--inline-delivery",
+        action="store_true",
+        help="Send events from the WebSocket handler, without the delivery lanes.",
+    )
+    parser.add_argument(
+        "--no-delivery-queue",
+        action="store_true",
+        help="Send normal events inline from the WebSocket handler, as DELIVERY_QUEUE_ENABLED=false does.",
+    )
+    parser.add_argument(
+        "--ipc",
+        action="store_true",
+        help="Send through a separate delivery process over a Unix socket, as BOT_ROLE=ingest does (implies --realtime).",
+    )
+    parser.add_argument(
+        "--liquidation-p99-ms",
+        type=float,
+        help="Fail when any scenario's end-to-end liquidation p99 exceeds this many milliseconds.",
+    )
+    parser.add_argument(
+        "--loop",
+        choices=eventloop.LOOPS,
+        default="asyncio",
+        help="Event loop to replay on; uvloop falls back to asyncio when not installed.",
+    )
+    parser.add_argument("--no-memory", action="store_true", help="Skip the peak memory pass.")
+    parser.add_argument("--save", help="Write results as JSON to this path.")
+    parser.add_argument("--compare", help="Compare against a previously saved results file.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=DEFAULT_TOLERANCE,
+        help="Relative regression tolerance for --compare (default: 0.15).",
+    )
+    return parser.parse_args(argv)
+
+
+def selected_scenarios(args: argparse.Namespace):
+    names = args.scenario or (["all"] if not args.frames else [])
+    if "all" in names:
+        names = list(SCENARIOS)
+    scenarios = [SCENARIOS[name]() for name in dict.fromkeys(names)]
+    scenarios.extend(load_recorded(path) for path in args.frames)
+    return scenarios
+
+
+async def run(args: argparse.Namespace) -> dict:
+    journal_dir = tempfile.mkdtemp(prefix="hl-notify-journal-") if args.journal else None
+    options = {
+        "window_sec": args.window,
+        "send_latency": args.send_latency_ms / 1000,
+        "send_cpu": args.send_cpu_ms / 1000,
+        "rest_latency": args.rest_latency_ms / 1000,
+        "realtime": args.realtime or args.ipc,
+        "ipc": args.ipc,
+        "journal_dir": journal_dir,
+        "funding_digest": args.funding_digest,
+        "basket_window": args.basket_window,
+        "cluster_window": args.cluster_window,
+        "aggregation_mode": args.aggregation,
+        "idle_sec": args.idle,
+        "twap": args.twap,
+        "adaptive": args.adaptive,
+        "live_cards": args.live_cards,
+        "delivery": not args.inline_delivery,
+        "delivery_queue": not args.no_delivery_queue,
+        "flood_max_events": args.flood_max_events,
+    }
+    results = {}
+    for scenario in selected_scenarios(args):
+        result = await replay(scenario, **options)
+        if not args.no_memory:
+            result["peak_memory_kb"] = await measure_peak_memory(scenario, **options)
+        results[scenario.name] = result
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "loop": eventloop.current(),
+            "options": options,
+        },
+        "scenarios": results,
+    }
+
+
+def print_results(results: dict):
+    for name, result in results["scenarios"].items():
+        print(f"\n== {name} ==")
+        print(
+            f"frames={result['frames']} events={result['events']} "
+            f"messages={result['messages']} edits={result.get('edits', 0)} events/sec={result['events_per_sec']:,.0f} "
+            f"total={result['total_sec']:.2f}s simulated={result['simulated_sec']:.0f}s"
+        )
+        print(f"frames/sec={result['frames_per_sec']:,.0f} cpu/event={result['cpu_us_per_event']:.1f}us")
+        if "peak_memory_kb" in result:
+            print(f"peak memory: {result['peak_memory_kb']:,.0f} KiB")
+        print(f"{'stage':<12}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+        for stage in STAGES:
+            s = result["stages"][stage]
+            if not s["count"]:
+                continue
+            print(
+                f"{stage:<12}{s['count']:>8}{s['p50_ms']:>10.3f}{s['p90_ms']:>10.3f}"
+                f"{s['p99_ms']:>10.3f}{s['max_ms']:>10.3f}"
+            )
+
+
+def compare(current: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    for name, result in current["scenarios"].items():
+        old = baseline.get("scenarios", {}).get(name)
+        if not old:
+            continue
+
+        old_rate, new_rate = old["events_per_sec"], result["events_per_sec"]
+        if old_rate and new_rate < old_rate * (1 - tolerance):
+            regressions.append(
+                f"{name}: events/sec {old_rate:,.0f} -> {new_rate:,.0f} "
+                f"({(new_rate / old_rate - 1) * 100:+.1f}%)"
+            )
+
+        for stage in STAGES:
+            old_p99 = old["stages"].get(stage, {}).get("p99_ms", 0.0)
+            new_p99 = result["stages"].get(stage, {}).get("p99_ms", 0.0)
+            if (
+                new_p99 > old_p99 * (1 + tolerance)
+                and new_p99 - old_p99 > MIN_LATENCY_DELTA_MS
+            ):
+                regressions.append(f"{name}: {stage} p99 {old_p99:.3f}ms -> {new_p99:.3f}ms")
+
+        old_mem = old.get("peak_memory_kb")
+        new_mem = result.get("peak_memory_kb")
+        if old_mem and new_mem and new_mem > old_mem * (1 + tolerance):
+            regressions.append(f"{name}: peak memory {old_mem:,.0f} KiB -> {new_mem:,.0f} KiB")
+    return regressions
+
+
+def check_targets(results: dict, args: argparse.Namespace) -> list[str]:
+    misses = []
+    if args.liquidation_p99_ms is None:
+        return misses
+    for name, result in results["scenarios"].items():
+        s = result["stages"]["liquidation"]
+        if s["count"] and s["p99_ms"] > args.liquidation_p99_ms:
+            misses.append(f"{name}: liquidation p99 {s['p99_ms']:.1f}ms > {args.liquidation_p99_ms:.0f}ms")
+    return misses
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = parse_args(argv)
+    eventloop.install(args.loop)
+    results = asyncio.run(run(args))
+    print_results(results)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2)
+
+    misses = check_targets(results, args)
+    if misses:
+        print("\nTargets missed:")
+        for line in misses:
+            print(f"  {line}")
+        return 1
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print("\nRegressions:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against baseline.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,428 @@
+import json
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+
+COINS = ["BTC", "ETH", "SOL", "HYPE", "DOGE", "AVAX", "ARB", "SUI", "WIF", "kPEPE"]
+BASE_PRICES = {
+    "BTC": 97000.0,
+    "ETH": 3400.0,
+    "SOL": 190.0,
+    "HYPE": 24.0,
+    "DOGE": 0.32,
+    "AVAX": 36.0,
+    "ARB": 0.78,
+    "SUI": 4.1,
+    "WIF": 1.9,
+    "kPEPE": 0.019,
+}
+START_MS = 1_767_225_600_000
+
+
+@dataclass
+class Frame:
+    # Seconds since the start of the scenario.
+    offset: float
+    raw: str
+
+
+@dataclass
+class Scenario:
+    name: str
+    wallets: list[str]
+    frames: list[Frame] = field(default_factory=list)
+
+    @property
+    def duration(self) -> float:
+        return self.frames[-1].offset if self.frames else 0.0
+
+
+def make_wallet(rng: random.Random) -> str:
+    return "0x" + "".join(rng.choice("0123456789abcdef") for _ in range(40))
+
+
+def make_fill(
+    rng: random.Random,
+    coin: str,
+    direction: str,
+    time_ms: int,
+    tid: int,
+    oid: int,
+    px: float | None = None,
+    sz: float | None = None,
+    closed_pnl: float = 0.0,
+    liquidation: dict | None = None,
+) -> dict:
+    px = px if px is not None else BASE_PRICES[coin] * (1 + rng.uniform(-0.002, 0.002))
+    sz = sz if sz is not None else round(rng.uniform(10, 5000) / BASE_PRICES[coin], 4)
+    side = "B" if direction in ("Open Long", "Close Short") else "A"
+    fill = {
+        "coin": coin,
+        "px": f"{px:.6g}",
+        "sz": f"{sz:.6g}",
+        "side": side,
+        "time": time_ms,
+        "startPosition": "0.0",
+        "dir": direction,
+        "closedPnl": f"{closed_pnl:.6f}",
+        "hash": f"0x{tid:064x}",
+        "oid": oid,
+        "crossed": True,
+        "fee": f"{px * sz * 0.00035:.6f}",
+        "tid": tid,
+        "feeToken": "USDC",
+    }
+    if liquidation:
+        fill["liquidation"] = liquidation
+    return fill
+
+
+def fills_frame(wallet: str, fills: list[dict]) -> str:
+    return json.dumps({"channel": "userFills", "data": {"user": wallet, "fills": fills}})
+
+
+def fundings_frame(wallet: str, fundings: list[dict]) -> str:
+    return json.dumps({"channel": "userFundings", "data": {"user": wallet, "fundings": fundings}})
+
+
+def ledger_frame(wallet: str, updates: list[dict]) -> str:
+    return json.dumps({
+        "channel": "userNonFundingLedgerUpdates",
+        "data": {"user": wallet, "nonFundingLedgerUpdates": updates},
+    })
+
+
+def twap_storm(seed: int = 1, wallets: int = 200, slices: int = 40) -> Scenario:
+    # Many wallets running TWAPs at once: a steady stream of small slice fills.
+    rng = random.Random(seed)
+    scenario = Scenario("twap_storm", [make_wallet(rng) for _ in range(wallets)])
+    tid = 1
+    frames = []
+    for oid_base, wallet in enumerate(scenario.wallets):
+        coin = rng.choice(COINS)
+        direction = rng.choice(["Open Long", "Open Short", "Close Long", "Close Short"])
+        start = rng.uniform(0, 30)
+        for i in range(slices):
+            offset = start + i * 30 + rng.uniform(0, 2)
+            fills = []
+            for _ in range(rng.randint(1, 5)):
+                pnl = rng.uniform(-50, 80) if direction.startswith("Close") else 0.0
+                fills.append(make_fill(
+                    rng, coin, direction, START_MS + int(offset * 1000), tid,
+                    oid=oid_base * 1000 + i, closed_pnl=pnl,
+                ))
+                tid += 1
+            frames.append(Frame(offset, fills_frame(wallet, fills)))
+    scenario.frames = sorted(frames, key=lambda f: f.offset)
+    return scenario
+
+
+def twap_history_frame(wallet: str, twap_id: int, coin: str, side: str, sz: float, status: str, time_ms: int,
+                       executed_sz: float = 0.0, executed_ntl: float = 0.0) -> str:
+    entry = {
+        "time": time_ms // 1000,
+        "twapId": twap_id,
+        "state": {
+            "coin": coin,
+            "user": wallet,
+            "side": side,
+            "sz": f"{sz:.6g}",
+            "executedSz": f"{executed_sz:.6g}",
+            "executedNtl": f"{executed_ntl:.6g}",
+            "minutes": 30,
+            "reduceOnly": False,
+            "randomize": False,
+            "timestamp": time_ms,
+        },
+        "status": {"status": status},
+    }
+    return json.dumps({"channel": "userTwapHistory", "data": {"user": wallet, "history": [entry]}})
+
+
+def twap_slices(seed: int = 7, wallets: int = 100, slices: int = 60) -> Scenario:
+    # 30 minute TWAPs as the exchange reports them: an activation, every
+    # slice on both userFills and userTwapSliceFills (in either order), and a
+    # final status once the order is done.
+    rng = random.Random(seed)
+    scenario = Scenario("twap_slices", [make_wallet(rng) for _ in range(wallets)])
+    tid = 1
+    frames = []
+    for twap_id, wallet in enumerate(scenario.wallets, start=1):
+        coin = rng.choice(COINS)
+        direction = rng.choice(["Open Long", "Open Short"])
+        side = "B" if direction == "Open Long" else "A"
+        start = rng.uniform(0, 30)
+        slice_sz = round(rng.uniform(50, 500) / BASE_PRICES[coin], 4)
+        target = slice_sz * slices
+        frames.append(Frame(start, twap_history_frame(
+            wallet, twap_id, coin, side, target, "activated", START_MS + int(start * 1000),
+        )))
+        executed_ntl = 0.0
+        for i in range(slices):
+            offset = start + (i + 1) * 30 + rng.uniform(0, 2)
+            fill = make_fill(rng, coin, direction, START_MS + int(offset * 1000), tid, oid=tid, sz=slice_sz)
+            tid += 1
+            executed_ntl += float(fill["px"]) * slice_sz
+            twap_frame = json.dumps({
+                "channel": "userTwapSliceFills",
+                "data": {"user": wallet, "twapSliceFills": [{"fill": fill, "twapId": twap_id}]},
+            })
+            lag = rng.uniform(0.05, 0.5)
+            if rng.random() < 0.5:
+                frames.append(Frame(offset, fills_frame(wallet, [fill])))
+                frames.append(Frame(offset + lag, twap_frame))
+            else:
+                frames.append(Frame(offset, twap_frame))
+                frames.append(Frame(offset + lag, fills_frame(wallet, [fill])))
+        end = start + (slices + 1) * 30 + 5
+        frames.append(Frame(end, twap_history_frame(
+            wallet, twap_id, coin, side, target, "finished", START_MS + int(end * 1000),
+            executed_sz=target, executed_ntl=executed_ntl,
+        )))
+    scenario.frames = sorted(frames, key=lambda f: f.offset)
+    return scenario
+
+
+def hourly_funding(seed: int = 2, wallets: int = 1000, hours: int = 1) -> Scenario:
+    # Every watched wallet receives funding for each open position on the hour.
+    rng = random.Random(seed)
+    scenario = Scenario("hourly_funding", [make_wallet(rng) for _ in range(wallets)])
+    positions = {
+        wallet: rng.sample(COINS, rng.randint(1, 6))
+        for wallet in scenario.wallets
+    }
+    frames = []
+    for hour in range(hours):
+        for wallet, coins in positions.items():
+            offset = hour * 3600 + rng.uniform(0, 5)
+            fundings = []
+            for coin in coins:
+                szi = rng.uniform(-5000, 5000) / BASE_PRICES[coin]
+                rate = rng.uniform(-0.00005, 0.00012)
+                fundings.append({
+                    "time": START_MS + int(offset * 1000),
+                    "coin": coin,
+                    "usdc": f"{-szi * BASE_PRICES[coin] * rate:.6f}",
+                    "szi": f"{szi:.4f}",
+                    "fundingRate": f"{rate:.10f}",
+                })
+            frames.append(Frame(offset, fundings_frame(wallet, fundings)))
+    scenario.frames = sorted(frames, key=lambda f: f.offset)
+    return scenario
+
+
+def liquidation_cascade(seed: int = 3, wallets: int = 300, steps: int = 60) -> Scenario:
+    # A falling market: liquidations interleaved with panic closes and withdrawals.
+    rng = random.Random(seed)
+    scenario = Scenario("liquidation_cascade", [make_wallet(rng) for _ in range(wallets)])
+    frames = []
+    tid = 10_000_000
+    coin = "ETH"
+    price = BASE_PRICES[coin]
+    for step in range(steps):
+        price *= 1 - rng.uniform(0.001, 0.006)
+        offset = step * 0.5
+        for wallet in rng.sample(scenario.wallets, rng.randint(3, 12)):
+            t = START_MS + int((offset + rng.uniform(0, 0.4)) * 1000)
+            if rng.random() < 0.4:
+                liquidation = {
+                    "liquidatedUser": wallet,
+                    "markPx": f"{price:.2f}",
+                    "method": "market",
+                }
+                fill = make_fill(
+                    rng, coin, "Close Long", t, tid, oid=tid, px=price,
+                    closed_pnl=-rng.uniform(100, 20000), liquidation=liquidation,
+                )
+                frames.append(Frame(offset, fills_frame(wallet, [fill])))
+                tid += 1
+            elif rng.random() < 0.8:
+                fills = []
+                for _ in range(rng.randint(1, 8)):
+                    fills.append(make_fill(
+                        rng, coin, "Close Long", t, tid, oid=tid // 8, px=price,
+                        closed_pnl=-rng.uniform(0, 5000),
+                    ))
+                    tid += 1
+                frames.append(Frame(offset, fills_frame(wallet, fills)))
+            else:
+                frames.append(Frame(offset, ledger_frame(wallet, [{
+                    "time": t,
+                    "hash": f"0x{tid:064x}",
+                    "delta": {"type": "withdraw", "usdc": f"{rng.uniform(100, 50000):.2f}"},
+                }])))
+                tid += 1
+    scenario.frames = sorted(frames, key=lambda f: f.offset)
+    return scenario
+
+
+def funding_liquidations(seed: int = 8, wallets: int = 300, liquidations: int = 40) -> Scenario:
+    # Liquidations landing in the middle of the on-the-hour funding burst,
+    # when every other wallet is also being sent a funding notification.
+    rng = random.Random(seed)
+    scenario = Scenario("funding_liquidations", [make_wallet(rng) for _ in range(wallets)])
+    frames = []
+    for wallet in scenario.wallets:
+        offset = rng.uniform(0, 5)
+        fundings = []
+        for coin in rng.sample(COINS, rng.randint(1, 4)):
+            szi = rng.uniform(-5000, 5000) / BASE_PRICES[coin]
+            rate = rng.uniform(-0.00005, 0.00012)
+            fundings.append({
+                "time": START_MS + int(offset * 1000),
+                "coin": coin,
+                "usdc": f"{-szi * BASE_PRICES[coin] * rate:.6f}",
+                "szi": f"{szi:.4f}",
+                "fundingRate": f"{rate:.10f}",
+            })
+        frames.append(Frame(offset, fundings_frame(wallet, fundings)))
+    tid = 20_000_000
+    for wallet in rng.sample(scenario.wallets, liquidations):
+        offset = rng.uniform(0, 5)
+        coin = rng.choice(COINS)
+        liquidation = {"liquidatedUser": wallet, "markPx": f"{BASE_PRICES[coin]:.6g}", "method": "market"}
+        fill = make_fill(
+            rng, coin, "Close Long", START_MS + int(offset * 1000), tid, oid=tid,
+            closed_pnl=-rng.uniform(100, 20000), liquidation=liquidation,
+        )
+        frames.append(Frame(offset, fills_frame(wallet, [fill])))
+        tid += 1
+    scenario.frames = sorted(frames, key=lambda f: f.offset)
+    return scenario
+
+
+def large_orders(seed: int = 6, wallets: int = 50, orders: int = 20) -> Scenario:
+    # Big orders that fill in pieces over up to 15 seconds, sometimes with a
+    # second, unrelated order on the same coin starting a moment later.
+    rng = random.Random(seed)
+    scenario = Scenario("large_orders", [make_wallet(rng) for _ in range(wallets)])
+    frames = []
+    tid = 40_000_000
+    oid = 1
+    for wallet in scenario.wallets:
+        for i in range(orders):
+            offset = i * 120 + rng.uniform(0, 60)
+            coin = rng.choice(COINS)
+            direction = rng.choice(["Open Long", "Open Short"])
+            starts = [offset]
+            if rng.random() < 0.3:
+                starts.append(offset + rng.uniform(0.2, 1.5))
+            for start in starts:
+                elapsed = 0.0
+                for _ in range(rng.randint(2, 8)):
+                    t = START_MS + int((start + elapsed) * 1000)
+                    fill = make_fill(rng, coin, direction, t, tid, oid=oid)
+                    frames.append(Frame(start + elapsed, fills_frame(wallet, [fill])))
+                    tid += 1
+                    elapsed += rng.uniform(0.5, 3.5)
+                oid += 1
+    scenario.frames = sorted(frames, key=lambda f: f.offset)
+    return scenario
+
+
+def market_maker(seed: int = 9, makers: int = 2, wallets: int = 20, minutes: int = 60) -> Scenario:
+    # Market-maker wallets filling on both sides about once a second for
+    # three quarters of the run and then going quiet, next to ordinary wallets
+    # trading every few minutes.
+    rng = random.Random(seed)
+    scenario = Scenario("market_maker", [make_wallet(rng) for _ in range(makers + wallets)])
+    frames = []
+    tid = 30_000_000
+    busy_until = minutes * 45
+    for i, wallet in enumerate(scenario.wallets):
+        offset = rng.uniform(0, 5)
+        while offset < minutes * 60:
+            maker = i < makers and offset < busy_until
+            coin = rng.choice(COINS[:3] if maker else COINS)
+            direction = rng.choice(["Open Long", "Close Long", "Open Short", "Close Short"])
+            pnl = rng.uniform(-50, 60) if direction.startswith("Close") else 0.0
+            fill = make_fill(rng, coin, direction, START_MS + int(offset * 1000), tid, oid=tid, closed_pnl=pnl)
+            frames.append(Frame(offset, fills_frame(wallet, [fill])))
+            tid += 1
+            offset += rng.expovariate(1.0) if maker else rng.uniform(120, 480)
+    scenario.frames = sorted(frames, key=lambda f: f.offset)
+    return scenario
+
+
+def rebalance(seed: int = 4, wallets: int = 100, rounds: int = 10) -> Scenario:
+    # Portfolio wallets closing or rotating many coins at once, a few fills
+    # per coin, every five minutes.
+    rng = random.Random(seed)
+    scenario = Scenario("rebalance", [make_wallet(rng) for _ in range(wallets)])
+    frames = []
+    tid = 20_000_000
+    for wallet in scenario.wallets:
+        start = rng.uniform(0, 60)
+        for r in range(rounds):
+            offset = start + r * 300
+            for coin in rng.sample(COINS, rng.randint(4, len(COINS))):
+                direction = rng.choice(["Close Long", "Close Short", "Open Long", "Open Short"])
+                t = START_MS + int((offset + rng.uniform(0, 0.5)) * 1000)
+                fills = []
+                oid = tid
+                for _ in range(rng.randint(1, 3)):
+                    pnl = rng.uniform(-500, 500) if direction.startswith("Close") else 0.0
+                    fills.append(make_fill(rng, coin, direction, t, tid, oid=oid, closed_pnl=pnl))
+                    tid += 1
+                frames.append(Frame(offset + rng.uniform(0, 0.5), fills_frame(wallet, fills)))
+    scenario.frames = sorted(frames, key=lambda f: f.offset)
+    return scenario
+
+
+def copy_trading(seed: int = 5, leaders: int = 20, followers: int = 5, trades: int = 30) -> Scenario:
+    # Groups of wallets mirroring a leader: each leader trade is copied by
+    # its followers within a second or so, at slightly different prices.
+    rng = random.Random(seed)
+    groups = [[make_wallet(rng) for _ in range(followers + 1)] for _ in range(leaders)]
+    scenario = Scenario("copy_trading", [wallet for group in groups for wallet in group])
+    frames = []
+    tid = 30_000_000
+    for group in groups:
+        for i in range(trades):
+            offset = i * 60 + rng.uniform(0, 50)
+            coin = rng.choice(COINS)
+            direction = rng.choice(["Open Long", "Open Short", "Close Long", "Close Short"])
+            for n, wallet in enumerate(group):
+                delay = 0.0 if n == 0 else rng.uniform(0.1, 1.5)
+                t = START_MS + int((offset + delay) * 1000)
+                pnl = rng.uniform(-200, 300) if direction.startswith("Close") else 0.0
+                fill = make_fill(rng, coin, direction, t, tid, oid=tid, closed_pnl=pnl)
+                tid += 1
+                frames.append(Frame(offset + delay, fills_frame(wallet, [fill])))
+    scenario.frames = sorted(frames, key=lambda f: f.offset)
+    return scenario
+
+
+def load_recorded(path: str | Path) -> Scenario:
+    # Frames captured with `python -m benchmarks.record`: one JSON object per
+    # line with `t` (seconds offset) and `raw` (the frame text as received).
+    path = Path(path)
+    frames = []
+    wallets = set()
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            entry = json.loads(line)
+            frames.append(Frame(float(entry["t"]), entry["raw"]))
+            try:
+                user = json.loads(entry["raw"]).get("data", {}).get("user")
+            except (json.JSONDecodeError, AttributeError):
+                user = None
+            if isinstance(user, str):
+                wallets.add(user.lower())
+    return Scenario(path.stem, sorted(wallets), sorted(frames, key=lambda f: f.offset))
+
+
+SCENARIOS = {
+    "twap_storm": twap_storm,
+    "hourly_funding": hourly_funding,
+    "liquidation_cascade": liquidation_cascade,
+    "large_orders": large_orders,
+    "rebalance": rebalance,
+    "copy_trading": copy_trading,
+    "twap_slices": twap_slices,
+    "funding_liquidations": funding_liquidations,
+    "market_maker": market_maker,
+}
@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+
+from benchmarks.fake_hyperliquid import FakeConfig, FakeHyperliquid
+from benchmarks.harness import percentile, seed_wallets
+from benchmarks.loadgen import generate_wallets
+from ws_manager import WSManager
+
+MODES = ["drop", "stall", "half_open"]
+
+
+def event_key(wallet: str, data: dict) -> tuple:
+    if "tid" in data:
+        return ("fill", wallet, data["tid"])
+    if "hash" in data:
+        return ("ledger", wallet, data["hash"])
+    return ("funding", wallet, data.get("time"), data.get("coin"))
+
+
+class GapLedger:
+    def __init__(self):
+        self.generated: dict[tuple, float] = {}
+        self.received: dict[tuple, list[float]] = defaultdict(list)
+
+    def on_emit(self, wallet: str, channel: str, event: dict, delivered: bool):
+        self.generated[event_key(wallet, event)] = time.monotonic()
+
+    async def on_event(self, wallet: str, event_type: str, data: dict):
+        self.received[event_key(wallet, data)].append(time.monotonic())
+
+    def window_stats(self, start: float, end: float) -> dict:
+        generated = [k for k, t in self.generated.items() if start <= t <= end]
+        missed = sum(1 for k in generated if k not in self.received)
+        duplicated = sum(1 for k in generated if len(self.received.get(k, ())) > 1)
+        return {"generated": len(generated), "missed": missed, "duplicated": duplicated}
+
+    def first_receive_after(self, start: float) -> float | None:
+        times = [
+            received[0]
+            for key, received in self.received.items()
+            if self.generated.get(key, 0) >= start
+        ]
+        return min(times) if times else None
+
+
+async def wait_for(predicate, timeout: float, poll: float = 0.05) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        await asyncio.sleep(poll)
+    return predicate()
+
+
+async def run(args: argparse.Namespace) -> dict:
+    wallets = generate_wallets(args.wallets, args.seed)
+    seed_wallets(wallets)
+    server = FakeHyperliquid(FakeConfig(
+        rate=args.rate,
+        wallets=wallets,
+        stall_duration=args.stall_duration,
+        half_open_timeout=args.half_open_timeout,
+        drop_subscribe_rate=args.drop_subscribes,
+        seed=args.seed,
+    ))
+    ledger = GapLedger()
+    server.on_emit = ledger.on_emit
+    await server.start()
+
+    manager = WSManager(
+        on_event=ledger.on_event,
+        url=server.ws_url,
+        subscription_mode=args.subscription_mode,
+        connections=args.connections,
+        ping_interval_sec=args.ping_interval,
+        stale_after_sec=args.stale_after,
+        ack_timeout_sec=args.ack_timeout,
+    )
+    await manager.start()
+    rng = random.Random(args.seed)
+    incidents = []
+    try:
+        # The subscription count depends on the mode, so take it from the
+        # manager once it has subscribed every wallet.
+        subscribed = manager._connections[0].wallet_subscriptions
+        if await wait_for(lambda: len(subscribed) == len(wallets), timeout=args.recovery_timeout):
+            server.expected_subscriptions = sum(len(types) for types in subscribed.values())
+        if not server.expected_subscriptions or not await wait_for(
+            lambda: sum(
+                len(c.subscriptions) >= server.expected_subscriptions for c in server.connections
+            ) >= args.connections,
+            timeout=args.recovery_timeout,
+        ):
+            raise RuntimeError("Client never finished its initial subscriptions")
+
+        for _ in range(args.incidents):
+            await asyncio.sleep(args.interval)
+            mode = rng.choice(args.modes)
+            injected = asyncio.create_task(server.inject(mode, victims=args.victims))
+            await asyncio.sleep(0)
+            incident = server.incidents[-1]
+            await wait_for(lambda: incident.resubscribed_at is not None, args.recovery_timeout)
+            await wait_for(lambda: ledger.first_receive_after(incident.started_at) is not None, args.recovery_timeout)
+            await injected
+            incidents.append(incident)
+
+        await asyncio.sleep(args.settle)
+    finally:
+        await manager.stop()
+        await server.stop()
+
+    results = []
+    for incident in incidents:
+        first_event = ledger.first_receive_after(incident.started_at)
+        end = incident.resubscribed_at or incident.ended_at or incident.started_at
+        results.append({
+            "mode": incident.mode,
+            "time_to_first_event": first_event - incident.started_at if first_event else None,
+            "time_to_resubscribed": (
+                incident.resubscribed_at - incident.started_at if incident.resubscribed_at else None
+            ),
+            **ledger.window_stats(incident.started_at, end),
+        })
+
+    totals = ledger.window_stats(0, time.monotonic())
+    return {
+        "wallets": len(wallets),
+        "subscriptions": server.expected_subscriptions,
+        "dropped_subscribes": server.dropped_subscribes,
+        "dedupe": manager.stats(),
+        "incidents": results,
+        "totals": totals,
+    }
+
+
+def check_slos(result: dict, args: argparse.Namespace) -> list[str]:
+    violations = []
+    for i, incident in enumerate(result["incidents"], 1):
+        label = f"incident {i} ({incident['mode']})"
+        for field, limit in (
+            ("time_to_first_event", args.slo_first_event),
+            ("time_to_resubscribed", args.slo_resubscribed),
+        ):
+            value = incident[field]
+            if limit is None:
+                continue
+            if value is None or value > limit:
+                shown = "never" if value is None else f"{value:.2f}s"
+                violations.append(f"{label}: {field} {shown} > {limit:g}s")
+        for field, limit in (
+            ("missed", args.slo_missed),
+            ("duplicated", args.slo_duplicated),
+        ):
+            if limit is not None and incident[field] > limit:
+                violations.append(f"{label}: {field} {incident[field]} > {limit}")
+    return violations
+
+
+def print_results(result: dict):
+    print(f"{result['wallets']} wallets, {result['subscriptions']} subscriptions")
+    print(f"{'#':>3} {'mode':<10}{'first event':>13}{'resubscribed':>14}{'generated':>11}{'missed':>8}{'dups':>6}")
+    for i, incident in enumerate(result["incidents"], 1):
+        first = incident["time_to_first_event"]
+        resub = incident["time_to_resubscribed"]
+        print(
+            f"{i:>3} {incident['mode']:<10}"
+            f"{(f'{first:.2f}s' if first is not None else 'never'):>13}"
+            f"{(f'{resub:.2f}s' if resub is not None else 'never'):>14}"
+            f"{incident['generated']:>11}{incident['missed']:>8}{incident['duplicated']:>6}"
+        )
+
+    firsts = [i["time_to_first_event"] for i in result["incidents"] if i["time_to_first_event"] is not None]
+    if firsts:
+        print(f"time to first event: p50={percentile(firsts, 50):.2f}s max={max(firsts):.2f}s")
+    dedupe = result["dedupe"]
+    stale = sum(conn["stale_reconnects"] for conn in dedupe["connections"])
+    if stale:
+        print(f"stale reconnects: {stale}")
+    if result["dropped_subscribes"]:
+        retries = sum(conn["retries"] for conn in dedupe["connections"])
+        print(f"dropped subscribes: {result['dropped_subscribes']}, retried: {retries}")
+    if len(dedupe["connections"]) > 1:
+        print(f"suppressed duplicates: {dedupe['suppressed']} ({dedupe['suppression_rate'] * 100:.1f}%)")
+        for i, conn in enumerate(dedupe["connections"]):
+            print(
+                f"  connection {i}: first={conn['first']} ({conn['lead_rate'] * 100:.0f}%) "
+                f"lag avg={conn['avg_lag_ms']:.1f}ms max={conn['max_lag_ms']:.1f}ms reconnects={conn['reconnects']}"
+            )
+    totals = result["totals"]
+    print(
+        f"totals: generated={totals['generated']} missed={totals['missed']} "
+        f"duplicated={totals['duplicated']}"
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(
+        description="Soak WSManager reconnect recovery against a fake Hyperliquid that drops, stalls and half-opens.",
+    )
+    parser.add_argument("--wallets", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=2.0, help="Events/sec per wallet.")
+    parser.add_argument("--incidents", type=int, default=6)
+    parser.add_argument("--interval", type=float, default=10.0, help="Seconds of healthy traffic between incidents.")
+    parser.add_argument("--modes", type=lambda v: v.split(","), default=MODES, help="Comma separated incident types.")
+    parser.add_argument("--stall-duration", type=float, default=10.0)
+    parser.add_argument("--half-open-timeout", type=float, default=120.0)
+    parser.add_argument("--recovery-timeout", type=float, default=180.0)
+    parser.add_argument("--settle", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ping-interval", type=float, default=10.0, help="App-level ping interval (0: off).")
+    parser.add_argument(
+        "--stale-after",
+        type=float,
+        default=30.0,
+        help="Reconnect after this many seconds without a frame (0: rely on the socket failing).",
+    )
+    parser.add_argument(
+        "--drop-subscribes",
+        type=float,
+        default=0.0,
+        help="Fraction of subscribe requests the fake server silently ignores.",
+    )
+    parser.add_argument(
+        "--ack-timeout",
+        type=float,
+        default=5.0,
+        help="Resend subscriptions unacknowledged after this many seconds (0: never).",
+    )
+    parser.add_argument("--connections", type=int, default=1, help="Redundant WSManager connections.")
+    parser.add_argument(
+        "--victims",
+        type=int,
+        default=None,
+        help="Connections hit by each incident (default: all).",
+    )
+    parser.add_argument(
+        "--subscription-mode",
+        choices=["channels", "events"],
+        default="channels",
+        help="WSManager subscription mode.",
+    )
+    parser.add_argument("--slo-first-event", type=float, default=10.0, help="Max seconds to first event after an incident.")
+    parser.add_argument("--slo-resubscribed", type=float, default=10.0, help="Max seconds until fully resubscribed.")
+    parser.add_argument("--slo-missed", type=int, default=None, help="Max missed events per incident.")
+    parser.add_argument("--slo-duplicated", type=int, default=0, help="Max duplicated events per incident.")
+    parser.add_argument("--save", help="Write results as JSON to this path.")
+    args = parser.parse_args()
+
+    unknown = set(args.modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+    result = asyncio.run(run(args))
+    print_results(result)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(result, f, indent=2)
+
+    violations = check_slos(result, args)
+    if violations:
+        print("\nSLO violations:")
+        for line in violations:
+            print(f"  {line}")
+        return 1
+    print("\nAll SLOs met.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
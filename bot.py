@@ -1,32 +1,123 @@
+import asyncio
+from collections import OrderedDict
 from datetime import datetime, timezone
 import hashlib
 import logging
+import math
 from pathlib import Path
 import re
+import signal
 
 from telegram import BotCommand, Update
+from telegram.error import BadRequest
 from telegram.ext import (
     Application,
     CommandHandler,
     CallbackQueryHandler,
     ContextTypes,
+    MessageHandler,
+    filters,
 )
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 
-from config import TELEGRAM_BOT_TOKEN, TELEGRAM_USER_ID
+from config import (
+    AGGREGATION_ADAPTIVE,
+    AGGREGATION_ADAPTIVE_PER_COIN,
+    AGGREGATION_IDLE_SEC,
+    AGGREGATION_MAX_WINDOW_SEC,
+    AGGREGATION_MIN_WINDOW_SEC,
+    AGGREGATION_MODE,
+    AGGREGATION_WINDOW_SEC,
+    ANALYTICS_SNAPSHOT_SEC,
+    BASKET_WINDOW_SEC,
+    BOT_ROLE,
+    CLUSTER_WINDOW_SEC,
+    DATA_DIR,
+    DELIVERY_QUEUE_ENABLED,
+    EVENT_LOOP,
+    FLOOD_MAX_EVENTS,
+    FLOOD_RESUME_EVENTS,
+    FLOOD_SUMMARY_SEC,
+    FLOOD_WINDOW_SEC,
+    FUNDING_DIGEST_MODE,
+    FUNDING_DIGEST_WINDOW_SEC,
+    HISTORY_CACHE_MB,
+    HISTORY_ENABLED,
+    IPC_SOCKET,
+    JOURNAL_ENABLED,
+    JOURNAL_MAX_MB,
+    JOURNAL_RETENTION_HOURS,
+    JOURNAL_SEGMENT_MB,
+    LIQ_PROXIMITY_PCT,
+    LIQ_PROXIMITY_RESYNC_SEC,
+    LIVE_CARDS_ENABLED,
+    LIVE_CARDS_EDIT_INTERVAL_SEC,
+    LIVE_CARDS_SESSION_SEC,
+    ORDER_UPDATES_ENABLED,
+    POSITION_PREFETCH_TIMEOUT_SEC,
+    PRICE_ALERTS_ENABLED,
+    TELEGRAM_BOT_TOKEN,
+    TELEGRAM_USER_ID,
+    TWAP_ENABLED,
+    TWAP_IDLE_SEC,
+    TWAP_MILESTONES,
+    WS_CONNECTIONS,
+    WS_PING_INTERVAL_SEC,
+    WS_STALE_SEC,
+    WS_SUBSCRIPTION_MODE,
+)
 import storage
 from formatter import (
+    format_alert_list,
+    format_liq_proximity,
+    format_price_alert,
+    format_history,
+    format_pnl,
     format_liquidation,
     format_funding,
+    format_funding_digest,
     format_transfer,
     format_aggregated_fills,
+    format_basket,
+    format_cluster,
+    format_flood_notice,
+    format_flood_summary,
     format_positions,
+    format_twap_progress,
     short_addr,
 )
 from ws_manager import WSManager
-from aggregator import FillAggregator
+from delivery import Delivery
+import eventloop
+from ipc import (
+    IPCClient,
+    IPCServer,
+    RemoteApplication,
+    RemoteBot,
+    RemoteContext,
+    RemoteUpdate,
+    parse_command,
+    update_body,
+)
+from aggregator import (
+    BasketAggregator,
+    ClusterAggregator,
+    FillAggregator,
+    FloodGuard,
+    FloodSummary,
+    FundingDigest,
+    LiveCards,
+    TwapAggregator,
+    TwapState,
+    WindowLearner,
+)
+from alerts import ABOVE, BELOW, LiquidationWarning, LiquidationWatch, PriceAlert, PriceAlerts
+from journal import Journal
+from history import HistoryStore
+from analytics import Analytics
 from hyperliquid_api import (
     close_http_session,
+    get_market_prices,
     get_position_info,
     get_positions_report,
     http_session_ready,
@@ -40,10 +131,29 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 ETH_ADDRESS_RE = re.compile(r"^0x[0-9a-fA-F]{40}$")
+TELEGRAM_MESSAGE_LIMIT = 4096
+HISTORY_RANGE_RE = re.compile(r"^(\d+)([hdw])$")
+HISTORY_RANGE_UNITS = {"h": 3600, "d": 86400, "w": 7 * 86400}
 
 ws_manager: WSManager | None = None
 fill_aggregator: FillAggregator | None = None
-app: Application | None = None
+basket_aggregator: BasketAggregator | None = None
+cluster_aggregator: ClusterAggregator | None = None
+funding_digest: FundingDigest | None = None
+twap_aggregator: TwapAggregator | None = None
+live_cards: LiveCards | None = None
+delivery: Delivery | None = None
+flood_guard: FloodGuard | None = None
+price_alerts: PriceAlerts | None = None
+liq_watch: LiquidationWatch | None = None
+liq_resync_task: asyncio.Task | None = None
+journal: Journal | None = None
+history_store: HistoryStore | None = None
+analytics: Analytics | None = None
+app: Application | RemoteApplication | None = None
+# Split deployment (BOT_ROLE=ingest/delivery): each process holds one end.
+ipc_client: IPCClient | None = None
+ipc_server: IPCServer | None = None
 STARTED_AT = datetime.now(timezone.utc)
 
 
@@ -74,7 +184,12 @@ BOT_COMMANDS = [
     BotCommand("list", "Show watched wallets"),
     BotCommand("events", "Toggle event types for a wallet"),
     BotCommand("fundingfilter", "View or update funding alert thresholds"),
+    BotCommand("fundingdigest", "Collapse hourly funding into one summary"),
     BotCommand("positions", "Show open positions and PnL"),
+    BotCommand("pnl", "Show realized PnL, fees and funding"),
+    BotCommand("history", "Summarize stored fills, funding and transfers"),
+    BotCommand("windows", "Show learned fill aggregation windows"),
+    BotCommand("alert", "Set, list or remove price alerts"),
     BotCommand("status", "Show WebSocket status and build info"),
 ]
 
@@ -87,7 +202,11 @@ def format_command_help() -> str:
 
 
 def format_uptime() -> str:
-    elapsed = int((datetime.now(timezone.utc) - STARTED_AT).total_seconds())
+    return format_duration((datetime.now(timezone.utc) - STARTED_AT).total_seconds())
+
+
+def format_duration(seconds: float) -> str:
+    elapsed = int(seconds)
     hours, remainder = divmod(elapsed, 3600)
     minutes, seconds = divmod(remainder, 60)
     if hours:
@@ -120,6 +239,17 @@ def parse_optional_threshold(raw: str) -> float | None:
     return value
 
 
+def parse_history_range(raw: str) -> int | None:
+    # Returns the lookback in seconds, or None for "all".
+    raw = raw.lower()
+    if raw == "all":
+        return None
+    match = HISTORY_RANGE_RE.match(raw)
+    if not match or int(match.group(1)) == 0:
+        raise ValueError("Range must look like 24h, 7d, 4w or all")
+    return int(match.group(1)) * HISTORY_RANGE_UNITS[match.group(2)]
+
+
 def format_threshold(value: float | None, suffix: str = "") -> str:
     if value is None:
         return "off"
@@ -151,7 +281,10 @@ def format_funding_rule(filters: dict) -> str:
 
 
 def should_send_funding_notification(wallet: str, funding: dict) -> bool:
-    filters = storage.get_funding_filters(wallet)
+    return funding_passes_filters(storage.get_funding_filters(wallet), funding)
+
+
+def funding_passes_filters(filters: dict | None, funding: dict) -> bool:
     if not filters:
         return False
 
@@ -191,6 +324,7 @@ def format_funding_config(address: str, filters: dict) -> str:
         f"Annualized threshold: {annualized}\n"
         f"USD threshold: {usdc}\n"
         f"Rule: {format_funding_rule(filters)}\n"
+        f"Digest: {'on' if storage.get_funding_digest(address) else 'off'}\n"
         f"Usage: /fundingfilter {address} <annualized_pct|off> <usd|off>\n"
         f"Example: /fundingfilter {address} off 5"
     )
@@ -204,22 +338,299 @@ def auth(func):
     return wrapper
 
 
-async def send_aggregated_fills(wallet: str, fills: list[dict]):
-    if not storage.is_event_enabled(wallet, "fills"):
+def record_event(wallet: str, event_type: str, data: dict):
+    if analytics:
+        analytics.record(wallet, event_type, data)
+    if history_store:
+        history_store.append(wallet, event_type, data)
+    if journal:
+        data["_offset"] = journal.append(wallet, event_type, data)
+
+
+def acknowledge(*events: dict):
+    offsets = [e.pop("_offset") for e in events if "_offset" in e]
+    if journal and offsets:
+        journal.ack(*offsets)
+
+
+async def handle_event(wallet: str, event_type: str, data: dict):
+    # Recording never awaits: the journal append only encodes into memory and
+    # the fsync is left to its group commit. It has to come first so that a
+    # liquidation lost mid-send is still redelivered.
+    record_event(wallet, event_type, data)
+    if event_type != "liquidations" and flood_guard and not await flood_guard.admit(wallet, event_type, data):
+        return
+    if not delivery:
+        await deliver_event(wallet, event_type, data)
+    elif event_type == "liquidations":
+        delivery.submit_urgent(deliver_event, wallet, event_type, data)
+    else:
+        await delivery.submit(deliver_event, wallet, event_type, data)
+
+
+async def handle_fill(wallet: str, fill: dict):
+    record_event(wallet, "fills", fill)
+    if flood_guard and not await flood_guard.admit(wallet, "fills", fill):
+        return
+    # A fill joining an open live card is rendered with the card's position
+    # info, so it needs no lookup of its own.
+    if fill.get("dir") in OPENING_DIRECTIONS and not (
+        live_cards and live_cards.is_open(wallet, fill.get("coin", ""), fill["dir"])
+    ):
+        prefetch_position(wallet, fill.get("coin", ""))
+    if liq_watch is not None:
+        schedule_position_sync(wallet)
+    await fill_aggregator.add_fill(wallet, fill)
+
+
+# Opening batches are enriched with leverage and liquidation price. The
+# lookup starts with the first opening fill and runs while the aggregation
+# window is open, so the alert waits for the longer of the two rather than
+# both. A prefetch older than POSITION_PREFETCH_MAX_AGE_SEC, on the fill
+# aggregator's clock, is not reused for a later batch.
+OPENING_DIRECTIONS = ("Open Long", "Open Short")
+POSITION_PREFETCH_MAX_AGE_SEC = 30.0
+position_prefetch: dict[tuple[str, str], tuple[float, asyncio.Task]] = {}
+
+
+def prefetch_position(wallet: str, coin: str):
+    key = (wallet, coin)
+    now = fill_aggregator.clock.time()
+    entry = position_prefetch.get(key)
+    if entry and now - entry[0] < POSITION_PREFETCH_MAX_AGE_SEC:
         return
+    if entry:
+        entry[1].cancel()
+    position_prefetch[key] = (now, asyncio.create_task(get_position_info(wallet, coin)))
+
+
+def discard_prefetch(wallet: str, fills: list[dict]):
+    # Batches that leave the single-batch path (baskets, clusters, wallets
+    # with fills turned off) never read their lookup; drop it so the
+    # wallet's next batch starts a fresh one.
+    for coin in {fill.get("coin", "") for fill in fills if fill.get("dir") in OPENING_DIRECTIONS}:
+        entry = position_prefetch.pop((wallet, coin), None)
+        if entry:
+            entry[1].cancel()
+
+
+async def fetch_position_info(wallet: str, coin: str) -> dict | None:
+    entry = position_prefetch.pop((wallet, coin), None)
+    if entry is None:
+        # Redelivered batches never went through handle_fill.
+        return await get_position_info(wallet, coin)
+    try:
+        return await asyncio.wait_for(entry[1], POSITION_PREFETCH_TIMEOUT_SEC)
+    except asyncio.TimeoutError:
+        logger.warning(f"Position lookup for {short_addr(wallet)} {coin} timed out; sending without it")
+        return None
+
+
+# Any fill can change a position's size and liquidation price. The wallet's
+# positions are re-read POSITION_SYNC_DELAY_SEC after a fill, so a burst of
+# fills costs one lookup; the periodic resync covers price-driven changes
+# to cross-margin liquidation prices.
+POSITION_SYNC_DELAY_SEC = 1.0
+position_sync: dict[str, asyncio.Task] = {}
+
 
-    if not fills:
+def schedule_position_sync(wallet: str):
+    if wallet not in position_sync:
+        position_sync[wallet] = asyncio.create_task(sync_positions(wallet, POSITION_SYNC_DELAY_SEC))
+
+
+async def sync_positions(wallet: str, delay: float = 0.0):
+    if delay:
+        await fill_aggregator.clock.sleep(delay)
+    # Fills arriving from here on schedule a fresh lookup.
+    position_sync.pop(wallet, None)
+    try:
+        report = await get_positions_report(wallet)
+    except Exception as e:
+        logger.error(f"Position sync for {short_addr(wallet)} failed: {e}")
         return
+    if report["status"] == "error":
+        return
+    # Positions on a DEX that did not answer are kept as they were.
+    liq_watch.replace(wallet, report["positions"], complete=not report["failed_dexs"])
+    if ws_manager:
+        await ws_manager.refresh_market()
+
+
+async def resync_positions():
+    while True:
+        for wallet in storage.get_wallets():
+            await sync_positions(wallet)
+        await fill_aggregator.clock.sleep(LIQ_PROXIMITY_RESYNC_SEC)
+
+
+async def handle_twap_fill(wallet: str, twap_id: int, fill: dict, seen: bool):
+    if seen:
+        # Already recorded and batched from userFills; take it back out of
+        # the pending batch so the slice is only reported as TWAP progress.
+        acknowledge(*fill_aggregator.discard(wallet, fill))
+    else:
+        record_event(wallet, "fills", fill)
+    await twap_aggregator.add_slice(wallet, twap_id, fill)
+    acknowledge(fill)
+
+
+async def handle_twap_update(wallet: str, entry: dict, snapshot: bool):
+    await twap_aggregator.update(wallet, entry, snapshot)
+
 
+# Statuses in which an order can still receive fills; any other status
+# completes its batch.
+OPEN_ORDER_STATUSES = {"open", "triggered"}
+
+
+async def handle_order_update(update: dict):
+    order = update.get("order") or {}
+    oid = order.get("oid")
+    if oid is not None and update.get("status") not in OPEN_ORDER_STATUSES:
+        await fill_aggregator.complete_order(oid)
+
+
+async def deliver_event(wallet: str, event_type: str, data: dict):
+    if event_type == "funding":
+        await deliver_funding(wallet, data)
+        return
+    if await send_notification(wallet, event_type, data):
+        acknowledge(data)
+
+
+async def deliver_funding(wallet: str, data: dict):
+    # Funding arrives for every open position at the top of the hour, so
+    # the wallet's settings are read once per payment rather than once per
+    # check. Filtered payments are dropped here; digest payments are
+    # acknowledged once the digest that carries them has been sent.
+    settings = storage.get_wallet(wallet)
+    if (
+        settings is None
+        or not settings["events"]["funding"]
+        or not funding_passes_filters(settings["funding_filters"], data)
+    ):
+        acknowledge(data)
+    elif funding_digest and settings["funding_digest"]:
+        await funding_digest.add_funding(wallet, data)
+    elif await send_funding(wallet, data):
+        acknowledge(data)
+
+
+async def deliver_funding_digest(entries: list[tuple[str, dict]]):
+    if await send_funding_digest(entries):
+        acknowledge(*(funding for _, funding in entries))
+
+
+async def deliver_fills(wallet: str, fills: list[dict]):
+    if live_cards:
+        await live_cards.add_batch(wallet, fills)
+    elif await send_aggregated_fills(wallet, fills):
+        acknowledge(*fills)
+
+
+async def deliver_basket(wallet: str, batches: list[list[dict]]):
+    discard_prefetch(wallet, [fill for fills in batches for fill in fills])
+    if await send_basket(wallet, batches):
+        acknowledge(*(fill for fills in batches for fill in fills))
+
+
+async def deliver_cluster(entries: list[tuple[str, list[dict]]]):
+    enabled = []
+    for wallet, fills in entries:
+        if storage.is_event_enabled(wallet, "fills"):
+            enabled.append((wallet, fills))
+        else:
+            discard_prefetch(wallet, fills)
+            acknowledge(*fills)
+    if len(enabled) == 1:
+        # Continue down the chain as an unmatched batch would, through the
+        # basket tier when it is on.
+        await cluster_aggregator.on_batch(*enabled[0])
+        return
+    for wallet, fills in enabled:
+        discard_prefetch(wallet, fills)
+    if enabled and await send_cluster(enabled):
+        acknowledge(*(fill for _, fills in enabled for fill in fills))
+
+
+async def handle_mids(mids: dict):
+    if liq_watch is not None:
+        # Near-liquidation warnings share the liquidation fast lane.
+        for warning in liq_watch.check(mids):
+            if delivery:
+                delivery.submit_urgent(send_liq_proximity, warning)
+            else:
+                await send_liq_proximity(warning)
+    if price_alerts is None:
+        return
+    triggered = price_alerts.check(mids)
+    if not triggered:
+        return
+    for alert, price in triggered:
+        if delivery:
+            await delivery.submit(deliver_price_alert, alert, price)
+        else:
+            await deliver_price_alert(alert, price)
+    await price_alerts.snapshot()
+    if ws_manager:
+        await ws_manager.refresh_market()
+
+
+async def deliver_price_alert(alert: PriceAlert, price: float):
+    # A failed send puts the alert back, so it fires again on the next tick
+    # that is still past its threshold.
+    if not await send_price_alert(alert, price):
+        price_alerts.restore(alert)
+        if ws_manager:
+            await ws_manager.refresh_market()
+
+
+async def deliver_flood_summary(summary: FloodSummary):
+    if await send_flood_summary(summary):
+        acknowledge(*summary.events)
+
+
+async def redeliver_journal():
+    entries = journal.open()
+    if entries:
+        logger.info(f"Redelivering {len(entries)} unacknowledged journal entries")
+    for entry in entries:
+        entry.data["_offset"] = entry.offset
+        if entry.event_type == "fills":
+            await fill_aggregator.add_fill(entry.wallet, entry.data)
+        else:
+            await deliver_event(entry.wallet, entry.event_type, entry.data)
+
+
+# The send functions return False only when Telegram delivery failed, so the
+# journal keeps the event for redelivery; skipped events count as handled.
+def fills_muted(wallet: str, fills: list[dict]) -> bool:
+    # True when the batch should not be sent at all.
+    if not storage.is_event_enabled(wallet, "fills"):
+        discard_prefetch(wallet, fills)
+        return True
+    return not fills
+
+
+async def batch_position_info(wallet: str, fills: list[dict]) -> dict | None:
     first = fills[0]
-    coin = first.get("coin", "")
-    direction = first.get("dir", "")
+    if first.get("dir") not in OPENING_DIRECTIONS:
+        return None
+    return await fetch_position_info(wallet, first.get("coin", ""))
 
-    position_info = None
-    if direction in ("Open Long", "Open Short"):
-        position_info = await get_position_info(wallet, coin)
 
-    text = format_aggregated_fills(fills, wallet, position_info)
+async def render_fills(wallet: str, fills: list[dict]) -> str | None:
+    if fills_muted(wallet, fills):
+        return None
+    return format_aggregated_fills(fills, wallet, await batch_position_info(wallet, fills))
+
+
+async def send_aggregated_fills(wallet: str, fills: list[dict]) -> bool:
+    text = await render_fills(wallet, fills)
+    if text is None:
+        return True
+
     try:
         await app.bot.send_message(
             chat_id=TELEGRAM_USER_ID,
@@ -228,22 +639,123 @@ async def send_aggregated_fills(wallet: str, fills: list[dict]):
         )
     except Exception as e:
         logger.error(f"Failed to send aggregated fill notification: {e}")
+        return False
+    return True
+
+
+# Live card callbacks. Fills are acknowledged once the message that carries
+# them has been sent or edited. A card's position info is looked up when it
+# is first sent and kept by message id, so edits make no REST calls.
+LIVE_CARD_POSITION_LIMIT = 1_000
+card_positions: OrderedDict[int, dict | None] = OrderedDict()
+
+
+async def send_fill_card(wallet: str, fills: list[dict]) -> int | None:
+    if fills_muted(wallet, fills):
+        acknowledge(*fills)
+        return None
+    position_info = await batch_position_info(wallet, fills)
+    text = format_aggregated_fills(fills, wallet, position_info)
+
+    try:
+        message = await app.bot.send_message(
+            chat_id=TELEGRAM_USER_ID,
+            text=text,
+            parse_mode="HTML",
+        )
+    except Exception as e:
+        logger.error(f"Failed to send fill card: {e}")
+        return None
+    acknowledge(*fills)
+    card_positions[message.message_id] = position_info
+    if len(card_positions) > LIVE_CARD_POSITION_LIMIT:
+        card_positions.popitem(last=False)
+    return message.message_id
+
+
+async def edit_fill_card(message_id: int, wallet: str, fills: list[dict], new_fills: list[dict]) -> bool:
+    if fills_muted(wallet, fills):
+        acknowledge(*new_fills)
+        return True
+    text = format_aggregated_fills(fills, wallet, card_positions.get(message_id))
+
+    try:
+        await app.bot.edit_message_text(
+            chat_id=TELEGRAM_USER_ID,
+            message_id=message_id,
+            text=text,
+            parse_mode="HTML",
+        )
+    except BadRequest as e:
+        if "not modified" not in str(e).lower():
+            logger.error(f"Failed to edit fill card: {e}")
+            return False
+    except Exception as e:
+        logger.error(f"Failed to edit fill card: {e}")
+        return False
+    acknowledge(*new_fills)
+    return True
+
+
+async def send_basket(wallet: str, batches: list[list[dict]]) -> bool:
+    if not storage.is_event_enabled(wallet, "fills"):
+        return True
+
+    text = format_basket(batches, wallet)
+    try:
+        await app.bot.send_message(
+            chat_id=TELEGRAM_USER_ID,
+            text=text,
+            parse_mode="HTML",
+        )
+    except Exception as e:
+        logger.error(f"Failed to send basket notification: {e}")
+        return False
+    return True
+
+
+async def send_cluster(entries: list[tuple[str, list[dict]]]) -> bool:
+    text = format_cluster(entries)
+    try:
+        await app.bot.send_message(
+            chat_id=TELEGRAM_USER_ID,
+            text=text,
+            parse_mode="HTML",
+        )
+    except Exception as e:
+        logger.error(f"Failed to send cluster notification: {e}")
+        return False
+    return True
 
 
-async def send_notification(wallet: str, event_type: str, data: dict):
+async def send_twap_progress(state: TwapState, reason: str) -> bool:
+    if not storage.is_event_enabled(state.wallet, "fills"):
+        return True
+
+    text = format_twap_progress(state, state.wallet, reason)
+    try:
+        await app.bot.send_message(
+            chat_id=TELEGRAM_USER_ID,
+            text=text,
+            parse_mode="HTML",
+        )
+    except Exception as e:
+        logger.error(f"Failed to send TWAP progress: {e}")
+        return False
+    return True
+
+
+async def send_notification(wallet: str, event_type: str, data: dict) -> bool:
     if not storage.is_event_enabled(wallet, event_type):
-        return
-    if event_type == "funding" and not should_send_funding_notification(wallet, data):
-        return
+        return True
 
     formatters = {
         "liquidations": format_liquidation,
-        "funding": format_funding,
         "transfers": format_transfer,
     }
     fmt = formatters.get(event_type)
     if not fmt:
-        return
+        return True
 
     text = fmt(data, wallet)
     try:
@@ -254,6 +766,107 @@ async def send_notification(wallet: str, event_type: str, data: dict):
         )
     except Exception as e:
         logger.error(f"Failed to send notification: {e}")
+        return False
+    return True
+
+
+async def send_funding(wallet: str, data: dict) -> bool:
+    # Toggles and filters were checked by deliver_funding.
+    try:
+        await app.bot.send_message(
+            chat_id=TELEGRAM_USER_ID,
+            text=format_funding(data, wallet),
+            parse_mode="HTML",
+        )
+    except Exception as e:
+        logger.error(f"Failed to send notification: {e}")
+        return False
+    return True
+
+
+async def send_price_alert(alert: PriceAlert, price: float) -> bool:
+    try:
+        await app.bot.send_message(
+            chat_id=TELEGRAM_USER_ID,
+            text=format_price_alert(alert, price),
+            parse_mode="HTML",
+        )
+    except Exception as e:
+        logger.error(f"Failed to send price alert: {e}")
+        return False
+    return True
+
+
+async def send_liq_proximity(warning: LiquidationWarning) -> bool:
+    if not storage.is_event_enabled(warning.wallet, "liq_proximity"):
+        return True
+    try:
+        await app.bot.send_message(
+            chat_id=TELEGRAM_USER_ID,
+            text=format_liq_proximity(warning, warning.wallet),
+            parse_mode="HTML",
+        )
+    except Exception as e:
+        logger.error(f"Failed to send liquidation warning: {e}")
+        return False
+    return True
+
+
+async def send_flood_notice(wallet: str, rate: float):
+    try:
+        await app.bot.send_message(
+            chat_id=TELEGRAM_USER_ID,
+            text=format_flood_notice(wallet, rate, flood_guard.window_sec, flood_guard.summary_sec),
+            parse_mode="HTML",
+        )
+    except Exception as e:
+        logger.error(f"Failed to send summary mode notice: {e}")
+
+
+async def send_flood_summary(summary: FloodSummary) -> bool:
+    event_types = {t for t in ("fills", "funding", "transfers") if storage.is_event_enabled(summary.wallet, t)}
+    if not event_types and not summary.resumed:
+        return True
+    try:
+        await app.bot.send_message(
+            chat_id=TELEGRAM_USER_ID,
+            text=format_flood_summary(summary, summary.wallet, event_types),
+            parse_mode="HTML",
+        )
+    except Exception as e:
+        logger.error(f"Failed to send flood summary: {e}")
+        return False
+    return True
+
+
+def split_message(text: str, limit: int = TELEGRAM_MESSAGE_LIMIT) -> list[str]:
+    # Splits on blank lines so HTML tags, which never span sections, stay balanced.
+    chunks = []
+    current = ""
+    for section in text.split("\n\n"):
+        candidate = f"{current}\n\n{section}" if current else section
+        if len(candidate) <= limit or not current:
+            current = candidate
+        else:
+            chunks.append(current)
+            current = section
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+async def send_funding_digest(entries: list[tuple[str, dict]]) -> bool:
+    try:
+        for chunk in split_message(format_funding_digest(entries)):
+            await app.bot.send_message(
+                chat_id=TELEGRAM_USER_ID,
+                text=chunk,
+                parse_mode="HTML",
+            )
+    except Exception as e:
+        logger.error(f"Failed to send funding digest: {e}")
+        return False
+    return True
 
 
 @auth
@@ -262,7 +875,7 @@ async def cmd_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         "Hyperliquid Notify Bot\n\n"
         "Commands:\n"
         f"{format_command_help()}\n\n"
-        "Use /watch <address> [label] to add wallets, and you can use either an address or a label with /label, /events, /fundingfilter, /positions, and /unwatch."
+        "Use /watch <address> [label] to add wallets, and you can use either an address or a label with /label, /events, /fundingfilter, /fundingdigest, /positions, /pnl, /history, and /unwatch."
     )
 
 
@@ -282,6 +895,8 @@ async def cmd_watch(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if storage.add_wallet(address, label=label):
         await ws_manager.subscribe(address)
+        if liq_watch is not None:
+            schedule_position_sync(address)
         await update.message.reply_text(f"Watching {format_wallet_name(address)}")
     else:
         await update.message.reply_text(
@@ -343,6 +958,9 @@ async def cmd_unwatch(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     if storage.remove_wallet(address):
         await ws_manager.unsubscribe(address)
+        if liq_watch is not None:
+            liq_watch.forget(address)
+            await ws_manager.refresh_market()
         await update.message.reply_text(f"Unwatched {format_wallet_name(address)}")
     else:
         await update.message.reply_text("Wallet not found")
@@ -361,7 +979,11 @@ async def cmd_list(update: Update, context: ContextTypes.DEFAULT_TYPE):
         wallet_name = info.get("label") or short_addr(addr)
         if info.get("label"):
             wallet_name = f"{wallet_name} ({short_addr(addr)})"
-        lines.append(f"• {wallet_name}  [{', '.join(enabled)}]")
+        line = f"• {wallet_name}  [{', '.join(enabled)}]"
+        since = flood_guard.summarizing_since(addr) if flood_guard else None
+        if since is not None:
+            line = f"{line}  ⏸ summary mode for {format_duration(flood_guard.clock.time() - since)}"
+        lines.append(line)
     await update.message.reply_text("\n".join(lines))
 
 
@@ -381,8 +1003,18 @@ async def cmd_events(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text("Wallet not found. /watch it first.")
         return
 
+    await update.message.reply_text(
+        f"Event toggles for {format_wallet_name(address)}:",
+        reply_markup=format_event_toggles(address, events),
+    )
+
+
+def format_event_toggles(address: str, events: dict) -> InlineKeyboardMarkup:
+    # liq_proximity is only offered while LIQ_PROXIMITY_PCT turns it on.
     buttons = []
     for event_type, enabled in events.items():
+        if event_type == "liq_proximity" and LIQ_PROXIMITY_PCT <= 0:
+            continue
         icon = "✅" if enabled else "❌"
         buttons.append([
             InlineKeyboardButton(
@@ -390,10 +1022,7 @@ async def cmd_events(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 callback_data=f"toggle:{address}:{event_type}",
             )
         ])
-    await update.message.reply_text(
-        f"Event toggles for {format_wallet_name(address)}:",
-        reply_markup=InlineKeyboardMarkup(buttons),
-    )
+    return InlineKeyboardMarkup(buttons)
 
 
 @auth
@@ -440,6 +1069,40 @@ async def cmd_fundingfilter(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+@auth
+async def cmd_fundingdigest(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args or len(context.args) > 2:
+        await update.message.reply_text("Usage: /fundingdigest <address|label> [on|off]")
+        return
+
+    address = resolve_wallet_ref(context.args[0])
+    if not address:
+        await update.message.reply_text("Wallet not found. /watch it first.")
+        return
+
+    if len(context.args) == 1:
+        enabled = storage.get_funding_digest(address)
+    else:
+        choice = context.args[1].lower()
+        if choice not in ("on", "off"):
+            await update.message.reply_text("Usage: /fundingdigest <address|label> [on|off]")
+            return
+        enabled = storage.set_funding_digest(address, choice == "on")
+
+    if enabled:
+        scope = "one message for all digest wallets" if FUNDING_DIGEST_MODE == "global" else "one message per wallet"
+        await update.message.reply_text(
+            f"Funding digest for {format_wallet_name(address)}: on\n"
+            f"Payments from each funding hour are collected for {FUNDING_DIGEST_WINDOW_SEC:g}s "
+            f"and sent as {scope}. Funding filters still apply."
+        )
+    else:
+        await update.message.reply_text(
+            f"Funding digest for {format_wallet_name(address)}: off\n"
+            "Each funding payment that passes the filters is sent on its own."
+        )
+
+
 @auth
 async def handle_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
@@ -452,19 +1115,11 @@ async def handle_toggle(update: Update, context: ContextTypes.DEFAULT_TYPE):
     new_state = storage.toggle_event(address, event_type)
     if new_state is None:
         return
+    if event_type == "transfers" and ws_manager:
+        await ws_manager.refresh(address)
 
-    events = storage.get_events(address)
-    buttons = []
-    for et, enabled in events.items():
-        icon = "✅" if enabled else "❌"
-        buttons.append([
-            InlineKeyboardButton(
-                f"{icon} {et}",
-                callback_data=f"toggle:{address}:{et}",
-            )
-        ])
     await query.edit_message_reply_markup(
-        reply_markup=InlineKeyboardMarkup(buttons)
+        reply_markup=format_event_toggles(address, storage.get_events(address))
     )
 
 
@@ -491,15 +1146,201 @@ async def cmd_positions(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.message.reply_text(text, parse_mode="HTML")
 
 
+@auth
+async def cmd_pnl(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    args = list(context.args or [])
+    range_label = "today"
+    if args and (args[-1].lower() == "today" or HISTORY_RANGE_RE.match(args[-1].lower())):
+        range_label = args.pop().lower()
+    if len(args) > 1:
+        await update.message.reply_text("Usage: /pnl [address|label] [today|24h|7d|30d]")
+        return
+
+    if args:
+        address = resolve_wallet_ref(args[0])
+        if not address:
+            await update.message.reply_text("Wallet not found. /watch it first.")
+            return
+        wallets = [address]
+    else:
+        wallets = list(storage.get_wallets().keys())
+        if not wallets:
+            await update.message.reply_text("No wallets being watched. /watch one first.")
+            return
+
+    now = datetime.now(timezone.utc)
+    if range_label == "today":
+        start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        start_ms = int(start.timestamp() * 1000)
+    else:
+        try:
+            lookback = parse_history_range(range_label)
+        except ValueError:
+            await update.message.reply_text("Usage: /pnl [address|label] [today|24h|7d|30d]")
+            return
+        start_ms = 0 if lookback is None else int((now.timestamp() - lookback) * 1000)
+
+    blocks = [
+        format_pnl(analytics.totals(wallet, start_ms) if analytics else {}, wallet, range_label)
+        for wallet in wallets
+    ]
+    await update.message.reply_text("\n\n".join(blocks), parse_mode="HTML")
+
+
+@auth
+async def cmd_history(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if not context.args or len(context.args) > 2:
+        await update.message.reply_text("Usage: /history <address|label> [24h|7d|4w|all]")
+        return
+
+    address = resolve_wallet_ref(context.args[0])
+    if not address:
+        await update.message.reply_text("Wallet not found. /watch it first.")
+        return
+
+    if not history_store:
+        await update.message.reply_text("History is disabled. Set HISTORY_ENABLED=true to record it.")
+        return
+
+    range_label = context.args[1].lower() if len(context.args) == 2 else "7d"
+    try:
+        lookback = parse_history_range(range_label)
+    except ValueError:
+        await update.message.reply_text("Usage: /history <address|label> [24h|7d|4w|all]")
+        return
+
+    await history_store.flush()
+    start_ms = None
+    if lookback is not None:
+        start_ms = int((datetime.now(timezone.utc).timestamp() - lookback) * 1000)
+    summary = history_store.summary(address, start_ms=start_ms)
+    await update.message.reply_text(
+        format_history(summary, address, range_label),
+        parse_mode="HTML",
+    )
+
+
+def format_windows(stats: dict[tuple, tuple[float, int]]) -> str:
+    labels = {addr: info.get("label") for addr, info in storage.get_wallets().items()}
+    lines = []
+    for (wallet, coin), (window, samples) in sorted(stats.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+        name = labels.get(wallet) or short_addr(wallet)
+        if coin:
+            name = f"{name} {coin}"
+        lines.append(f"• {name}  {window:.1f}s ({samples} gaps)")
+    return "\n".join(lines)
+
+
+ALERT_DIRECTIONS = {">": ABOVE, "above": ABOVE, "<": BELOW, "below": BELOW}
+ALERT_USAGE = (
+    "Usage:\n"
+    "/alert - list price alerts\n"
+    "/alert <coin> [above|below] <price> - alert when the price crosses\n"
+    "/alert remove <id> - remove an alert"
+)
+
+
+def parse_alert_price(raw: str) -> float:
+    price = float(raw.replace(",", "").lstrip("$"))
+    # NaN compares false against everything, so it would never trigger.
+    if not math.isfinite(price) or price <= 0:
+        raise ValueError(raw)
+    return price
+
+
+@auth
+async def cmd_alert(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if price_alerts is None:
+        await update.message.reply_text("Price alerts are disabled.")
+        return
+    args = context.args or []
+    if not args:
+        await update.message.reply_text(format_alert_list(price_alerts.alerts()), parse_mode="HTML")
+        return
+
+    if args[0].lower() in ("remove", "rm", "delete"):
+        ref = args[1].lstrip("#") if len(args) == 2 else ""
+        alert = price_alerts.remove(int(ref)) if ref.isdigit() else None
+        if not alert:
+            await update.message.reply_text("Alert not found. /alert lists them.")
+            return
+        if ws_manager:
+            await ws_manager.refresh_market()
+        await update.message.reply_text(f"Removed alert #{alert.id}")
+        return
+
+    if len(args) not in (2, 3) or (len(args) == 3 and args[1].lower() not in ALERT_DIRECTIONS):
+        await update.message.reply_text(ALERT_USAGE)
+        return
+    try:
+        target = parse_alert_price(args[-1])
+    except ValueError:
+        await update.message.reply_text("Price must be a positive number.")
+        return
+
+    # allMids is only streamed while alerts exist, so the first alert
+    # resolves the coin and current price over REST.
+    coin = price_alerts.resolve_coin(args[0])
+    current = price_alerts.last_price(coin) if coin else None
+    if current is None:
+        mids = await get_market_prices()
+        lowered = args[0].lower()
+        coin = next((name for name in mids if name.lower() == lowered), None)
+        current = mids.get(coin) if coin else None
+    if current is None:
+        await update.message.reply_text(f"Unknown coin {args[0]}")
+        return
+
+    direction = ALERT_DIRECTIONS[args[1].lower()] if len(args) == 3 else (ABOVE if target > current else BELOW)
+    if (direction == ABOVE and target <= current) or (direction == BELOW and target >= current):
+        await update.message.reply_text(f"{coin} is already {direction} {target:g} ({current:g})")
+        return
+
+    alert = price_alerts.add(coin, target, direction)
+    if ws_manager:
+        await ws_manager.refresh_market()
+    await update.message.reply_text(f"Alert #{alert.id}: {coin} {direction} {target:g} (now {current:g})")
+
+
+@auth
+async def cmd_windows(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    learner = fill_aggregator.learner if fill_aggregator else None
+    if not learner:
+        await update.message.reply_text(
+            f"Adaptive windows are off; fills use a fixed {AGGREGATION_WINDOW_SEC:g}s window"
+        )
+        return
+    stats = learner.stats()
+    if not stats:
+        await update.message.reply_text("No fills seen yet")
+        return
+    await update.message.reply_text(format_windows(stats))
+
+
 @auth
 async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
     wallet_count = len(storage.get_wallets())
     connected = ws_manager.connected if ws_manager else False
     status = "🟢 Connected" if connected else "🔴 Disconnected"
+    if ws_manager and ws_manager.connection_count > 1:
+        stats = ws_manager.stats()
+        status = (
+            f"{status} ({ws_manager.connected_count}/{ws_manager.connection_count}), "
+            f"{stats['suppression_rate'] * 100:.0f}% duplicates suppressed"
+        )
+    staleness = ws_manager.staleness if ws_manager else None
+    if staleness is not None:
+        status = f"{status}, last frame {staleness:.0f}s ago"
     http_status = "🟢 Ready" if http_session_ready() else "🟡 Lazy"
+    pending = ws_manager.pending_wallets() if ws_manager else []
+    pending_line = ""
+    if pending:
+        pending_line = f"⚠️ Awaiting subscription ack: {', '.join(format_wallet_name(w) for w in pending)}\n"
     await update.message.reply_text(
         f"WebSocket: {status}\n"
+        f"{pending_line}"
         f"HTTP: {http_status}\n"
+        f"Event loop: {eventloop.current()}\n"
         f"Wallets: {wallet_count}\n"
         f"Build: {APP_BUILD_ID}\n"
         f"Uptime: {format_uptime()}"
@@ -507,15 +1348,115 @@ async def cmd_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 
 async def post_init(application: Application):
-    global ws_manager, fill_aggregator
+    global ws_manager, fill_aggregator, basket_aggregator, cluster_aggregator, funding_digest
+    global twap_aggregator, live_cards, delivery, flood_guard, price_alerts, liq_watch, liq_resync_task
+    global journal, history_store, analytics
     await init_http_session()
-    await application.bot.set_my_commands(BOT_COMMANDS)
-    fill_aggregator = FillAggregator(on_batch=send_aggregated_fills)
+    if BOT_ROLE == "all":
+        await application.bot.set_my_commands(BOT_COMMANDS)
+    if LIVE_CARDS_ENABLED:
+        live_cards = LiveCards(
+            on_send=send_fill_card,
+            on_edit=edit_fill_card,
+            min_edit_interval_sec=LIVE_CARDS_EDIT_INTERVAL_SEC,
+            session_sec=LIVE_CARDS_SESSION_SEC,
+        )
+    on_batch = deliver_fills
+    if BASKET_WINDOW_SEC > 0:
+        basket_aggregator = BasketAggregator(
+            on_batch=deliver_fills,
+            on_basket=deliver_basket,
+            window_sec=BASKET_WINDOW_SEC,
+        )
+        on_batch = basket_aggregator.add_batch
+    if CLUSTER_WINDOW_SEC > 0:
+        # Clustering runs first; batches no other wallet matched continue
+        # to the basket tier (when enabled) as before.
+        cluster_aggregator = ClusterAggregator(
+            on_batch=on_batch,
+            on_cluster=deliver_cluster,
+            window_sec=CLUSTER_WINDOW_SEC,
+        )
+        on_batch = cluster_aggregator.add_batch
+    learner = None
+    if AGGREGATION_ADAPTIVE and AGGREGATION_MODE == "window":
+        learner = WindowLearner(
+            AGGREGATION_WINDOW_SEC,
+            min_sec=AGGREGATION_MIN_WINDOW_SEC,
+            max_sec=AGGREGATION_MAX_WINDOW_SEC,
+            per_coin=AGGREGATION_ADAPTIVE_PER_COIN,
+        )
+    fill_aggregator = FillAggregator(
+        on_batch=on_batch,
+        window_sec=AGGREGATION_WINDOW_SEC,
+        mode=AGGREGATION_MODE,
+        idle_sec=AGGREGATION_IDLE_SEC,
+        learner=learner,
+    )
+    funding_digest = FundingDigest(
+        on_digest=deliver_funding_digest,
+        window_sec=FUNDING_DIGEST_WINDOW_SEC,
+        group_wallets=FUNDING_DIGEST_MODE == "global",
+    )
+    if TWAP_ENABLED:
+        twap_aggregator = TwapAggregator(
+            on_progress=send_twap_progress,
+            milestones=TWAP_MILESTONES,
+            idle_sec=TWAP_IDLE_SEC,
+        )
+    track_orders = AGGREGATION_MODE == "oid" and ORDER_UPDATES_ENABLED
+    if PRICE_ALERTS_ENABLED:
+        price_alerts = PriceAlerts(Path(DATA_DIR) / "alerts.json")
+        price_alerts.load()
+    if LIQ_PROXIMITY_PCT > 0:
+        liq_watch = LiquidationWatch(LIQ_PROXIMITY_PCT / 100)
     ws_manager = WSManager(
-        on_event=send_notification,
-        on_fill=fill_aggregator.add_fill,
+        on_event=handle_event,
+        on_fill=handle_fill,
+        on_order_update=handle_order_update if track_orders else None,
+        on_twap_fill=handle_twap_fill if TWAP_ENABLED else None,
+        on_twap_update=handle_twap_update if TWAP_ENABLED else None,
+        subscription_mode=WS_SUBSCRIPTION_MODE,
+        needs_ledger=lambda wallet: storage.is_event_enabled(wallet, "transfers"),
+        connections=WS_CONNECTIONS,
+        ping_interval_sec=WS_PING_INTERVAL_SEC,
+        stale_after_sec=WS_STALE_SEC,
+        on_mids=handle_mids if price_alerts is not None or liq_watch is not None else None,
+        needs_mids=lambda: bool(price_alerts) or bool(liq_watch),
     )
+    if JOURNAL_ENABLED:
+        journal = Journal(
+            Path(DATA_DIR) / "journal",
+            segment_bytes=int(JOURNAL_SEGMENT_MB * 1024 * 1024),
+            retention_sec=JOURNAL_RETENTION_HOURS * 3600,
+            max_bytes=int(JOURNAL_MAX_MB * 1024 * 1024),
+        )
+        await redeliver_journal()
+        await journal.start()
+    analytics = Analytics(Path(DATA_DIR) / "analytics.json", snapshot_interval=ANALYTICS_SNAPSHOT_SEC)
+    analytics.load()
+    await analytics.start()
+    if HISTORY_ENABLED:
+        history_store = HistoryStore(
+            Path(DATA_DIR) / "history",
+            cache_bytes=int(HISTORY_CACHE_MB * 1024 * 1024),
+        )
+        history_store.open()
+        await history_store.start()
+    delivery = Delivery(queued=DELIVERY_QUEUE_ENABLED)
+    if FLOOD_MAX_EVENTS > 0:
+        flood_guard = FloodGuard(
+            on_summary=deliver_flood_summary,
+            on_switch=send_flood_notice,
+            max_events=FLOOD_MAX_EVENTS,
+            window_sec=FLOOD_WINDOW_SEC,
+            resume_events=FLOOD_RESUME_EVENTS,
+            summary_sec=FLOOD_SUMMARY_SEC,
+        )
+    await delivery.start()
     await ws_manager.start()
+    if liq_watch is not None:
+        liq_resync_task = asyncio.create_task(resync_positions())
 
     wallet_count = len(storage.get_wallets())
     await application.bot.send_message(
@@ -525,34 +1466,126 @@ async def post_init(application: Application):
 
 
 async def post_shutdown(application: Application):
+    if liq_resync_task:
+        liq_resync_task.cancel()
     if ws_manager:
         await ws_manager.stop()
+    if delivery:
+        await delivery.stop()
+    if journal:
+        await journal.stop()
+    if history_store:
+        await history_store.stop()
+    if analytics:
+        await analytics.stop()
     await close_http_session()
 
 
+COMMAND_HANDLERS = {
+    "start": cmd_start,
+    "help": cmd_help,
+    "watch": cmd_watch,
+    "label": cmd_label,
+    "unwatch": cmd_unwatch,
+    "list": cmd_list,
+    "events": cmd_events,
+    "fundingfilter": cmd_fundingfilter,
+    "fundingdigest": cmd_fundingdigest,
+    "positions": cmd_positions,
+    "pnl": cmd_pnl,
+    "history": cmd_history,
+    "windows": cmd_windows,
+    "alert": cmd_alert,
+    "status": cmd_status,
+}
+
+
+# Split deployment, delivery side: Telegram polling and sending only. Every
+# command and button press is forwarded to the ingest process, which owns
+# the subscriptions, alerts and aggregates the handlers work on, and whose
+# replies come back as Bot API calls over the same socket.
+@auth
+async def forward_update(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    if await ipc_server.push_update(update_body(update)):
+        return
+    if update.callback_query:
+        await update.callback_query.answer("Ingest process is not running")
+    else:
+        await update.message.reply_text("Ingest process is not running, try again shortly.")
+
+
+async def start_delivery(application: Application):
+    global ipc_server
+    await application.bot.set_my_commands(BOT_COMMANDS)
+    ipc_server = IPCServer(IPC_SOCKET, application.bot)
+    await ipc_server.start()
+
+
+async def stop_delivery(application: Application):
+    if ipc_server:
+        await ipc_server.stop()
+
+
+# Split deployment, ingest side: the whole pipeline as in a single process,
+# with Telegram calls and updates crossing the socket.
+async def handle_remote_update(body: dict):
+    update = RemoteUpdate(app.bot, body)
+    if update.callback_query:
+        await handle_toggle(update, RemoteContext([]))
+        return
+    command, args = parse_command(update.message.text)
+    handler = COMMAND_HANDLERS.get(command)
+    if handler:
+        await handler(update, RemoteContext(args))
+
+
+async def run_ingest():
+    global app, ipc_client
+    ipc_client = IPCClient(IPC_SOCKET, on_update=handle_remote_update)
+    app = RemoteApplication(RemoteBot(ipc_client))
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+    await ipc_client.start()
+    try:
+        await post_init(app)
+        logger.info("Ingest running")
+        await stopping.wait()
+    finally:
+        await post_shutdown(app)
+        await ipc_client.stop()
+
+
 def main():
     global app
+    loop_name = eventloop.install(EVENT_LOOP)
+    logger.info(f"Using the {loop_name} event loop")
+    if BOT_ROLE == "ingest":
+        logger.info("Ingest starting...")
+        asyncio.run(run_ingest())
+        return
+    if BOT_ROLE not in ("all", "delivery"):
+        raise SystemExit(f"Unknown BOT_ROLE {BOT_ROLE!r}, expected all, ingest or delivery")
+
+    delivery_only = BOT_ROLE == "delivery"
     app = (
         Application.builder()
         .token(TELEGRAM_BOT_TOKEN)
-        .post_init(post_init)
-        .post_shutdown(post_shutdown)
+        .post_init(start_delivery if delivery_only else post_init)
+        .post_shutdown(stop_delivery if delivery_only else post_shutdown)
         .build()
     )
 
-    app.add_handler(CommandHandler("start", cmd_start))
-    app.add_handler(CommandHandler("help", cmd_help))
-    app.add_handler(CommandHandler("watch", cmd_watch))
-    app.add_handler(CommandHandler("label", cmd_label))
-    app.add_handler(CommandHandler("unwatch", cmd_unwatch))
-    app.add_handler(CommandHandler("list", cmd_list))
-    app.add_handler(CommandHandler("events", cmd_events))
-    app.add_handler(CommandHandler("fundingfilter", cmd_fundingfilter))
-    app.add_handler(CommandHandler("positions", cmd_positions))
-    app.add_handler(CommandHandler("status", cmd_status))
-    app.add_handler(CallbackQueryHandler(handle_toggle))
-
-    logger.info("Bot starting...")
+    if delivery_only:
+        app.add_handler(MessageHandler(filters.COMMAND, forward_update))
+        app.add_handler(CallbackQueryHandler(forward_update))
+    else:
+        for command, handler in COMMAND_HANDLERS.items():
+            app.add_handler(CommandHandler(command, handler))
+        app.add_handler(CallbackQueryHandler(handle_toggle))
+
+    logger.info("Delivery starting..." if delivery_only else "Bot starting...")
     app.run_polling()
 
 
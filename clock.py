@@ -0,0 +1,86 @@
+import asyncio
+import heapq
+import itertools
+import time
+
+
+class Clock:
+    def time(self) -> float:
+        return time.time()
+
+    async def sleep(self, delay: float):
+        await asyncio.sleep(delay)
+
+
+# Simulated time for tests and benchmarks. Sleepers only wake when the owner
+# calls advance()/advance_to(), so hours of aggregation windows and funding
+# intervals replay in milliseconds and always in the same order.
+class VirtualClock(Clock):
+    def __init__(self, start: float = 0.0, settle_rounds: int = 10):
+        self._now = start
+        self._settle_rounds = settle_rounds
+        self._timers: list[tuple[float, int, asyncio.Future]] = []
+        self._seq = itertools.count()
+
+    def time(self) -> float:
+        return self._now
+
+    async def sleep(self, delay: float):
+        if delay <= 0:
+            await asyncio.sleep(0)
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._timers, (self._now + delay, next(self._seq), future))
+        await future
+
+    @property
+    def pending(self) -> int:
+        return sum(1 for _, _, future in self._timers if not future.done())
+
+    def next_deadline(self) -> float | None:
+        self._drop_cancelled()
+        return self._timers[0][0] if self._timers else None
+
+    async def advance(self, seconds: float):
+        await self.advance_to(self._now + seconds)
+
+    async def advance_to(self, target: float):
+        await self._settle()
+        while True:
+            self._drop_cancelled()
+            if not self._timers or self._timers[0][0] > target:
+                break
+            deadline, _, future = heapq.heappop(self._timers)
+            self._now = max(self._now, deadline)
+            future.set_result(None)
+            await self._settle()
+        self._now = max(self._now, target)
+
+    async def run_until_complete(self, awaitable):
+        # Await something that may itself sleep on this clock, moving time
+        # forward through pending deadlines until it finishes.
+        task = asyncio.ensure_future(awaitable)
+        while not task.done():
+            for _ in range(self._settle_rounds):
+                await asyncio.sleep(0)
+                if task.done():
+                    break
+            else:
+                deadline = self.next_deadline()
+                if deadline is not None:
+                    await self.advance_to(deadline)
+        return task.result()
+
+    async def run_until_idle(self):
+        while (deadline := self.next_deadline()) is not None:
+            await self.advance_to(deadline)
+
+    def _drop_cancelled(self):
+        while self._timers and self._timers[0][2].done():
+            heapq.heappop(self._timers)
+
+    async def _settle(self):
+        # Give woken tasks a few loop iterations to run and schedule their
+        # next sleep before time moves again.
+        for _ in range(self._settle_rounds):
+            await asyncio.sleep(0)
@@ -3,7 +3,129 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _env_flag(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
 TELEGRAM_BOT_TOKEN = os.environ["TELEGRAM_BOT_TOKEN"]
 TELEGRAM_USER_ID = int(os.environ["TELEGRAM_USER_ID"])
 HL_WS_URL = os.getenv("HL_WS_URL", "wss://api.hyperliquid.xyz/ws")
+HL_API_URL = os.getenv("HL_API_URL", "https://api.hyperliquid.xyz/info")
 DATA_DIR = os.getenv("DATA_DIR", "data")
+
+# "all" runs everything in one process. "ingest" runs the WebSocket pipeline,
+# formatting and command logic, and "delivery" polls and sends to Telegram;
+# the two talk over the Unix socket at IPC_SOCKET.
+BOT_ROLE = os.getenv("BOT_ROLE", "all").strip().lower()
+IPC_SOCKET = os.getenv("IPC_SOCKET", os.path.join(DATA_DIR, "ipc.sock"))
+# "asyncio" or "uvloop"; uvloop falls back to asyncio when it is not installed.
+EVENT_LOOP = os.getenv("EVENT_LOOP", "asyncio")
+
+# "channels" subscribes to userFills, userFundings and ledger updates per
+# wallet. "events" uses the combined userEvents feed for one wallet (its
+# frames name no user, so one per connection) plus ledger updates only
+# when that wallet has transfers enabled; other wallets use channels.
+WS_SUBSCRIPTION_MODE = os.getenv("WS_SUBSCRIPTION_MODE", "channels").strip().lower()
+# Independent WebSocket connections carrying the same subscriptions. Events
+# are deduplicated, so with 2 or more a dropped connection loses nothing.
+WS_CONNECTIONS = max(1, int(os.getenv("WS_CONNECTIONS", "1")))
+# Application-level ping interval, and how long a connection may go without
+# any frame before it is treated as dead and reconnected. 0 disables either.
+WS_PING_INTERVAL_SEC = float(os.getenv("WS_PING_INTERVAL_SEC", "10"))
+WS_STALE_SEC = float(os.getenv("WS_STALE_SEC", "30"))
+
+# Write every accepted event to an on-disk journal, fsynced in groups, and
+# redeliver what Telegram never accepted after a restart. Off by default.
+JOURNAL_ENABLED = _env_flag("JOURNAL_ENABLED", False)
+JOURNAL_SEGMENT_MB = float(os.getenv("JOURNAL_SEGMENT_MB", "8"))
+JOURNAL_RETENTION_HOURS = float(os.getenv("JOURNAL_RETENTION_HOURS", "72"))
+JOURNAL_MAX_MB = float(os.getenv("JOURNAL_MAX_MB", "256"))
+
+# /alert price alerts, checked on Hyperliquid's allMids stream while any are set.
+PRICE_ALERTS_ENABLED = _env_flag("PRICE_ALERTS_ENABLED", True)
+
+# Warn when a watched position's mid comes within LIQ_PROXIMITY_PCT percent of
+# its liquidation price. Positions are re-read over REST after each wallet's
+# fills and fully every LIQ_PROXIMITY_RESYNC_SEC, so it is off (0) by
+# default. The warning is re-armed at twice the distance, which has to stay
+# below 100%, so values must be below 50.
+LIQ_PROXIMITY_PCT = float(os.getenv("LIQ_PROXIMITY_PCT", "0"))
+if not 0 <= LIQ_PROXIMITY_PCT < 50:
+    raise SystemExit(f"LIQ_PROXIMITY_PCT must be at least 0 and below 50, got {LIQ_PROXIMITY_PCT:g}")
+LIQ_PROXIMITY_RESYNC_SEC = float(os.getenv("LIQ_PROXIMITY_RESYNC_SEC", "300"))
+
+# Keep received fills, funding and ledger updates in a columnar store under
+# DATA_DIR/history for /history. Off by default.
+HISTORY_ENABLED = _env_flag("HISTORY_ENABLED", False)
+HISTORY_CACHE_MB = float(os.getenv("HISTORY_CACHE_MB", "64"))
+
+ANALYTICS_SNAPSHOT_SEC = float(os.getenv("ANALYTICS_SNAPSHOT_SEC", "60"))
+
+# Send funding payments, transfers and price alerts from a background queue
+# instead of the WebSocket handler, so slow Telegram sends do not hold up
+# reading frames, and the liquidations in later frames reach their fast lane
+# at once. false sends them inline, which keeps them in order with fill
+# messages but lets a burst of them delay liquidations by whole seconds.
+DELIVERY_QUEUE_ENABLED = _env_flag("DELIVERY_QUEUE_ENABLED", True)
+
+# "wallet" sends one funding digest per opted-in wallet, "global" one for all of them.
+FUNDING_DIGEST_MODE = os.getenv("FUNDING_DIGEST_MODE", "wallet").strip().lower()
+FUNDING_DIGEST_WINDOW_SEC = float(os.getenv("FUNDING_DIGEST_WINDOW_SEC", "60"))
+
+# Seconds to wait for more coin batches from the same wallet before sending a
+# combined basket message. 0 disables the basket tier.
+BASKET_WINDOW_SEC = float(os.getenv("BASKET_WINDOW_SEC", "0"))
+
+# Seconds to wait for the same coin and direction from other watched wallets
+# before sending one combined message. 0 disables cross-wallet clustering.
+CLUSTER_WINDOW_SEC = float(os.getenv("CLUSTER_WINDOW_SEC", "0"))
+
+# "window" batches fills per wallet, coin and direction over AGGREGATION_WINDOW_SEC;
+# "oid" batches per order and flushes after AGGREGATION_IDLE_SEC without a fill,
+# or as soon as orderUpdates reports the order done when ORDER_UPDATES_ENABLED.
+AGGREGATION_MODE = os.getenv("AGGREGATION_MODE", "window").strip().lower()
+AGGREGATION_WINDOW_SEC = float(os.getenv("AGGREGATION_WINDOW_SEC", "2"))
+AGGREGATION_IDLE_SEC = float(os.getenv("AGGREGATION_IDLE_SEC", "10"))
+ORDER_UPDATES_ENABLED = _env_flag("ORDER_UPDATES_ENABLED", False)
+
+# Send the first batch for a wallet, coin and direction as a message and
+# edit it with the running totals for later batches, at most once every
+# LIVE_CARDS_EDIT_INTERVAL_SEC, until LIVE_CARDS_SESSION_SEC pass without one.
+LIVE_CARDS_ENABLED = _env_flag("LIVE_CARDS_ENABLED", False)
+LIVE_CARDS_EDIT_INTERVAL_SEC = float(os.getenv("LIVE_CARDS_EDIT_INTERVAL_SEC", "3"))
+LIVE_CARDS_SESSION_SEC = float(os.getenv("LIVE_CARDS_SESSION_SEC", "300"))
+
+# A wallet producing more than FLOOD_MAX_EVENTS events within FLOOD_WINDOW_SEC
+# switches to one summary message every FLOOD_SUMMARY_SEC, and back once its
+# rate drops below FLOOD_RESUME_EVENTS (half the limit by default). Liquidations
+# are always sent. 0 disables flood protection.
+FLOOD_MAX_EVENTS = int(os.getenv("FLOOD_MAX_EVENTS", "0"))
+FLOOD_WINDOW_SEC = float(os.getenv("FLOOD_WINDOW_SEC", "60"))
+FLOOD_RESUME_EVENTS = int(os.getenv("FLOOD_RESUME_EVENTS", str(FLOOD_MAX_EVENTS // 2)))
+FLOOD_SUMMARY_SEC = float(os.getenv("FLOOD_SUMMARY_SEC", "300"))
+
+# How long a flushed opening batch waits for its position lookup, which
+# started with the batch's first fill, before being sent without it.
+POSITION_PREFETCH_TIMEOUT_SEC = float(os.getenv("POSITION_PREFETCH_TIMEOUT_SEC", "2"))
+
+# Learn the window mode's window per wallet (or per wallet and coin) from the
+# gaps between its fills, within these bounds. AGGREGATION_WINDOW_SEC is used
+# until enough gaps have been seen.
+AGGREGATION_ADAPTIVE = _env_flag("AGGREGATION_ADAPTIVE", False)
+AGGREGATION_ADAPTIVE_PER_COIN = _env_flag("AGGREGATION_ADAPTIVE_PER_COIN", False)
+AGGREGATION_MIN_WINDOW_SEC = float(os.getenv("AGGREGATION_MIN_WINDOW_SEC", "0.5"))
+AGGREGATION_MAX_WINDOW_SEC = float(os.getenv("AGGREGATION_MAX_WINDOW_SEC", "8"))
+
+# Track TWAP orders from their slice fills and report progress at these
+# percentages of the order size and on completion, instead of per slice. A
+# TWAP without a slice for TWAP_IDLE_SEC is reported as ended. Off by
+# default: it costs two more subscriptions per wallet.
+TWAP_ENABLED = _env_flag("TWAP_ENABLED", False)
+TWAP_MILESTONES = tuple(
+    float(m) for m in os.getenv("TWAP_MILESTONES", "25,50,75").split(",") if m.strip()
+)
+TWAP_IDLE_SEC = float(os.getenv("TWAP_IDLE_SEC", "600"))
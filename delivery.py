@@ -0,0 +1,94 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+logger = logging.getLogger(__name__)
+
+Send = Callable[..., Awaitable[None]]
+
+
+class Delivery:
+    # Two lanes between the WebSocket reader and Telegram. Urgent events
+    # (liquidations) are handed to a task and go out through a reserved
+    # slot that normal traffic cannot occupy; urgent sends run one at a time
+    # so they keep their order. With queued=True, normal events are queued
+    # and sent by background workers in arrival order, so a burst of funding
+    # payments or transfers never holds up frame decoding. Otherwise they
+    # are sent inline and the reader waits for each send.
+    def __init__(self, workers: int = 1, max_queue: int = 10_000, queued: bool = True):
+        self.workers = max(1, workers)
+        self.queued = queued
+        self._queue: asyncio.Queue = asyncio.Queue(max_queue)
+        self._urgent_slot = asyncio.Lock()
+        self._urgent: set[asyncio.Task] = set()
+        self._tasks: list[asyncio.Task] = []
+        self._unfinished = 0
+        self.sent = 0
+        self.urgent_sent = 0
+
+    @property
+    def backlog(self) -> int:
+        return self._queue.qsize()
+
+    @property
+    def pending(self) -> int:
+        return self._unfinished + len(self._urgent)
+
+    async def start(self):
+        if self.queued and not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self, timeout: float = 5.0):
+        # Whatever is still queued after the timeout stays unacknowledged in
+        # the journal and is redelivered on the next start.
+        try:
+            await asyncio.wait_for(self.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Stopping delivery with {self.pending} events unsent")
+        for task in [*self._tasks, *self._urgent]:
+            task.cancel()
+        await asyncio.gather(*self._tasks, *self._urgent, return_exceptions=True)
+        self._tasks = []
+
+    async def join(self):
+        await self._queue.join()
+        while self._urgent:
+            await asyncio.gather(*list(self._urgent), return_exceptions=True)
+
+    async def submit(self, send: Send, *args):
+        if not self.queued:
+            await self._send(send, args)
+            self.sent += 1
+            return
+        # Blocks only when max_queue events are already waiting, which pushes
+        # back on the reader instead of growing without bound.
+        self._unfinished += 1
+        await self._queue.put((send, args))
+
+    def submit_urgent(self, send: Send, *args) -> asyncio.Task:
+        task = asyncio.create_task(self._send_urgent(send, args))
+        self._urgent.add(task)
+        task.add_done_callback(self._urgent.discard)
+        return task
+
+    async def _send_urgent(self, send: Send, args: tuple):
+        async with self._urgent_slot:
+            await self._send(send, args)
+            self.urgent_sent += 1
+
+    async def _worker(self):
+        while True:
+            send, args = await self._queue.get()
+            try:
+                await self._send(send, args)
+                self.sent += 1
+            finally:
+                self._unfinished -= 1
+                self._queue.task_done()
+
+    @staticmethod
+    async def _send(send: Send, args: tuple):
+        try:
+            await send(*args)
+        except Exception as e:
+            logger.error(f"Delivery failed: {e}")
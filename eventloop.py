@@ -0,0 +1,32 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Event loop implementations selectable with EVENT_LOOP. uvloop is not a
+# dependency; selecting it without the package installed falls back to the
+# standard asyncio loop with a warning.
+LOOPS = ("asyncio", "uvloop")
+
+
+def install(name: str) -> str:
+    # Sets the loop policy used by asyncio.run and run_polling, and returns
+    # the name of the loop that will actually run.
+    name = (name or "asyncio").strip().lower()
+    if name not in LOOPS:
+        logger.warning(f"Unknown EVENT_LOOP {name!r}, using asyncio")
+        return "asyncio"
+    if name == "uvloop":
+        try:
+            import uvloop
+        except ImportError:
+            logger.warning("EVENT_LOOP=uvloop but uvloop is not installed, using asyncio")
+            return "asyncio"
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return name
+
+
+def current() -> str:
+    # Name of the running loop's implementation, for /status.
+    module = type(asyncio.get_running_loop()).__module__
+    return "uvloop" if module.startswith("uvloop") else "asyncio"
@@ -1,3 +1,4 @@
+from datetime import datetime, timezone
 from html import escape
 
 
@@ -96,6 +97,172 @@ def format_aggregated_fills(fills: list[dict], wallet: str, position_info: dict
     return render_message_html(f"{side} {coin}", rows, accent="Trades")
 
 
+def format_basket(batches: list[list[dict]], wallet: str) -> str:
+    rows = []
+    total_notional = 0.0
+    total_pnl = 0.0
+    fill_count = 0
+    for fills in sorted(batches, key=lambda b: b[0].get("coin", "")):
+        first = fills[0]
+        coin = first.get("coin", "???")
+        direction = first.get("dir", "") or first.get("side", "").upper()
+        sz = sum(float(f.get("sz", 0)) for f in fills)
+        notional = sum(float(f.get("sz", 0)) * float(f.get("px", 0)) for f in fills)
+        pnl = sum(float(f.get("closedPnl", 0)) for f in fills)
+        avg_px = notional / sz if sz > 0 else 0
+        total_notional += notional
+        total_pnl += pnl
+        fill_count += len(fills)
+
+        value = f"{direction} {format_number(sz, 4)} @ ${format_number(avg_px)}"
+        if pnl != 0:
+            value = f"{value}, PnL {format_signed_usd(pnl)}"
+        rows.append((coin, value))
+
+    rows.append(("Notional", f"${format_number(total_notional)}"))
+    if total_pnl != 0:
+        rows.append(("Total PnL", format_signed_usd(total_pnl)))
+    rows.append(("Fills", str(fill_count)))
+    rows.append(("Wallet", short_addr(wallet)))
+    return render_message_html(f"Basket {len(batches)} coins", rows, accent="Trades")
+
+
+def format_cluster(entries: list[tuple[str, list[dict]]]) -> str:
+    first = entries[0][1][0]
+    coin = first.get("coin", "???")
+    direction = first.get("dir", "") or first.get("side", "").upper()
+
+    rows = []
+    total_sz = 0.0
+    total_notional = 0.0
+    total_pnl = 0.0
+    for wallet, fills in entries:
+        sz = sum(float(f.get("sz", 0)) for f in fills)
+        notional = sum(float(f.get("sz", 0)) * float(f.get("px", 0)) for f in fills)
+        pnl = sum(float(f.get("closedPnl", 0)) for f in fills)
+        avg_px = notional / sz if sz > 0 else 0
+        total_sz += sz
+        total_notional += notional
+        total_pnl += pnl
+
+        value = f"{format_number(sz, 4)} @ ${format_number(avg_px)}"
+        if pnl != 0:
+            value = f"{value}, PnL {format_signed_usd(pnl)}"
+        rows.append((short_addr(wallet), value))
+
+    avg_px = total_notional / total_sz if total_sz > 0 else 0
+    rows.append(("Total", f"{format_number(total_sz, 4)} {coin} @ ${format_number(avg_px)}"))
+    if total_pnl != 0:
+        rows.append(("Total PnL", format_signed_usd(total_pnl)))
+    return render_message_html(
+        f"{direction} {coin} · {len(entries)} wallets",
+        rows,
+        accent="Trades",
+    )
+
+
+def format_twap_progress(state, wallet: str, reason: str) -> str:
+    # state is an aggregator.TwapState; reason is a milestone such as "50%",
+    # "completed", "ended", "terminated" or "error".
+    coin = state.coin or "???"
+    direction = state.direction or "TWAP"
+    filled = f"{format_number(state.filled_sz, 4)} {coin}"
+    if state.target_sz:
+        filled = f"{filled} / {format_number(state.target_sz, 4)}"
+    if state.progress is not None:
+        filled = f"{filled} ({state.progress:.0f}%)"
+
+    rows = [
+        ("Filled", filled),
+        ("Avg price", f"${format_number(state.avg_px)}"),
+        ("Notional", f"${format_number(state.notional)}"),
+    ]
+    if state.closed_pnl != 0:
+        rows.append(("PnL", format_signed_usd(state.closed_pnl)))
+    elapsed = f"{state.elapsed_sec / 60:.0f}m"
+    if state.minutes:
+        elapsed = f"{elapsed} / {state.minutes}m"
+    rows.append(("Slices", f"{state.slices} over {elapsed}"))
+    rows.append(("Wallet", short_addr(wallet)))
+    return render_message_html(f"TWAP {direction} {coin} · {reason}", rows, accent="Trades")
+
+
+def format_flood_notice(wallet: str, rate: float, window_sec: float, summary_sec: float) -> str:
+    return render_message_html(
+        "Summary mode",
+        [
+            ("Rate", f"{rate:.0f} events per {window_sec:g}s"),
+            ("Summaries", f"every {summary_sec / 60:g}m until it calms down"),
+            ("Wallet", short_addr(wallet)),
+        ],
+        accent="⏸",
+    )
+
+
+def format_flood_summary(summary, wallet: str, event_types: set[str] | None = None) -> str:
+    # summary is an aggregator.FloodSummary; event_types limits the rows to
+    # the wallet's enabled notifications.
+    event_types = event_types if event_types is not None else {"fills", "funding", "transfers"}
+    rows = []
+    if summary.fills and "fills" in event_types:
+        coins = ", ".join(coin for coin, _ in summary.coins.most_common(5))
+        rows.append(("Fills", f"{summary.fills} ({coins})"))
+        rows.append(("Volume", f"${format_number(summary.volume)}"))
+        if summary.closed_pnl != 0:
+            rows.append(("PnL", format_signed_usd(summary.closed_pnl)))
+        rows.append(("Fees", f"${format_number(summary.fees)}"))
+    if summary.fundings and "funding" in event_types:
+        rows.append(("Funding", f"{format_signed_usd(summary.funding)} over {summary.fundings} payments"))
+    if summary.transfers and "transfers" in event_types:
+        rows.append(("Transfers", str(summary.transfers)))
+    if not rows:
+        rows.append(("Events", "none"))
+    minutes = (summary.ended_at - summary.started_at) / 60
+    rows.append(("Period", f"{minutes:.0f}m"))
+    rows.append(("Wallet", short_addr(wallet)))
+    if summary.resumed:
+        rows.append(("Mode", "back to individual alerts"))
+    return render_message_html("Activity summary", rows, accent="⏸")
+
+
+def format_price_alert(alert, price: float) -> str:
+    # alert is an alerts.PriceAlert.
+    return render_message_html(
+        f"{alert.coin} {alert.direction} ${format_number(alert.price, 6).rstrip('0').rstrip('.')}",
+        [
+            ("Price", f"${format_number(price, 6).rstrip('0').rstrip('.')}"),
+            ("Alert", f"#{alert.id}"),
+        ],
+        accent="🔔",
+    )
+
+
+def format_alert_list(alerts: list) -> str:
+    if not alerts:
+        return "No price alerts set"
+    lines = ["<b>Price alerts</b>"]
+    for alert in alerts:
+        price = format_number(alert.price, 6).rstrip("0").rstrip(".")
+        lines.append(f"#{alert.id} {escape(alert.coin)} {alert.direction} ${price}")
+    return "\n".join(lines)
+
+
+def format_liq_proximity(warning, wallet: str) -> str:
+    # warning is an alerts.LiquidationWarning.
+    side = "Long" if warning.szi > 0 else "Short"
+    return render_message_html(
+        f"{warning.coin} {side} near liquidation",
+        [
+            ("Price", f"${format_number(warning.price, 6).rstrip('0').rstrip('.')}"),
+            ("Liq. price", f"${format_number(warning.liquidation_px, 6).rstrip('0').rstrip('.')}"),
+            ("Distance", f"{format_number(warning.distance * 100)}%"),
+            ("Size", format_number(abs(warning.szi), 4)),
+            ("Wallet", short_addr(wallet)),
+        ],
+        accent="⚠️",
+    )
+
+
 def format_liquidation(liq: dict, wallet: str) -> str:
     coin = liq.get("coin", "???")
     sz = float(liq.get("sz", 0))
@@ -219,3 +386,114 @@ def format_positions(positions: list[dict], wallet: str, report: dict | None = N
         lines.append(render_message_html(coin, rows))
 
     return "\n".join(lines)
+
+
+def format_history(summary: dict, wallet: str, range_label: str, top: int = 5) -> str:
+    fills = summary["fills"]
+    funding = summary["funding"]
+    transfers = summary["transfers"]
+    lines = [f"<b>History {escape(short_addr(wallet))} ({escape(range_label)})</b>"]
+
+    if not fills["count"] and not funding["count"] and not transfers["count"]:
+        lines.append("No stored events in this range.")
+        return "\n".join(lines)
+
+    if fills["count"]:
+        rows = [
+            ("Fills", str(fills["count"])),
+            ("Volume", f"${format_number(fills['volume'])}"),
+            ("Realized PnL", format_signed_usd(fills["realized_pnl"])),
+            ("Fees", f"${format_number(fills['fees'])}"),
+        ]
+        if fills["liquidations"]:
+            rows.append(("Liquidations", str(fills["liquidations"])))
+        coins = sorted(fills["by_coin"].items(), key=lambda item: -item[1]["volume"])[:top]
+        for coin, totals in coins:
+            rows.append((coin, f"${format_number(totals['volume'])} vol, {format_signed_usd(totals['pnl'])}"))
+        lines.append("")
+        lines.append(render_message_html("Trading", rows))
+
+    if funding["count"]:
+        rows = [
+            ("Payments", str(funding["count"])),
+            ("Net funding", format_signed_usd(funding["total"])),
+        ]
+        coins = sorted(funding["by_coin"].items(), key=lambda item: -abs(item[1]))[:top]
+        for coin, usdc in coins:
+            rows.append((coin, format_signed_usd(usdc)))
+        lines.append("")
+        lines.append(render_message_html("Funding", rows))
+
+    if transfers["count"]:
+        rows = [("Transfers", str(transfers["count"]))]
+        for kind, usdc in sorted(transfers["by_kind"].items()):
+            rows.append((kind, f"${format_number(abs(usdc))}"))
+        lines.append("")
+        lines.append(render_message_html("Transfers", rows))
+
+    return "\n".join(lines)
+
+
+def format_pnl(totals_by_coin: dict, wallet: str, range_label: str, top: int = 5) -> str:
+    title = f"PnL {short_addr(wallet)} ({range_label})"
+    if not totals_by_coin:
+        return f"<b>{escape(title)}</b>\nNo fills or funding in this range."
+
+    realized = sum(t.realized_pnl for t in totals_by_coin.values())
+    fees = sum(t.fees for t in totals_by_coin.values())
+    funding = sum(t.funding for t in totals_by_coin.values())
+    volume = sum(t.volume for t in totals_by_coin.values())
+    fills = sum(t.fills for t in totals_by_coin.values())
+    rows = [
+        ("Realized PnL", format_signed_usd(realized)),
+        ("Fees", f"${format_number(fees)}"),
+        ("Funding", format_signed_usd(funding)),
+        ("Net", format_signed_usd(realized - fees + funding)),
+        ("Volume", f"${format_number(volume)}"),
+        ("Fills", str(fills)),
+    ]
+    coins = sorted(totals_by_coin.items(), key=lambda item: -abs(item[1].net))[:top]
+    for coin, totals in coins:
+        rows.append((coin, format_signed_usd(totals.net)))
+    return render_message_html(title, rows)
+
+
+def format_funding_digest(entries: list[tuple[str, dict]]) -> str:
+    by_wallet: dict[str, dict[str, list[float]]] = {}
+    for wallet, funding in entries:
+        coins = by_wallet.setdefault(wallet, {})
+        usdc = float(funding.get("usdc", 0))
+        try:
+            rate = float(funding.get("fundingRate", 0))
+        except (ValueError, TypeError):
+            rate = 0.0
+        totals = coins.setdefault(funding.get("coin", "???"), [0.0, rate])
+        totals[0] += usdc
+        totals[1] = rate
+
+    times = [funding.get("time") for _, funding in entries if funding.get("time")]
+    title = "Funding digest"
+    if times:
+        hour = datetime.fromtimestamp(min(times) / 1000, timezone.utc)
+        title = f"{title} {hour:%H}:00 UTC"
+
+    lines = [f"<b>{escape(title)}</b>"]
+    grand_total = 0.0
+    for wallet, coins in by_wallet.items():
+        total = sum(usdc for usdc, _ in coins.values())
+        grand_total += total
+        rows = [
+            (coin, f"{format_signed_usd(usdc)} ({format_percent(annualize_funding_rate(rate))} annualized)")
+            for coin, (usdc, rate) in sorted(coins.items(), key=lambda item: item[1][0])
+        ]
+        rows.append(("Total", format_signed_usd(total)))
+        lines.append("")
+        lines.append(render_message_html(short_addr(wallet), rows))
+
+    if len(by_wallet) > 1:
+        lines.append("")
+        lines.append(
+            f"<b>All wallets:</b> {escape(format_signed_usd(grand_total))} "
+            f"across {len(entries)} payments"
+        )
+    return "\n".join(lines)
@@ -0,0 +1,418 @@
+import asyncio
+import json
+import logging
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+from itertools import compress, pairwise
+from operator import and_, mul
+from pathlib import Path
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+# Column name -> array typecode. "H" columns are dictionary encoded: they hold
+# an index into a per-partition string list kept alongside the zone map.
+TABLES = {
+    "fills": {
+        "time": "q",
+        "coin": "H",
+        "dir": "H",
+        "px": "d",
+        "sz": "d",
+        "closed_pnl": "d",
+        "fee": "d",
+        "tid": "q",
+        "oid": "q",
+        "liquidation": "B",
+    },
+    "funding": {
+        "time": "q",
+        "coin": "H",
+        "usdc": "d",
+        "szi": "d",
+        "rate": "d",
+    },
+    "transfers": {
+        "time": "q",
+        "kind": "H",
+        "usdc": "d",
+    },
+}
+EVENT_TABLES = {
+    "fills": "fills",
+    "liquidations": "fills",
+    "funding": "funding",
+    "transfers": "transfers",
+}
+ZONES_FILE = "_zones.json"
+
+
+def _float(value) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def day_of(time_ms: int) -> str:
+    return datetime.fromtimestamp(time_ms / 1000, timezone.utc).strftime("%Y-%m-%d")
+
+
+def extract_row(table: str, data: dict) -> dict | None:
+    time_ms = data.get("time")
+    if not isinstance(time_ms, int):
+        return None
+
+    if table == "fills":
+        return {
+            "time": time_ms,
+            "coin": data.get("coin", "???"),
+            "dir": data.get("dir", ""),
+            "px": _float(data.get("px")),
+            "sz": _float(data.get("sz")),
+            "closed_pnl": _float(data.get("closedPnl")),
+            "fee": _float(data.get("fee")),
+            "tid": int(data.get("tid") or 0),
+            "oid": int(data.get("oid") or 0),
+            "liquidation": 1 if data.get("liquidation") else 0,
+        }
+    if table == "funding":
+        return {
+            "time": time_ms,
+            "coin": data.get("coin", "???"),
+            "usdc": _float(data.get("usdc")),
+            "szi": _float(data.get("szi")),
+            "rate": _float(data.get("fundingRate")),
+        }
+    # Ledger updates nest the payload under "delta"; older payloads are flat.
+    delta = data.get("delta") or data
+    return {
+        "time": time_ms,
+        "kind": delta.get("type", "unknown"),
+        "usdc": _float(delta.get("usdc", delta.get("amount"))),
+    }
+
+
+@dataclass
+class Zone:
+    # Per (table, day, wallet) partition: durable row count, time bounds and
+    # the string dictionaries, used to skip partitions without reading them.
+    rows: int = 0
+    min_time: int | None = None
+    max_time: int | None = None
+    sorted: bool = True
+    dicts: dict[str, list[str]] = field(default_factory=dict)
+
+
+class HistoryStore:
+    def __init__(
+        self,
+        directory: str | Path,
+        flush_interval: float = 5.0,
+        cache_bytes: int = 64 * 1024 * 1024,
+    ):
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.cache_bytes = cache_bytes
+        self.rows_written = 0
+        self._zones: dict[tuple[str, str], dict[str, Zone]] = {}
+        self._codes: dict[tuple, dict[str, int]] = {}
+        self._buffers: dict[tuple[str, str, str], dict[str, array]] = {}
+        self._checked: set[tuple[str, str, str]] = set()
+        self._cache: OrderedDict[tuple, array] = OrderedDict()
+        self._cache_size = 0
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    def open(self):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for table in TABLES:
+            for path in sorted((self.directory / table).glob(f"*/{ZONES_FILE}")):
+                try:
+                    raw = json.loads(path.read_text())
+                except (OSError, json.JSONDecodeError) as e:
+                    logger.error(f"Skipping unreadable history zone map {path}: {e}")
+                    continue
+                self._zones[(table, path.parent.name)] = {
+                    wallet: Zone(**zone) for wallet, zone in raw.items()
+                }
+
+    @property
+    def pending_rows(self) -> int:
+        return sum(len(columns["time"]) for columns in self._buffers.values())
+
+    def append(self, wallet: str, event_type: str, data: dict):
+        table = EVENT_TABLES.get(event_type)
+        if not table:
+            return
+        row = extract_row(table, data)
+        if row is None:
+            return
+
+        day = day_of(row["time"])
+        zone = self._zones.setdefault((table, day), {}).setdefault(wallet, Zone())
+        key = (table, day, wallet)
+        columns = self._buffers.get(key)
+        if columns is None:
+            columns = self._buffers[key] = {
+                column: array(typecode) for column, typecode in TABLES[table].items()
+            }
+        for column, typecode in TABLES[table].items():
+            value = row[column]
+            if typecode == "H":
+                value = self._encode(key, zone, column, value)
+            columns[column].append(value)
+
+    def _encode(self, key: tuple, zone: Zone, column: str, value: str) -> int:
+        codes = self._codes.get((*key, column))
+        if codes is None:
+            values = zone.dicts.setdefault(column, [])
+            codes = self._codes[(*key, column)] = {v: i for i, v in enumerate(values)}
+        code = codes.get(value)
+        if code is None:
+            values = zone.dicts[column]
+            code = codes[value] = len(values)
+            values.append(value)
+        return code
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"History flush failed: {e}")
+
+    async def flush(self):
+        async with self._lock:
+            buffers, self._buffers = self._buffers, {}
+            if not buffers:
+                return
+            starts = {
+                key: self._zones[key[:2]][key[2]].rows
+                for key in buffers
+                if key not in self._checked
+            }
+            await asyncio.to_thread(self._write_columns, buffers, starts)
+            self._checked.update(starts)
+
+            touched = set()
+            for (table, day, wallet), columns in buffers.items():
+                zone = self._zones[(table, day)][wallet]
+                times = columns["time"]
+                if zone.sorted and (
+                    (zone.max_time is not None and times[0] < zone.max_time)
+                    or any(b < a for a, b in pairwise(times))
+                ):
+                    zone.sorted = False
+                low, high = min(times), max(times)
+                zone.min_time = low if zone.min_time is None else min(zone.min_time, low)
+                zone.max_time = high if zone.max_time is None else max(zone.max_time, high)
+                zone.rows += len(times)
+                self.rows_written += len(times)
+                touched.add((table, day))
+                for column in columns:
+                    cached = self._cache.pop((table, day, wallet, column), None)
+                    if cached is not None:
+                        self._cache_size -= cached.itemsize * len(cached)
+
+            snapshots = {
+                key: json.dumps({w: asdict(z) for w, z in self._zones[key].items()})
+                for key in touched
+            }
+            await asyncio.to_thread(self._write_zones, snapshots)
+
+    def _partition_dir(self, table: str, day: str, wallet: str) -> Path:
+        return self.directory / table / day / wallet
+
+    def _write_columns(self, buffers: dict, starts: dict):
+        for key, columns in buffers.items():
+            directory = self._partition_dir(*key)
+            directory.mkdir(parents=True, exist_ok=True)
+            for column, values in columns.items():
+                path = directory / f"{column}.col"
+                # The first write to a partition after startup drops any tail
+                # left by a crash between the column and zone map writes.
+                if key in starts and path.exists():
+                    with open(path, "r+b") as f:
+                        f.truncate(starts[key] * values.itemsize)
+                with open(path, "ab") as f:
+                    values.tofile(f)
+
+    def _write_zones(self, snapshots: dict[tuple[str, str], str]):
+        for (table, day), payload in snapshots.items():
+            path = self.directory / table / day / ZONES_FILE
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(payload)
+            tmp.replace(path)
+
+    def _column(self, table: str, day: str, wallet: str, column: str, rows: int) -> array:
+        key = (table, day, wallet, column)
+        cached = self._cache.get(key)
+        if cached is not None and len(cached) == rows:
+            self._cache.move_to_end(key)
+            return cached
+
+        values = array(TABLES[table][column])
+        path = self._partition_dir(table, day, wallet) / f"{column}.col"
+        try:
+            with open(path, "rb") as f:
+                values.frombytes(f.read(rows * values.itemsize))
+        except FileNotFoundError:
+            pass
+        if len(values) < rows:
+            values.extend([0] * (rows - len(values)))
+
+        if cached is not None:
+            self._cache_size -= cached.itemsize * len(cached)
+        self._cache[key] = values
+        self._cache_size += values.itemsize * len(values)
+        while self._cache_size > self.cache_bytes and len(self._cache) > 1:
+            _, evicted = self._cache.popitem(last=False)
+            self._cache_size -= evicted.itemsize * len(evicted)
+        return values
+
+    def clear_cache(self):
+        self._cache.clear()
+        self._cache_size = 0
+
+    def scan(
+        self,
+        table: str,
+        columns: list[str],
+        start_ms: int | None = None,
+        end_ms: int | None = None,
+        wallets: list[str] | None = None,
+        coins: list[str] | None = None,
+    ) -> Iterator[tuple[str, Zone, dict[str, list]]]:
+        # Yields (wallet, zone, {column: values}) per partition for rows with
+        # start_ms <= time < end_ms. Only the requested columns are read, days
+        # and partitions outside the range or without a matching coin are
+        # skipped from the zone maps alone, and sorted partitions are cut with
+        # a binary search on the time column. Dictionary encoded columns come
+        # back as codes; decode them with zone.dicts[column].
+        wanted = {w.lower() for w in wallets} if wallets else None
+        first_day = day_of(start_ms) if start_ms is not None else None
+        last_day = day_of(end_ms - 1) if end_ms is not None else None
+        wanted_coins = set(coins) if coins else None
+
+        for (zone_table, day), partitions in sorted(self._zones.items()):
+            if zone_table != table:
+                continue
+            if (first_day and day < first_day) or (last_day and day > last_day):
+                continue
+            for wallet, zone in list(partitions.items()):
+                rows = zone.rows
+                if not rows or (wanted is not None and wallet not in wanted):
+                    continue
+                if start_ms is not None and zone.max_time < start_ms:
+                    continue
+                if end_ms is not None and zone.min_time >= end_ms:
+                    continue
+
+                coin_codes = None
+                if wanted_coins is not None:
+                    dictionary = zone.dicts.get("coin", [])
+                    coin_codes = {i for i, coin in enumerate(dictionary) if coin in wanted_coins}
+                    if not coin_codes:
+                        continue
+                    if len(coin_codes) == len(dictionary):
+                        coin_codes = None
+
+                lo, hi, mask = 0, rows, None
+                cut_start = start_ms is not None and zone.min_time < start_ms
+                cut_end = end_ms is not None and zone.max_time >= end_ms
+                if cut_start or cut_end:
+                    times = self._column(table, day, wallet, "time", rows)
+                    if zone.sorted:
+                        lo = bisect_left(times, start_ms) if cut_start else 0
+                        hi = bisect_left(times, end_ms) if cut_end else rows
+                        if lo >= hi:
+                            continue
+                    else:
+                        low = start_ms if cut_start else zone.min_time
+                        high = end_ms if cut_end else zone.max_time + 1
+                        mask = [low <= t < high for t in times]
+                if coin_codes is not None:
+                    codes = self._column(table, day, wallet, "coin", rows)
+                    if lo or hi != rows:
+                        codes = codes[lo:hi]
+                    coin_mask = list(map(coin_codes.__contains__, codes))
+                    mask = coin_mask if mask is None else list(map(and_, mask, coin_mask))
+
+                if mask is not None and not any(mask):
+                    continue
+                data = {}
+                for column in columns:
+                    values = self._column(table, day, wallet, column, rows)
+                    if lo or hi != rows:
+                        values = values[lo:hi]
+                    if mask is not None:
+                        values = list(compress(values, mask))
+                    data[column] = values
+                yield wallet, zone, data
+
+    def total(self, table: str, column: str, **filters) -> float:
+        return sum(sum(data[column]) for _, _, data in self.scan(table, [column], **filters))
+
+    def count(self, table: str, **filters) -> int:
+        return sum(len(data["time"]) for _, _, data in self.scan(table, ["time"], **filters))
+
+    def summary(self, wallet: str, start_ms: int | None = None, end_ms: int | None = None) -> dict:
+        filters = {"start_ms": start_ms, "end_ms": end_ms, "wallets": [wallet]}
+
+        fills = {"count": 0, "volume": 0.0, "realized_pnl": 0.0, "fees": 0.0, "liquidations": 0}
+        fill_coins = defaultdict(lambda: {"volume": 0.0, "pnl": 0.0})
+        for _, zone, data in self.scan(
+            "fills", ["coin", "px", "sz", "closed_pnl", "fee", "liquidation"], **filters,
+        ):
+            notional = list(map(mul, data["px"], data["sz"]))
+            fills["count"] += len(notional)
+            fills["volume"] += sum(notional)
+            fills["realized_pnl"] += sum(data["closed_pnl"])
+            fills["fees"] += sum(data["fee"])
+            fills["liquidations"] += sum(data["liquidation"])
+            names = zone.dicts["coin"]
+            for code, value, pnl in zip(data["coin"], notional, data["closed_pnl"]):
+                entry = fill_coins[names[code]]
+                entry["volume"] += value
+                entry["pnl"] += pnl
+        fills["by_coin"] = dict(fill_coins)
+
+        funding = {"count": 0, "total": 0.0}
+        funding_coins = defaultdict(float)
+        for _, zone, data in self.scan("funding", ["coin", "usdc"], **filters):
+            funding["count"] += len(data["usdc"])
+            funding["total"] += sum(data["usdc"])
+            names = zone.dicts["coin"]
+            for code, usdc in zip(data["coin"], data["usdc"]):
+                funding_coins[names[code]] += usdc
+        funding["by_coin"] = dict(funding_coins)
+
+        transfers = {"count": 0}
+        transfer_kinds = defaultdict(float)
+        for _, zone, data in self.scan("transfers", ["kind", "usdc"], **filters):
+            transfers["count"] += len(data["usdc"])
+            names = zone.dicts["kind"]
+            for code, usdc in zip(data["kind"], data["usdc"]):
+                transfer_kinds[names[code]] += usdc
+        transfers["by_kind"] = dict(transfer_kinds)
+
+        return {"fills": fills, "funding": funding, "transfers": transfers}
@@ -2,9 +2,11 @@ import asyncio
 import aiohttp
 import logging
 
+from config import HL_API_URL
+
 logger = logging.getLogger(__name__)
 
-API_URL = "https://api.hyperliquid.xyz/info"
+API_URL = HL_API_URL
 REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=5)
 _session: aiohttp.ClientSession | None = None
 
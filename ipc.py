@@ -0,0 +1,372 @@
+import asyncio
+import json
+import logging
+import struct
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from telegram import InlineKeyboardMarkup
+from telegram.error import BadRequest, TelegramError
+
+logger = logging.getLogger(__name__)
+
+# Link between the ingest process (WebSocket pipeline, aggregation,
+# formatting and command logic) and the delivery process (Telegram polling
+# and sending). Every message is a fixed binary header followed by a compact
+# JSON body:
+#
+#   length: u32   body size in bytes
+#   kind:   u8    CALL, RESULT or UPDATE
+#   id:     u32   request id a RESULT answers (0 for UPDATE)
+#
+# CALL asks the delivery process to make one Bot API call and RESULT carries
+# its outcome back; UPDATE forwards a command or button press to ingest.
+HEADER = struct.Struct("!IBI")
+CALL = 1
+RESULT = 2
+UPDATE = 3
+MAX_BODY = 16 * 1024 * 1024
+
+# The Bot API methods ingest may call through the delivery process.
+CALLS = ("send_message", "edit_message_text", "edit_message_reply_markup", "answer_callback_query")
+
+OnUpdate = Callable[[dict], Awaitable[None]]
+
+
+def encode(kind: int, request_id: int, body: dict) -> bytes:
+    payload = json.dumps(body, separators=(",", ":"), ensure_ascii=False).encode()
+    return HEADER.pack(len(payload), kind, request_id) + payload
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[int, int, dict]:
+    length, kind, request_id = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if length > MAX_BODY:
+        raise ValueError(f"IPC message of {length} bytes exceeds the {MAX_BODY} byte limit")
+    return kind, request_id, json.loads(await reader.readexactly(length))
+
+
+class _Peer:
+    # One connected socket. Frames are written whole under a lock so
+    # concurrent senders never interleave.
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self._lock = asyncio.Lock()
+
+    async def send(self, kind: int, request_id: int, body: dict):
+        async with self._lock:
+            self.writer.write(encode(kind, request_id, body))
+            await self.writer.drain()
+
+    async def close(self):
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except (ConnectionError, OSError):
+            pass
+
+
+class IPCServer:
+    # Delivery side. Listens on a Unix socket, runs each CALL against the
+    # real Telegram bot as its own task, so a slow send never holds up an
+    # urgent one behind it, and pushes UPDATEs to the connected ingest
+    # process.
+    def __init__(self, path: str | Path, bot):
+        self.path = Path(path)
+        self.bot = bot
+        self.calls = 0
+        self._server: asyncio.AbstractServer | None = None
+        self._peer: _Peer | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def connected(self) -> bool:
+        return self._peer is not None
+
+    async def start(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # A socket file left behind by a crashed run would make bind fail.
+        if self.path.exists():
+            self.path.unlink()
+        self._server = await asyncio.start_unix_server(self._handle, path=str(self.path))
+        logger.info(f"Delivery listening on {self.path}")
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        if self._peer:
+            await self._peer.close()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self.path.exists():
+            self.path.unlink()
+
+    async def push_update(self, body: dict) -> bool:
+        peer = self._peer
+        if peer is None:
+            return False
+        try:
+            await peer.send(UPDATE, 0, body)
+        except (ConnectionError, OSError) as e:
+            logger.warning(f"Failed to forward update to ingest: {e}")
+            return False
+        return True
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = _Peer(reader, writer)
+        if self._peer:
+            logger.warning("New ingest connection replaces the previous one")
+            await self._peer.close()
+        self._peer = peer
+        logger.info("Ingest connected")
+        try:
+            while True:
+                kind, request_id, body = await read_message(reader)
+                if kind != CALL:
+                    logger.warning(f"Ignoring IPC message of kind {kind} from ingest")
+                    continue
+                task = asyncio.create_task(self._call(peer, request_id, body))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            logger.error(f"Dropping ingest connection: {e}")
+        finally:
+            if self._peer is peer:
+                self._peer = None
+                logger.warning("Ingest disconnected")
+            await peer.close()
+
+    async def _call(self, peer: _Peer, request_id: int, body: dict):
+        method = body.get("method")
+        params = dict(body.get("params") or {})
+        try:
+            if method not in CALLS:
+                raise ValueError(f"Unsupported call {method}")
+            if params.get("reply_markup"):
+                params["reply_markup"] = InlineKeyboardMarkup.de_json(params["reply_markup"], self.bot)
+            result = await getattr(self.bot, method)(**params)
+            response = {"ok": True, "message_id": getattr(result, "message_id", None)}
+        except BadRequest as e:
+            response = {"ok": False, "error": e.message, "bad_request": True}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        self.calls += 1
+        try:
+            await peer.send(RESULT, request_id, response)
+        except (ConnectionError, OSError) as e:
+            logger.warning(f"Lost result of {method}: {e}")
+
+
+class IPCClient:
+    # Ingest side. Keeps a connection to the delivery process, reconnecting
+    # with backoff, and matches RESULTs to pending calls by request id.
+    # Calls made while disconnected wait up to connect_timeout for the link.
+    def __init__(self, path: str | Path, on_update: OnUpdate | None = None, connect_timeout: float = 30.0):
+        self.path = Path(path)
+        self.on_update = on_update
+        self.connect_timeout = connect_timeout
+        self.reconnects = 0
+        self._peer: _Peer | None = None
+        self._connected = asyncio.Event()
+        self._pending: dict[int, asyncio.Future] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._next_id = 1
+        self._task: asyncio.Task | None = None
+
+    @property
+    def connected(self) -> bool:
+        return self._peer is not None
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def wait_connected(self, timeout: float | None = None):
+        await asyncio.wait_for(self._connected.wait(), timeout)
+
+    async def call(self, method: str, **params) -> dict:
+        try:
+            await self.wait_connected(self.connect_timeout)
+        except asyncio.TimeoutError:
+            raise ConnectionError(f"Delivery process not reachable at {self.path}") from None
+        request_id = self._next_id
+        self._next_id = (self._next_id % 0xFFFFFFFF) + 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[request_id] = future
+        try:
+            await self._peer.send(CALL, request_id, {"method": method, "params": params})
+            return await future
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def _run(self):
+        delay = 0.1
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(str(self.path))
+            except (FileNotFoundError, ConnectionError, OSError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, 5.0)
+                continue
+            delay = 0.1
+            self._peer = _Peer(reader, writer)
+            self._connected.set()
+            logger.info(f"Connected to delivery at {self.path}")
+            try:
+                await self._read(reader)
+            except (asyncio.IncompleteReadError, ConnectionError):
+                pass
+            except Exception as e:
+                logger.error(f"Dropping delivery connection: {e}")
+            finally:
+                self._connected.clear()
+                peer, self._peer = self._peer, None
+                for future in self._pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("Delivery connection lost"))
+                await peer.close()
+            self.reconnects += 1
+            logger.warning("Delivery disconnected, reconnecting")
+
+    async def _read(self, reader: asyncio.StreamReader):
+        while True:
+            kind, request_id, body = await read_message(reader)
+            if kind == RESULT:
+                future = self._pending.get(request_id)
+                if future and not future.done():
+                    future.set_result(body)
+            elif kind == UPDATE and self.on_update:
+                task = asyncio.create_task(self._dispatch(body))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, body: dict):
+        try:
+            await self.on_update(body)
+        except Exception as e:
+            logger.error(f"Failed to handle forwarded update: {e}")
+
+
+class RemoteBot:
+    # Stands in for telegram.Bot in the ingest process. Failures surface as
+    # the same exceptions the real bot raises, so send paths need no
+    # changes.
+    def __init__(self, client: IPCClient):
+        self.client = client
+
+    async def _call(self, method: str, **params) -> dict:
+        markup = params.get("reply_markup")
+        if markup is not None:
+            params["reply_markup"] = markup.to_dict()
+        result = await self.client.call(method, **{k: v for k, v in params.items() if v is not None})
+        if result.get("ok"):
+            return result
+        if result.get("bad_request"):
+            raise BadRequest(result.get("error", ""))
+        raise TelegramError(result.get("error", "delivery call failed"))
+
+    async def send_message(self, chat_id: int, text: str, parse_mode: str | None = None, reply_markup=None):
+        result = await self._call(
+            "send_message", chat_id=chat_id, text=text, parse_mode=parse_mode, reply_markup=reply_markup,
+        )
+        return RemoteMessage(self, chat_id, result.get("message_id"))
+
+    async def edit_message_text(self, text: str, chat_id: int, message_id: int, parse_mode: str | None = None):
+        await self._call("edit_message_text", chat_id=chat_id, message_id=message_id, text=text, parse_mode=parse_mode)
+
+    async def edit_message_reply_markup(self, chat_id: int, message_id: int, reply_markup=None):
+        await self._call("edit_message_reply_markup", chat_id=chat_id, message_id=message_id, reply_markup=reply_markup)
+
+    async def answer_callback_query(self, callback_query_id: str, text: str | None = None):
+        await self._call("answer_callback_query", callback_query_id=callback_query_id, text=text)
+
+
+class RemoteApplication:
+    # The part of telegram.ext.Application the send paths use.
+    def __init__(self, bot: RemoteBot):
+        self.bot = bot
+
+
+# A forwarded command or button press, shaped like the parts of
+# telegram.Update and CallbackContext the command handlers read.
+class RemoteMessage:
+    def __init__(self, bot: RemoteBot, chat_id: int, message_id: int | None, text: str = ""):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.text = text
+
+    async def reply_text(self, text: str, parse_mode: str | None = None, reply_markup=None):
+        return await self.bot.send_message(self.chat_id, text, parse_mode=parse_mode, reply_markup=reply_markup)
+
+
+class RemoteCallbackQuery:
+    def __init__(self, bot: RemoteBot, query_id: str, data: str, message: RemoteMessage):
+        self.bot = bot
+        self.id = query_id
+        self.data = data
+        self.message = message
+
+    async def answer(self, text: str | None = None):
+        await self.bot.answer_callback_query(self.id, text=text)
+
+    async def edit_message_reply_markup(self, reply_markup=None):
+        await self.bot.edit_message_reply_markup(self.message.chat_id, self.message.message_id, reply_markup)
+
+
+class RemoteUser:
+    def __init__(self, user_id: int):
+        self.id = user_id
+
+
+class RemoteUpdate:
+    def __init__(self, bot: RemoteBot, body: dict):
+        self.effective_user = RemoteUser(body.get("user_id"))
+        chat_id = body.get("chat_id")
+        self.message = RemoteMessage(bot, chat_id, body.get("message_id"), body.get("text", ""))
+        self.callback_query = None
+        if "callback_id" in body:
+            self.callback_query = RemoteCallbackQuery(bot, body["callback_id"], body.get("data", ""), self.message)
+
+
+class RemoteContext:
+    def __init__(self, args: list[str]):
+        self.args = args
+
+
+def update_body(update) -> dict:
+    # Delivery side: the fields of a telegram.Update that ingest needs.
+    query = update.callback_query
+    message = query.message if query else update.message
+    body = {
+        "user_id": update.effective_user.id,
+        "chat_id": message.chat_id,
+        "message_id": message.message_id,
+    }
+    if query:
+        body.update(callback_id=query.id, data=query.data)
+    else:
+        body["text"] = message.text or ""
+    return body
+
+
+def parse_command(text: str) -> tuple[str, list[str]]:
+    # "/watch@my_bot 0xabc main" -> ("watch", ["0xabc", "main"])
+    parts = text.split()
+    if not parts or not parts[0].startswith("/"):
+        return "", []
+    return parts[0][1:].split("@", 1)[0].lower(), parts[1:]
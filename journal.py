@@ -0,0 +1,300 @@
+import asyncio
+import json
+import logging
+import os
+import struct
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Each record is a fixed header followed by a compact JSON payload of
+# [wallet, event_type, data]. The CRC covers the payload so a torn write at
+# the tail of the last segment is detected and truncated on open.
+HEADER = struct.Struct("<IIQd")
+ACK = struct.Struct("<Q")
+SEGMENT_SUFFIX = ".seg"
+ACKS_FILE = "acks.log"
+
+
+@dataclass
+class Entry:
+    offset: int
+    timestamp: float
+    wallet: str
+    event_type: str
+    data: dict
+
+
+@dataclass
+class _Segment:
+    base: int
+    path: Path
+    size: int = 0
+    entries: int = 0
+    last_offset: int = -1
+    last_timestamp: float = 0.0
+
+
+def _segment_path(directory: Path, base: int) -> Path:
+    return directory / f"{base:020d}{SEGMENT_SUFFIX}"
+
+
+def encode_record(offset: int, timestamp: float, wallet: str, event_type: str, data: dict) -> bytes:
+    payload = json.dumps([wallet, event_type, data], separators=(",", ":")).encode()
+    return HEADER.pack(len(payload), zlib.crc32(payload), offset, timestamp) + payload
+
+
+def read_records(path: Path) -> tuple[list[Entry], int]:
+    # Returns the decoded entries and the byte length of the valid prefix.
+    entries = []
+    valid = 0
+    with open(path, "rb") as f:
+        buf = f.read()
+    pos = 0
+    while pos + HEADER.size <= len(buf):
+        length, crc, offset, timestamp = HEADER.unpack_from(buf, pos)
+        end = pos + HEADER.size + length
+        payload = buf[pos + HEADER.size:end]
+        if end > len(buf) or zlib.crc32(payload) != crc:
+            break
+        wallet, event_type, data = json.loads(payload)
+        entries.append(Entry(offset, timestamp, wallet, event_type, data))
+        pos = valid = end
+    return entries, valid
+
+
+class Journal:
+    def __init__(
+        self,
+        directory: str | Path,
+        segment_bytes: int = 8 * 1024 * 1024,
+        retention_sec: float = 72 * 3600,
+        max_bytes: int = 256 * 1024 * 1024,
+        flush_interval: float = 0.05,
+        compact_interval: float = 60.0,
+    ):
+        self.directory = Path(directory)
+        self.segment_bytes = segment_bytes
+        self.retention_sec = retention_sec
+        self.max_bytes = max_bytes
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.fsyncs = 0
+        self._segments: list[_Segment] = []
+        self._file = None
+        self._acks_file = None
+        self._next_offset = 0
+        self._durable_offset = -1
+        self._pending: list[tuple[int, float, bytes]] = []
+        self._pending_acks: list[int] = []
+        self._unacked: set[int] = set()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def next_offset(self) -> int:
+        return self._next_offset
+
+    @property
+    def durable_offset(self) -> int:
+        return self._durable_offset
+
+    @property
+    def unacked(self) -> int:
+        return len(self._unacked)
+
+    @property
+    def size_bytes(self) -> int:
+        return sum(segment.size for segment in self._segments)
+
+    def open(self) -> list[Entry]:
+        # Loads existing segments and returns every entry that was never
+        # acknowledged, oldest first, so the caller can redeliver it.
+        self.directory.mkdir(parents=True, exist_ok=True)
+        acked = self._load_acks()
+
+        redeliver = []
+        for path in sorted(self.directory.glob(f"*{SEGMENT_SUFFIX}")):
+            entries, valid = read_records(path)
+            if valid != path.stat().st_size:
+                logger.warning(f"Truncating torn journal tail in {path.name} at byte {valid}")
+                with open(path, "r+b") as f:
+                    f.truncate(valid)
+            segment = _Segment(int(path.stem), path, valid, len(entries))
+            if entries:
+                segment.last_offset = entries[-1].offset
+                segment.last_timestamp = entries[-1].timestamp
+                self._next_offset = max(self._next_offset, segment.last_offset + 1)
+            self._segments.append(segment)
+            for entry in entries:
+                if entry.offset not in acked:
+                    redeliver.append(entry)
+                    self._unacked.add(entry.offset)
+
+        self._durable_offset = self._next_offset - 1
+        if not self._segments:
+            self._segments.append(_Segment(self._next_offset, _segment_path(self.directory, self._next_offset)))
+        self._file = open(self._segments[-1].path, "ab")
+        self._acks_file = open(self.directory / ACKS_FILE, "ab")
+        return redeliver
+
+    def _load_acks(self) -> set[int]:
+        path = self.directory / ACKS_FILE
+        if not path.exists():
+            return set()
+        raw = path.read_bytes()
+        usable = len(raw) - len(raw) % ACK.size
+        return {offset for (offset,) in ACK.iter_unpack(raw[:usable])}
+
+    def append(self, wallet: str, event_type: str, data: dict) -> int:
+        # Cheap and synchronous: the record is encoded into memory and made
+        # durable by the next group commit.
+        offset = self._next_offset
+        self._next_offset += 1
+        timestamp = time.time()
+        self._pending.append((offset, timestamp, encode_record(offset, timestamp, wallet, event_type, data)))
+        self._unacked.add(offset)
+        return offset
+
+    def ack(self, *offsets: int):
+        for offset in offsets:
+            if offset in self._unacked:
+                self._unacked.discard(offset)
+                self._pending_acks.append(offset)
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+        for f in (self._file, self._acks_file):
+            if f:
+                f.close()
+        self._file = self._acks_file = None
+
+    async def flush(self):
+        async with self._lock:
+            records, self._pending = self._pending, []
+            acks, self._pending_acks = self._pending_acks, []
+            if not records and not acks:
+                return
+            await asyncio.to_thread(self._write, records, acks)
+
+    def _write(self, records: list[tuple[int, float, bytes]], acks: list[int]):
+        # Records must hit disk before the acks that refer to them.
+        if records:
+            chunk = []
+            segment = self._segments[-1]
+            for offset, timestamp, record in records:
+                if segment.size and segment.size + len(record) > self.segment_bytes:
+                    self._commit(chunk)
+                    chunk = []
+                    segment = self._roll(offset)
+                chunk.append(record)
+                segment.size += len(record)
+                segment.entries += 1
+                segment.last_offset = offset
+                segment.last_timestamp = timestamp
+            self._commit(chunk)
+            self._durable_offset = records[-1][0]
+
+        if acks:
+            self._acks_file.write(b"".join(ACK.pack(offset) for offset in acks))
+            self._acks_file.flush()
+            os.fsync(self._acks_file.fileno())
+            self.fsyncs += 1
+
+    def _commit(self, chunk: list[bytes]):
+        if not chunk:
+            return
+        self._file.write(b"".join(chunk))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self.fsyncs += 1
+
+    def _roll(self, base: int) -> _Segment:
+        self._file.close()
+        segment = _Segment(base, _segment_path(self.directory, base))
+        self._segments.append(segment)
+        self._file = open(segment.path, "ab")
+        return segment
+
+    async def _flush_loop(self):
+        last_compact = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - last_compact >= self.compact_interval:
+                    last_compact = time.monotonic()
+                    async with self._lock:
+                        await asyncio.to_thread(self.compact, set(self._unacked))
+            except Exception as e:
+                logger.error(f"Journal flush failed: {e}")
+
+    def compact(self, unacked: set[int] | None = None, now: float | None = None):
+        # Sealed segments past the retention age, or beyond the size budget
+        # (oldest first), are deleted when fully acknowledged and otherwise
+        # rewritten to keep only their unacknowledged entries.
+        unacked = self._unacked if unacked is None else unacked
+        now = time.time() if now is None else now
+        sealed = self._segments[:-1]
+        total = self.size_bytes
+        changed = False
+        for segment in sealed:
+            expired = now - segment.last_timestamp > self.retention_sec
+            if not expired and total <= self.max_bytes:
+                break
+            pending = [o for o in unacked if segment.base <= o <= segment.last_offset]
+            if pending and len(pending) == segment.entries:
+                continue
+            total -= segment.size
+            changed = True
+            if not pending:
+                segment.path.unlink(missing_ok=True)
+                self._segments.remove(segment)
+                continue
+            keep = set(pending)
+            entries, _ = read_records(segment.path)
+            records = [
+                encode_record(e.offset, e.timestamp, e.wallet, e.event_type, e.data)
+                for e in entries
+                if e.offset in keep
+            ]
+            tmp = segment.path.with_suffix(".tmp")
+            with open(tmp, "wb") as f:
+                f.write(b"".join(records))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, segment.path)
+            segment.size = sum(len(r) for r in records)
+            segment.entries = len(records)
+            total += segment.size
+
+        if changed:
+            self._rewrite_acks()
+
+    def _rewrite_acks(self):
+        # Acks below the oldest retained offset can no longer matter.
+        floor = self._segments[0].base
+        acked = [offset for offset in self._load_acks() if offset >= floor]
+        self._acks_file.close()
+        path = self.directory / ACKS_FILE
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(b"".join(ACK.pack(offset) for offset in sorted(acked)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        self._acks_file = open(path, "ab")
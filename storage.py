@@ -1,3 +1,4 @@
+import copy
 import json
 from pathlib import Path
 from config import DATA_DIR
@@ -9,6 +10,7 @@ DEFAULT_EVENTS = {
     "liquidations": True,
     "funding": True,
     "transfers": True,
+    "liq_proximity": True,
 }
 
 DEFAULT_FUNDING_FILTERS = {
@@ -37,6 +39,7 @@ def _normalize_wallet(wallet: dict) -> dict:
         if k in funding_filters
     })
     wallet["funding_filters"] = normalized_filters
+    wallet["funding_digest"] = bool(wallet.get("funding_digest", False))
     return wallet
 
 
@@ -48,9 +51,16 @@ def _load() -> dict:
 
 
 def _save(data: dict):
+    global _wallet_cache
     CONFIG_PATH.parent.mkdir(parents=True, exist_ok=True)
     with open(CONFIG_PATH, "w") as f:
         json.dump(data, f, indent=2)
+    _wallet_cache = None
+
+
+# Parsed wallets for get_wallet, keyed by the config file's mtime and size so
+# an edit made outside the bot is still picked up.
+_wallet_cache: tuple[tuple[int, int], dict] | None = None
 
 
 def get_wallets() -> dict:
@@ -61,6 +71,24 @@ def get_wallets() -> dict:
     }
 
 
+def get_wallet(address: str) -> dict | None:
+    # One wallet's label, events, funding filters and digest flag, for hot
+    # paths that need several of them. The file is only parsed again after
+    # it changed; callers get their own copy.
+    global _wallet_cache
+    try:
+        stat = CONFIG_PATH.stat()
+    except FileNotFoundError:
+        return None
+    key = (stat.st_mtime_ns, stat.st_size)
+    if _wallet_cache is None or _wallet_cache[0] != key:
+        _wallet_cache = (key, _load()["wallets"])
+    wallet = _wallet_cache[1].get(address.lower())
+    if wallet is None:
+        return None
+    return _normalize_wallet(copy.deepcopy(wallet))
+
+
 def add_wallet(address: str, label: str | None = None) -> bool:
     address = address.lower()
     data = _load()
@@ -75,6 +103,7 @@ def add_wallet(address: str, label: str | None = None) -> bool:
         "label": normalized_label,
         "events": {**DEFAULT_EVENTS},
         "funding_filters": {**DEFAULT_FUNDING_FILTERS},
+        "funding_digest": False,
     }
     _save(data)
     return True
@@ -102,9 +131,13 @@ def toggle_event(address: str, event_type: str) -> bool | None:
     address = address.lower()
     data = _load()
     wallet = data["wallets"].get(address)
-    if not wallet or event_type not in wallet["events"]:
+    if not wallet:
         return None
-    wallet["events"][event_type] = not wallet["events"][event_type]
+    # Wallets saved before an event type existed get it with its default.
+    events = wallet["events"] = {**DEFAULT_EVENTS, **wallet.get("events", {})}
+    if event_type not in events:
+        return None
+    events[event_type] = not events[event_type]
     _save(data)
     return wallet["events"][event_type]
 
@@ -183,3 +216,25 @@ def set_funding_filters(
     data["wallets"][address] = normalized
     _save(data)
     return normalized["funding_filters"]
+
+
+def get_funding_digest(address: str) -> bool:
+    address = address.lower()
+    wallets = get_wallets()
+    if address not in wallets:
+        return False
+    return wallets[address]["funding_digest"]
+
+
+def set_funding_digest(address: str, enabled: bool) -> bool | None:
+    address = address.lower()
+    data = _load()
+    wallet = data["wallets"].get(address)
+    if not wallet:
+        return None
+
+    normalized = _normalize_wallet(wallet)
+    normalized["funding_digest"] = enabled
+    data["wallets"][address] = normalized
+    _save(data)
+    return enabled
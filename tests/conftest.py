@@ -2,6 +2,8 @@ import os
 import sys
 from pathlib import Path
 
+import pytest
+
 
 ROOT = Path(__file__).resolve().parent.parent
 if str(ROOT) not in sys.path:
@@ -9,3 +11,8 @@ if str(ROOT) not in sys.path:
 
 os.environ.setdefault("TELEGRAM_BOT_TOKEN", "test-token")
 os.environ.setdefault("TELEGRAM_USER_ID", "123")
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
@@ -0,0 +1,316 @@
+import pytest
+
+from aggregator import (
+    BasketAggregator,
+    ClusterAggregator,
+    FillAggregator,
+    FloodGuard,
+    FundingDigest,
+    LiveCards,
+    TwapAggregator,
+    WindowLearner,
+)
+from clock import VirtualClock
+
+
+def make_fill(coin="ETH", direction="Open Long", sz="1", oid=None):
+    fill = {"coin": coin, "dir": direction, "sz": sz, "px": "100"}
+    if oid is not None:
+        fill["oid"] = oid
+    return fill
+
+
+@pytest.mark.anyio
+async def test_fills_within_window_are_batched_per_key():
+    clock = VirtualClock()
+    batches = []
+
+    async def on_batch(wallet, fills):
+        batches.append((clock.time(), wallet, len(fills)))
+
+    aggregator = FillAggregator(on_batch=on_batch, window_sec=2.0, clock=clock)
+    await aggregator.add_fill("0xabc", make_fill())
+    await clock.advance(1.5)
+    await aggregator.add_fill("0xabc", make_fill())
+    await aggregator.add_fill("0xabc", make_fill(coin="BTC"))
+    await clock.advance(1.9)
+
+    assert batches == []
+
+    await clock.advance(0.1)
+
+    assert sorted(batches) == [(3.5, "0xabc", 1), (3.5, "0xabc", 2)]
+
+
+@pytest.mark.anyio
+async def test_fills_separated_by_more_than_window_flush_separately():
+    clock = VirtualClock()
+    batches = []
+
+    async def on_batch(wallet, fills):
+        batches.append(len(fills))
+
+    aggregator = FillAggregator(on_batch=on_batch, window_sec=2.0, clock=clock)
+    for _ in range(3):
+        await aggregator.add_fill("0xabc", make_fill())
+        await clock.advance(5)
+
+    assert batches == [1, 1, 1]
+
+
+@pytest.mark.anyio
+async def test_funding_digest_collects_each_interval_per_wallet():
+    clock = VirtualClock()
+    digests = []
+
+    async def on_digest(entries):
+        digests.append(sorted((wallet, f["coin"]) for wallet, f in entries))
+
+    digest = FundingDigest(on_digest=on_digest, window_sec=60, clock=clock)
+    hour = 1_767_225_600_000
+    await digest.add_funding("0xaaa", {"time": hour, "coin": "ETH"})
+    await digest.add_funding("0xbbb", {"time": hour, "coin": "ETH"})
+    await clock.advance(30)
+    await digest.add_funding("0xaaa", {"time": hour + 5, "coin": "BTC"})
+    await digest.add_funding("0xaaa", {"time": hour + 3_600_000, "coin": "ETH"})
+    await clock.advance(30)
+
+    assert sorted(digests) == [
+        [("0xaaa", "BTC"), ("0xaaa", "ETH")],
+        [("0xbbb", "ETH")],
+    ]
+
+    grouped = FundingDigest(on_digest=on_digest, window_sec=60, group_wallets=True, clock=clock)
+    digests.clear()
+    await grouped.add_funding("0xaaa", {"time": hour, "coin": "ETH"})
+    await grouped.add_funding("0xbbb", {"time": hour, "coin": "SOL"})
+    await clock.run_until_idle()
+
+    assert digests[-1] == [("0xaaa", "ETH"), ("0xbbb", "SOL")]
+
+
+@pytest.mark.anyio
+async def test_basket_combines_batches_flushing_together():
+    clock = VirtualClock()
+    singles, baskets = [], []
+
+    async def on_batch(wallet, fills):
+        singles.append((wallet, fills[0]["coin"]))
+
+    async def on_basket(wallet, batches):
+        baskets.append((wallet, [b[0]["coin"] for b in batches]))
+
+    basket = BasketAggregator(on_batch=on_batch, on_basket=on_basket, window_sec=1.0, clock=clock)
+    aggregator = FillAggregator(on_batch=basket.add_batch, window_sec=2.0, clock=clock)
+    for coin in ("ETH", "BTC", "SOL"):
+        await aggregator.add_fill("0xaaa", make_fill(coin=coin))
+    await aggregator.add_fill("0xbbb", make_fill())
+    await clock.advance(2.9)
+
+    assert baskets == [] and singles == []
+
+    await clock.advance(0.1)
+
+    assert baskets == [("0xaaa", ["ETH", "BTC", "SOL"])]
+    assert singles == [("0xbbb", "ETH")]
+
+
+@pytest.mark.anyio
+async def test_cluster_groups_same_coin_and_direction_across_wallets():
+    clock = VirtualClock()
+    singles, clusters = [], []
+
+    async def on_batch(wallet, fills):
+        singles.append((wallet, fills[0]["coin"], len(fills)))
+
+    async def on_cluster(entries):
+        clusters.append(sorted((wallet, len(fills)) for wallet, fills in entries))
+
+    cluster = ClusterAggregator(on_batch=on_batch, on_cluster=on_cluster, window_sec=2.0, clock=clock)
+    await cluster.add_batch("0xaaa", [make_fill()])
+    await clock.advance(1)
+    await cluster.add_batch("0xbbb", [make_fill(), make_fill()])
+    await cluster.add_batch("0xccc", [make_fill(direction="Open Short")])
+    await clock.advance(1)
+
+    assert clusters == [[("0xaaa", 1), ("0xbbb", 2)]]
+
+    await cluster.add_batch("0xaaa", [make_fill(coin="BTC")])
+    await cluster.add_batch("0xaaa", [make_fill(coin="BTC")])
+    await clock.advance(2)
+
+    assert singles == [("0xccc", "ETH", 1), ("0xaaa", "BTC", 2)]
+
+
+@pytest.mark.anyio
+async def test_oid_mode_batches_per_order_until_idle_or_completion():
+    clock = VirtualClock()
+    batches = []
+
+    async def on_batch(wallet, fills):
+        batches.append((clock.time(), [f["oid"] for f in fills]))
+
+    aggregator = FillAggregator(on_batch=on_batch, clock=clock, mode="oid", idle_sec=10.0)
+    await aggregator.add_fill("0xabc", make_fill(oid=1))
+    await aggregator.add_fill("0xabc", make_fill(oid=2))
+    await clock.advance(8)
+    await aggregator.add_fill("0xabc", make_fill(oid=1))
+    await clock.advance(1)
+    await aggregator.complete_order(1)
+    await clock.advance(0.5)
+
+    assert batches == [(9.25, [1, 1])]
+
+    await clock.advance(0.5)
+    assert batches[-1] == (10.0, [2])
+
+    # A fill arriving after its order completed only waits for the grace period.
+    await aggregator.add_fill("0xabc", make_fill(oid=1))
+    await clock.advance(0.25)
+    assert batches[-1] == (10.25, [1])
+
+
+@pytest.mark.anyio
+async def test_oid_mode_batches_fills_without_oid_per_coin():
+    clock = VirtualClock()
+    batches = []
+
+    async def on_batch(wallet, fills):
+        batches.append((clock.time(), len(fills)))
+
+    aggregator = FillAggregator(on_batch=on_batch, clock=clock, mode="oid", window_sec=2.0, idle_sec=10.0)
+    await aggregator.add_fill("0xabc", make_fill())
+    await aggregator.add_fill("0xabc", make_fill())
+    await clock.advance(2)
+
+    assert batches == [(2.0, 2)]
+    assert aggregator._order_keys == {}
+
+
+@pytest.mark.anyio
+async def test_twap_reports_milestones_and_completion():
+    clock = VirtualClock()
+    reports = []
+
+    async def on_progress(state, reason):
+        reports.append((reason, state.filled_sz, state.slices))
+
+    twap = TwapAggregator(on_progress=on_progress, milestones=(25, 50, 75), idle_sec=600, clock=clock)
+    activated = {"twapId": 7, "status": {"status": "activated"}, "state": {"coin": "ETH", "sz": "10", "minutes": 30}}
+    await twap.update("0xabc", activated)
+
+    for i in range(3):
+        await twap.add_slice("0xabc", 7, make_fill(sz="1"))
+    assert reports == [("25%", 3.0, 3)]
+
+    # A large slice crossing two milestones reports only the highest one.
+    await twap.add_slice("0xabc", 7, make_fill(sz="5"))
+    await twap.add_slice("0xabc", 7, make_fill(sz="2"))
+    assert reports[1:] == [("75%", 8.0, 4), ("completed", 10.0, 5)]
+
+    # A TWAP that just stops filling is reported after the idle timeout.
+    await twap.add_slice("0xabc", 8, make_fill(sz="1"))
+    await clock.advance(600)
+    assert reports[-1] == ("ended", 1.0, 1)
+
+
+@pytest.mark.anyio
+async def test_adaptive_window_follows_each_wallets_fill_cadence():
+    clock = VirtualClock()
+    batches = []
+
+    async def on_batch(wallet, fills):
+        batches.append((clock.time(), wallet, len(fills)))
+
+    learner = WindowLearner(2.0, min_sec=0.5, max_sec=8.0)
+    aggregator = FillAggregator(on_batch=on_batch, window_sec=2.0, clock=clock, learner=learner)
+
+    # A slow iceberg filling every 4s and a trader placing single fills.
+    for _ in range(8):
+        await aggregator.add_fill("0xslow", make_fill())
+        await aggregator.add_fill("0xfast", make_fill(coin="BTC"))
+        await clock.advance(4)
+        await aggregator.add_fill("0xslow", make_fill())
+        await clock.advance(20)
+
+    assert learner.window("0xslow") == 6.0
+    assert learner.window("0xfast") == 0.5
+    assert learner.stats()[("0xfast", None)] == (0.5, 7)
+
+    batches.clear()
+    await aggregator.add_fill("0xslow", make_fill())
+    await aggregator.add_fill("0xfast", make_fill(coin="BTC"))
+    await clock.advance(4)
+    await aggregator.add_fill("0xslow", make_fill())
+    await clock.advance(20)
+
+    assert batches == [(clock.time() - 24 + 0.5, "0xfast", 1), (clock.time() - 20 + 6.0, "0xslow", 2)]
+
+
+@pytest.mark.anyio
+async def test_live_cards_edit_one_message_and_coalesce_updates():
+    clock = VirtualClock()
+    sent = []
+    edits = []
+
+    async def on_send(wallet, fills):
+        sent.append(len(fills))
+        return len(sent)
+
+    async def on_edit(message_id, wallet, fills, new_fills):
+        edits.append((clock.time(), message_id, len(fills), len(new_fills)))
+        return True
+
+    cards = LiveCards(on_send, on_edit, min_edit_interval_sec=3, session_sec=60, clock=clock)
+    await cards.add_batch("0xabc", [make_fill()])
+    await clock.advance(1)
+    await cards.add_batch("0xabc", [make_fill(), make_fill()])
+    await clock.advance(1)
+    await cards.add_batch("0xabc", [make_fill()])
+    await cards.add_batch("0xabc", [make_fill(coin="BTC")])
+    await clock.advance(5)
+    await cards.add_batch("0xabc", [make_fill()])
+
+    # Both updates inside the interval go out as one edit at t=3.
+    assert sent == [1, 1]
+    assert edits == [(3, 1, 4, 3), (7, 1, 5, 1)]
+
+    await clock.advance(60)
+    await cards.add_batch("0xabc", [make_fill()])
+    assert sent == [1, 1, 1]
+
+
+@pytest.mark.anyio
+async def test_flood_guard_summarizes_busy_wallet_with_hysteresis():
+    clock = VirtualClock()
+    summaries = []
+    switches = []
+
+    async def on_summary(summary):
+        summaries.append((clock.time(), summary.fills, summary.resumed))
+
+    async def on_switch(wallet, rate):
+        # A slow notice must not hold up admit().
+        await clock.sleep(30)
+        switches.append((clock.time(), wallet))
+
+    guard = FloodGuard(on_summary, on_switch, max_events=10, window_sec=60, summary_sec=120, clock=clock)
+    admitted = [await guard.admit("0xabc", "fills", make_fill()) for _ in range(12)]
+    assert admitted == [True] * 10 + [False] * 2
+    await clock.advance(0)
+    assert switches == []
+    assert await guard.admit("0xdef", "fills", make_fill())
+
+    # Seven events a minute is under the limit but above the resume level
+    # of five, so the wallet stays in summary mode.
+    for _ in range(20):
+        await clock.advance(9)
+        assert not await guard.admit("0xabc", "fills", make_fill())
+    assert switches == [(30, "0xabc")]
+    assert summaries == [(120, 15, False)]
+    assert guard.summarizing_since("0xabc") == 0
+
+    await clock.advance(60)
+    assert summaries[-1] == (240, 7, True)
+    assert guard.summarizing_since("0xabc") is None
+    assert await guard.admit("0xabc", "fills", make_fill())
@@ -0,0 +1,111 @@
+import pytest
+
+from alerts import ABOVE, BELOW, LiquidationWatch, PriceAlerts
+
+
+def test_crossings_trigger_each_alert_once_per_side():
+    alerts = PriceAlerts()
+    alerts.check({"ETH": "3000", "BTC": "60000"})
+    near = alerts.add("ETH", 3100, ABOVE, save=False)
+    far = alerts.add("ETH", 3200, ABOVE, save=False)
+    dip = alerts.add("ETH", 2900, BELOW, save=False)
+    btc = alerts.add("BTC", 65000, ABOVE, save=False)
+
+    assert alerts.check({"ETH": "3050", "BTC": "60000"}) == []
+    # One tick can jump past several thresholds.
+    triggered = alerts.check({"ETH": "3200", "BTC": "60000"})
+    assert [(alert.id, price) for alert, price in triggered] == [(far.id, 3200.0), (near.id, 3200.0)]
+    assert alerts.check({"ETH": "3200", "BTC": "60000"}) == []
+
+    triggered = alerts.check({"ETH": "2899.5", "BTC": "65000.1"})
+    assert sorted(alert.id for alert, _ in triggered) == [dip.id, btc.id]
+    assert len(alerts) == 0
+
+
+def test_removed_alert_never_triggers():
+    alerts = PriceAlerts()
+    keep = alerts.add("SOL", 150, ABOVE, save=False)
+    gone = alerts.add("SOL", 150, ABOVE, save=False)
+
+    assert alerts.remove(gone.id) == gone
+    assert alerts.remove(gone.id) is None
+    assert [alert for alert, _ in alerts.check({"SOL": "151"})] == [keep]
+
+
+def test_alerts_survive_a_restart(tmp_path):
+    path = tmp_path / "alerts.json"
+    alerts = PriceAlerts(path)
+    first = alerts.add("ETH", 4000, ABOVE)
+    alerts.add("ETH", 2500, BELOW)
+    alerts.remove(first.id)
+
+    reloaded = PriceAlerts(path)
+    reloaded.load()
+    assert [(alert.coin, alert.price, alert.direction) for alert in reloaded.alerts()] == [("ETH", 2500, BELOW)]
+    # Ids are not reused after a restart, even for removed alerts.
+    assert reloaded.add("ETH", 5000, ABOVE, save=False).id == 3
+    assert [alert.price for alert, _ in reloaded.check({"ETH": "2400"})] == [2500]
+
+
+def test_liquidation_watch_warns_once_per_approach():
+    watch = LiquidationWatch(pct=0.05)
+    watch.update("0xabc", "ETH", 2.0, 2850.0)
+    watch.update("0xdef", "ETH", -1.0, 3300.0)
+    assert watch.check({"ETH": "3050"}) == []
+
+    # Within 5% of the long's liquidation price.
+    warnings = watch.check({"ETH": "2990"})
+    assert [(w.wallet, w.coin, round(w.distance, 3)) for w in warnings] == [("0xabc", "ETH", 0.047)]
+    assert watch.check({"ETH": "2960"}) == []
+
+    # Retreating past twice the threshold re-arms it.
+    # The same tick brings the short within its threshold.
+    assert [w.wallet for w in watch.check({"ETH": "3200"})] == ["0xdef"]
+    assert [w.wallet for w in watch.check({"ETH": "2900"})] == ["0xabc"]
+
+
+def test_liquidation_watch_follows_position_changes():
+    watch = LiquidationWatch(pct=0.05)
+    watch.check({"BTC": "60000", "SOL": "150"})
+    # Already inside the threshold when the position is first seen.
+    watch.update("0xabc", "BTC", 0.5, 58000.0)
+    assert [w.coin for w in watch.check({"BTC": "60000", "SOL": "150"})] == ["BTC"]
+
+    # Adding to the position moves the liquidation price and re-arms it.
+    watch.replace("0xabc", [
+        {"coin": "BTC", "szi": "1.0", "liquidation_px": "58500"},
+        {"coin": "SOL", "szi": "-10", "liquidation_px": None},
+    ])
+    assert [w.liquidation_px for w in watch.check({"BTC": "60100", "SOL": "150"})] == [58500.0]
+    assert [p.coin for p in watch.positions("0xabc")] == ["BTC"]
+
+    # A partial resync keeps positions it did not hear about.
+    watch.replace("0xabc", [], complete=False)
+    assert len(watch) == 1
+    watch.replace("0xabc", [])
+    assert len(watch) == 0
+    assert watch.check({"BTC": "50000"}) == []
+
+
+def test_liquidation_watch_ignores_liquidation_price_drift():
+    watch = LiquidationWatch(pct=0.05)
+    watch.update("0xabc", "ETH", 2.0, 2850.0)
+    assert len(watch.check({"ETH": "2990"})) == 1
+
+    # Resyncs of a cross-margin position nudge its liquidation price.
+    for liquidation_px in (2851.0, 2849.5, 2852.0):
+        watch.update("0xabc", "ETH", 2.0, liquidation_px)
+        assert watch.check({"ETH": "2990"}) == []
+
+    # The reset level moved with it: 2852 / 0.9 = 3168.9.
+    assert watch.check({"ETH": "3160"}) == []
+    assert watch.check({"ETH": "3170"}) == []
+    assert len(watch.check({"ETH": "2995"})) == 1
+
+
+def test_liquidation_watch_rejects_thresholds_without_a_long_level():
+    with pytest.raises(ValueError):
+        LiquidationWatch(pct=0.5)
+    with pytest.raises(ValueError):
+        LiquidationWatch(pct=0)
+    assert LiquidationWatch(pct=0.4, reset_pct=0.45).reset_pct == 0.45
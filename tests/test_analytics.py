@@ -0,0 +1,65 @@
+import pytest
+
+from analytics import DAY_MS, HOUR_MS, HOURLY_RETENTION_MS, Analytics
+from clock import VirtualClock
+
+START = 1_767_225_600_000
+
+
+def fill(time_ms, coin="ETH", pnl="0", fee="1", px="100", sz="2"):
+    return {"time": time_ms, "coin": coin, "closedPnl": pnl, "fee": fee, "px": px, "sz": sz}
+
+
+def test_totals_combine_daily_and_hourly_buckets(tmp_path):
+    clock = VirtualClock(start=(START + 3 * DAY_MS + 13 * HOUR_MS) / 1000)
+    analytics = Analytics(tmp_path / "analytics.json", clock=clock)
+    for day in range(4):
+        for hour in (2, 12):
+            t = START + day * DAY_MS + hour * HOUR_MS
+            analytics.record("0xaaa", "fills", fill(t, pnl="10"))
+            analytics.record("0xaaa", "funding", {"time": t, "coin": "BTC", "usdc": "-1.5"})
+    analytics.record("0xaaa", "transfers", {"time": START, "usdc": "5"})
+
+    everything = analytics.totals("0xaaa", START)
+    assert everything["ETH"].realized_pnl == pytest.approx(80)
+    assert everything["ETH"].fees == pytest.approx(8)
+    assert everything["ETH"].volume == pytest.approx(1600)
+    assert everything["ETH"].fills == 8
+    assert everything["BTC"].funding == pytest.approx(-12)
+
+    last_day = analytics.totals("0xaaa", START + 2 * DAY_MS + 5 * HOUR_MS)
+    assert last_day["ETH"].fills == 3
+    assert last_day["BTC"].net == pytest.approx(-4.5)
+    assert analytics.totals("0xbbb", START) == {}
+
+
+def test_long_ranges_fall_back_to_daily_buckets_past_hourly_retention(tmp_path):
+    now = START + 30 * DAY_MS + 13 * HOUR_MS
+    clock = VirtualClock(start=now / 1000)
+    analytics = Analytics(tmp_path / "analytics.json", clock=clock)
+    for day in range(31):
+        analytics.record("0xaaa", "fills", fill(START + day * DAY_MS + 20 * HOUR_MS, pnl="10"))
+    analytics.prune()
+
+    # The first day's hours are long pruned; its daily bucket stands in.
+    month = analytics.totals("0xaaa", now - 30 * DAY_MS)
+    assert month["ETH"].fills == 30
+    assert month["ETH"].realized_pnl == pytest.approx(300)
+    # Within hourly retention the ragged start is still cut by the hour.
+    week = analytics.totals("0xaaa", now - HOURLY_RETENTION_MS)
+    assert week["ETH"].fills == 7
+
+
+@pytest.mark.anyio
+async def test_snapshot_round_trip(tmp_path):
+    clock = VirtualClock(start=(START + HOUR_MS) / 1000)
+    path = tmp_path / "analytics.json"
+    analytics = Analytics(path, clock=clock)
+    analytics.record("0xaaa", "liquidations", fill(START, pnl="-50", fee="0.5"))
+    await analytics.stop()
+
+    restored = Analytics(path, clock=clock)
+    restored.load()
+    totals = restored.totals("0xaaa", START)
+    assert totals["ETH"].realized_pnl == pytest.approx(-50)
+    assert totals["ETH"].net == pytest.approx(-50.5)
@@ -1,8 +1,11 @@
+import asyncio
 from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
 import pytest
 
+from clock import VirtualClock
+
 from bot import (
     TELEGRAM_USER_ID,
     cmd_fundingfilter,
@@ -12,6 +15,9 @@ from bot import (
     format_funding_config,
     format_funding_rule,
     format_wallet_name,
+    parse_alert_price,
+    parse_history_range,
+    split_message,
     parse_optional_threshold,
     resolve_wallet_ref,
     should_send_funding_notification,
@@ -30,6 +36,13 @@ def make_context(*args):
     return SimpleNamespace(args=list(args))
 
 
+def save_wallets(monkeypatch, tmp_path, wallets: dict):
+    import bot
+
+    monkeypatch.setattr(bot.storage, "CONFIG_PATH", tmp_path / "config.json")
+    bot.storage._save({"wallets": wallets})
+
+
 def test_parse_optional_threshold_accepts_off():
     assert parse_optional_threshold("off") is None
     assert parse_optional_threshold("12.5") == 12.5
@@ -195,3 +208,222 @@ async def test_cmd_positions_rejects_unknown_label(monkeypatch):
     update.message.reply_text.assert_awaited_once_with(
         "Wallet not found. /watch it first."
     )
+
+
+def test_parse_alert_price_rejects_non_finite_values():
+    assert parse_alert_price("$64,000.5") == 64000.5
+    for raw in ("nan", "inf", "-inf", "0"):
+        with pytest.raises(ValueError):
+            parse_alert_price(raw)
+
+
+def test_parse_history_range():
+    assert parse_history_range("24h") == 86400
+    assert parse_history_range("2W") == 14 * 86400
+    assert parse_history_range("all") is None
+    with pytest.raises(ValueError):
+        parse_history_range("0d")
+
+
+@pytest.mark.anyio
+async def test_funding_digest_honors_funding_filters(monkeypatch, tmp_path):
+    import bot
+
+    digest = SimpleNamespace(add_funding=AsyncMock())
+    acked = []
+    monkeypatch.setattr("bot.funding_digest", digest)
+    monkeypatch.setattr("bot.acknowledge", lambda *events: acked.extend(events))
+    save_wallets(monkeypatch, tmp_path, {"0xabc": {
+        "funding_digest": True,
+        "funding_filters": {"annualized_threshold": None, "usdc_threshold": 5.0},
+    }})
+
+    small = {"coin": "ETH", "usdc": "-1", "fundingRate": "0.00001"}
+    large = {"coin": "BTC", "usdc": "-12", "fundingRate": "0.00001"}
+    await bot.deliver_event("0xabc", "funding", small)
+    await bot.deliver_event("0xabc", "funding", large)
+
+    digest.add_funding.assert_awaited_once_with("0xabc", large)
+    assert acked == [small]
+
+
+def test_split_message_keeps_sections_whole():
+    text = "\n\n".join(["a" * 30, "b" * 30, "c" * 30])
+
+    assert split_message(text, limit=70) == ["a" * 30 + "\n\n" + "b" * 30, "c" * 30]
+
+
+@pytest.mark.anyio
+async def test_position_lookup_starts_with_first_opening_fill(monkeypatch):
+    import bot
+
+    lookup = AsyncMock(return_value={"leverage": 5, "liquidation_px": "90"})
+    fill_aggregator = SimpleNamespace(add_fill=AsyncMock(), clock=VirtualClock())
+    monkeypatch.setattr("bot.get_position_info", lookup)
+    monkeypatch.setattr("bot.fill_aggregator", fill_aggregator)
+    monkeypatch.setattr("bot.record_event", lambda *args: None)
+    monkeypatch.setattr("bot.position_prefetch", {})
+
+    opening = {"coin": "ETH", "dir": "Open Long", "sz": "1", "px": "100"}
+    await bot.handle_fill("0xabc", opening)
+    await bot.handle_fill("0xabc", dict(opening))
+    await bot.handle_fill("0xabc", {**opening, "coin": "BTC", "dir": "Close Long"})
+
+    assert list(bot.position_prefetch) == [("0xabc", "ETH")]
+    assert await bot.fetch_position_info("0xabc", "ETH") == {"leverage": 5, "liquidation_px": "90"}
+    lookup.assert_awaited_once_with("0xabc", "ETH")
+    assert bot.position_prefetch == {}
+
+
+@pytest.mark.anyio
+async def test_cluster_with_one_enabled_wallet_continues_to_next_tier(monkeypatch):
+    import bot
+
+    downstream = AsyncMock()
+    acked = []
+    monkeypatch.setattr("bot.cluster_aggregator", SimpleNamespace(on_batch=downstream))
+    monkeypatch.setattr("bot.deliver_fills", AsyncMock())
+    monkeypatch.setattr("bot.acknowledge", lambda *events: acked.extend(events))
+    monkeypatch.setattr("bot.storage.is_event_enabled", lambda address, event_type: address == "0xabc")
+
+    muted = [{"coin": "ETH", "dir": "Open Long"}]
+    fills = [{"coin": "ETH", "dir": "Open Long"}]
+    await bot.deliver_cluster([("0xdef", muted), ("0xabc", fills)])
+
+    downstream.assert_awaited_once_with("0xabc", fills)
+    bot.deliver_fills.assert_not_awaited()
+    assert acked == muted
+
+
+@pytest.mark.anyio
+async def test_position_prefetch_ages_on_aggregator_clock_and_is_dropped_by_baskets(monkeypatch):
+    import bot
+
+    clock = VirtualClock()
+    lookup = AsyncMock(return_value={"leverage": 5})
+    monkeypatch.setattr("bot.get_position_info", lookup)
+    monkeypatch.setattr("bot.fill_aggregator", SimpleNamespace(add_fill=AsyncMock(), clock=clock))
+    monkeypatch.setattr("bot.record_event", lambda *args: None)
+    monkeypatch.setattr("bot.position_prefetch", {})
+    monkeypatch.setattr("bot.send_basket", AsyncMock(return_value=True))
+    monkeypatch.setattr("bot.acknowledge", lambda *events: None)
+
+    opening = {"coin": "ETH", "dir": "Open Long", "sz": "1", "px": "100"}
+    await bot.handle_fill("0xabc", opening)
+    first = bot.position_prefetch[("0xabc", "ETH")][1]
+    await clock.advance(31)
+    await bot.handle_fill("0xabc", dict(opening))
+    assert first.cancelled() or first.done()
+    assert bot.position_prefetch[("0xabc", "ETH")][0] == 31
+
+    await bot.deliver_basket("0xabc", [[opening], [{**opening, "coin": "BTC"}]])
+    assert bot.position_prefetch == {}
+
+
+@pytest.mark.anyio
+async def test_live_card_edits_reuse_the_first_position_lookup(monkeypatch):
+    import bot
+    from aggregator import LiveCards
+
+    clock = VirtualClock()
+    lookup = AsyncMock(return_value={"leverage": 5, "liquidation_px": "90"})
+    telegram = SimpleNamespace(
+        send_message=AsyncMock(return_value=SimpleNamespace(message_id=7)),
+        edit_message_text=AsyncMock(),
+    )
+    monkeypatch.setattr("bot.get_position_info", lookup)
+    monkeypatch.setattr("bot.app", SimpleNamespace(bot=telegram))
+    monkeypatch.setattr("bot.fill_aggregator", SimpleNamespace(add_fill=AsyncMock(), clock=clock))
+    monkeypatch.setattr("bot.record_event", lambda *args: None)
+    monkeypatch.setattr("bot.acknowledge", lambda *events: None)
+    monkeypatch.setattr("bot.storage.is_event_enabled", lambda address, event_type: True)
+    monkeypatch.setattr("bot.position_prefetch", {})
+    monkeypatch.setattr("bot.card_positions", bot.OrderedDict())
+    cards = LiveCards(bot.send_fill_card, bot.edit_fill_card, min_edit_interval_sec=0, clock=clock)
+    monkeypatch.setattr("bot.live_cards", cards)
+
+    opening = {"coin": "ETH", "dir": "Open Long", "sz": "1", "px": "100"}
+    await bot.handle_fill("0xabc", opening)
+    await cards.add_batch("0xabc", [opening])
+    for _ in range(3):
+        await clock.advance(5)
+        await bot.handle_fill("0xabc", dict(opening))
+        await cards.add_batch("0xabc", [dict(opening)])
+
+    lookup.assert_awaited_once_with("0xabc", "ETH")
+    assert bot.position_prefetch == {}
+    assert telegram.edit_message_text.await_count == 3
+    assert "5x" in telegram.edit_message_text.await_args.kwargs["text"]
+
+
+@pytest.mark.anyio
+async def test_default_delivery_keeps_the_reader_free_for_liquidations(monkeypatch):
+    import bot
+    from config import DELIVERY_QUEUE_ENABLED
+    from delivery import Delivery
+
+    clock = VirtualClock()
+    sent = []
+
+    async def deliver_event(wallet, event_type, data):
+        await clock.sleep(1)
+        sent.append((event_type, clock.time()))
+
+    delivery = Delivery(queued=DELIVERY_QUEUE_ENABLED)
+    monkeypatch.setattr("bot.delivery", delivery)
+    monkeypatch.setattr("bot.deliver_event", deliver_event)
+    monkeypatch.setattr("bot.record_event", lambda *args: None)
+    monkeypatch.setattr("bot.flood_guard", None)
+    await delivery.start()
+
+    # A burst of funding payments returns to the reader at once, so the
+    # liquidation in the next frame goes out after one send, not twenty.
+    for _ in range(20):
+        await bot.handle_event("0xabc", "funding", {"coin": "ETH"})
+    await bot.handle_event("0xabc", "liquidations", {"coin": "ETH"})
+    await clock.advance(1)
+
+    assert ("liquidations", 1) in sent
+    await delivery.stop(timeout=0)
+
+
+def test_liq_proximity_toggle_is_hidden_while_disabled(monkeypatch):
+    import bot
+    from storage import DEFAULT_EVENTS
+
+    def toggles():
+        markup = bot.format_event_toggles("0xabc", dict(DEFAULT_EVENTS))
+        return [row[0].callback_data.rsplit(":", 1)[1] for row in markup.inline_keyboard]
+
+    monkeypatch.setattr("bot.LIQ_PROXIMITY_PCT", 0.0)
+    assert "liq_proximity" not in toggles() and "fills" in toggles()
+    monkeypatch.setattr("bot.LIQ_PROXIMITY_PCT", 5.0)
+    assert "liq_proximity" in toggles()
+
+
+@pytest.mark.anyio
+async def test_position_sync_waits_on_the_injected_clock(monkeypatch):
+    import bot
+
+    clock = VirtualClock()
+    report = AsyncMock(return_value={"status": "ok", "positions": [], "failed_dexs": []})
+    liq_watch = SimpleNamespace(replace=lambda *args, **kwargs: None)
+    monkeypatch.setattr("bot.fill_aggregator", SimpleNamespace(clock=clock))
+    monkeypatch.setattr("bot.get_positions_report", report)
+    monkeypatch.setattr("bot.liq_watch", liq_watch)
+    monkeypatch.setattr("bot.ws_manager", None)
+    monkeypatch.setattr("bot.position_sync", {})
+    monkeypatch.setattr("bot.storage.get_wallets", lambda: {"0xabc": {}})
+
+    bot.schedule_position_sync("0xabc")
+    await clock.advance(0.5)
+    report.assert_not_awaited()
+    await clock.advance(0.5)
+    report.assert_awaited_once_with("0xabc")
+
+    resync = asyncio.create_task(bot.resync_positions())
+    await clock.advance(0)
+    assert report.await_count == 2
+    await clock.advance(bot.LIQ_PROXIMITY_RESYNC_SEC)
+    assert report.await_count == 3
+    resync.cancel()
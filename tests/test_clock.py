@@ -0,0 +1,53 @@
+import asyncio
+
+import pytest
+
+from clock import VirtualClock
+
+
+@pytest.mark.anyio
+async def test_virtual_clock_wakes_sleepers_in_deadline_order():
+    clock = VirtualClock(start=100.0)
+    woke = []
+
+    async def sleeper(name, delay):
+        await clock.sleep(delay)
+        woke.append((name, clock.time()))
+
+    tasks = [
+        asyncio.create_task(sleeper("slow", 3600)),
+        asyncio.create_task(sleeper("fast", 2)),
+    ]
+    await clock.advance(10)
+    assert woke == [("fast", 102.0)]
+    assert clock.time() == 110.0
+
+    await clock.run_until_idle()
+    assert woke == [("fast", 102.0), ("slow", 3700.0)]
+    await asyncio.gather(*tasks)
+
+
+@pytest.mark.anyio
+async def test_virtual_clock_skips_cancelled_sleepers():
+    clock = VirtualClock()
+    task = asyncio.create_task(clock.sleep(5))
+    await asyncio.sleep(0)
+    task.cancel()
+
+    await clock.advance(10)
+
+    assert task.cancelled()
+    assert clock.pending == 0
+
+
+@pytest.mark.anyio
+async def test_run_until_complete_advances_through_inline_sleeps():
+    clock = VirtualClock()
+
+    async def work():
+        await clock.sleep(1.5)
+        await clock.sleep(0.5)
+        return "done"
+
+    assert await clock.run_until_complete(work()) == "done"
+    assert clock.time() == 2.0
@@ -0,0 +1,116 @@
+import json
+
+import pytest
+
+from clock import VirtualClock
+from delivery import Delivery
+from ws_manager import WSManager
+
+
+@pytest.mark.anyio
+async def test_urgent_events_skip_the_normal_backlog():
+    clock = VirtualClock()
+    delivery = Delivery()
+    await delivery.start()
+    sent = []
+
+    async def send(name):
+        await clock.sleep(1)
+        sent.append((name, clock.time()))
+
+    for i in range(5):
+        await delivery.submit(send, f"funding-{i}")
+    delivery.submit_urgent(send, "liquidation")
+    await clock.advance(1)
+
+    assert ("liquidation", 1) in sent
+    # Without the reserved slot it would have waited for all five.
+    assert delivery.backlog == 3
+    await clock.run_until_complete(delivery.join())
+    assert [name for name, _ in sent][-1] == "funding-4"
+    await delivery.stop()
+
+
+@pytest.mark.anyio
+async def test_liquidations_are_dispatched_first_within_a_frame():
+    events = []
+
+    async def on_event(wallet, event_type, data):
+        events.append(event_type)
+
+    async def on_fill(wallet, fill):
+        events.append("fills")
+
+    manager = WSManager(on_event=on_event, on_fill=on_fill, clock=VirtualClock(start=1_000.0))
+    manager._subscription_times["0xabc"] = 0.0
+    fills = [{"coin": "ETH", "tid": i, "time": 1_001_000} for i in range(3)]
+    fills[2]["liquidation"] = {"liquidatedUser": "0xabc", "markPx": "3000", "method": "market"}
+    await manager._handle_message(json.dumps({"channel": "userFills", "data": {"user": "0xabc", "fills": fills}}))
+
+    assert events == ["liquidations", "fills", "fills"]
+
+
+@pytest.mark.anyio
+async def test_urgent_sends_keep_their_order_behind_a_full_backlog():
+    clock = VirtualClock()
+    delivery = Delivery(max_queue=100)
+    await delivery.start()
+    sent = []
+
+    async def send(name):
+        await clock.sleep(1)
+        sent.append(name)
+
+    for i in range(50):
+        await delivery.submit(send, f"funding-{i}")
+    for i in range(3):
+        delivery.submit_urgent(send, f"liquidation-{i}")
+    await clock.advance(3)
+
+    # One urgent send at a time alongside the single normal worker.
+    assert [name for name in sent if name.startswith("liquidation")] == [f"liquidation-{i}" for i in range(3)]
+    assert delivery.backlog == 46
+    await clock.run_until_complete(delivery.join())
+    assert [name for name in sent if name.startswith("funding")] == [f"funding-{i}" for i in range(50)]
+    await delivery.stop()
+
+
+@pytest.mark.anyio
+async def test_unqueued_delivery_sends_normal_events_inline():
+    clock = VirtualClock()
+    delivery = Delivery(queued=False)
+    await delivery.start()
+    sent = []
+
+    async def send(name):
+        await clock.sleep(1)
+        sent.append((name, clock.time()))
+
+    urgent = delivery.submit_urgent(send, "liquidation")
+    await clock.run_until_complete(delivery.submit(send, "funding"))
+
+    assert sent == [("liquidation", 1), ("funding", 1)]
+    assert urgent.done() and delivery.pending == 0 and delivery.sent == 1
+    await delivery.stop()
+
+
+@pytest.mark.anyio
+async def test_frame_order_is_kept_within_liquidations_and_other_fills():
+    events = []
+
+    async def on_event(wallet, event_type, data):
+        events.append((event_type, data["tid"]))
+
+    async def on_fill(wallet, fill):
+        events.append(("fills", fill["tid"]))
+
+    manager = WSManager(on_event=on_event, on_fill=on_fill, clock=VirtualClock(start=1_000.0))
+    manager._subscription_times["0xabc"] = 0.0
+    liquidation = {"liquidatedUser": "0xabc", "markPx": "3000", "method": "market"}
+    fills = [{"coin": "ETH", "tid": i, "time": 1_001_000} for i in range(5)]
+    fills[1]["liquidation"] = fills[4]["liquidation"] = liquidation
+    conn = manager._connections[0]
+    conn.events_wallet = "0xabc"
+    await manager._handle_message(json.dumps({"channel": "user", "data": {"fills": fills}}), conn)
+
+    assert events == [("liquidations", 1), ("liquidations", 4), ("fills", 0), ("fills", 2), ("fills", 3)]
@@ -0,0 +1,44 @@
+import asyncio
+import logging
+import sys
+
+import eventloop
+
+
+def test_uvloop_falls_back_to_asyncio_when_missing(monkeypatch, caplog):
+    # None in sys.modules makes the import fail as if it were not installed.
+    monkeypatch.setitem(sys.modules, "uvloop", None)
+    policy = asyncio.get_event_loop_policy()
+
+    with caplog.at_level(logging.WARNING, logger="eventloop"):
+        assert eventloop.install("uvloop") == "asyncio"
+    assert "uvloop is not installed" in caplog.text
+    assert eventloop.install(" AsyncIO ") == "asyncio"
+    assert asyncio.get_event_loop_policy() is policy
+
+
+def test_unknown_loop_names_are_reported(caplog):
+    policy = asyncio.get_event_loop_policy()
+
+    with caplog.at_level(logging.WARNING, logger="eventloop"):
+        assert eventloop.install("trio") == "asyncio"
+    assert "Unknown EVENT_LOOP 'trio'" in caplog.text
+    assert asyncio.get_event_loop_policy() is policy
+
+
+def test_main_runs_on_asyncio_without_uvloop(monkeypatch, caplog):
+    import bot
+
+    monkeypatch.setitem(sys.modules, "uvloop", None)
+    monkeypatch.setattr(bot, "EVENT_LOOP", "uvloop")
+    monkeypatch.setattr(bot, "BOT_ROLE", "ingest")
+    loops = []
+
+    async def run_ingest():
+        loops.append(eventloop.current())
+
+    monkeypatch.setattr(bot, "run_ingest", run_ingest)
+    with caplog.at_level(logging.INFO):
+        bot.main()
+    assert loops == ["asyncio"]
+    assert "Using the asyncio event loop" in caplog.text
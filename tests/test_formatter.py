@@ -1,4 +1,4 @@
-from formatter import format_funding, format_positions
+from formatter import format_basket, format_cluster, format_funding, format_positions
 
 # Public example wallet for test fixtures only; these tests use mocked data and
 # do not depend on the address having live positions.
@@ -59,3 +59,34 @@ def test_format_funding_uses_annualized_rate():
     assert "<b>Funding cash:USA500</b>" in text
     assert "<b>Payment:</b> $-0.57" in text
     assert "<b>Rate (annualized):</b> -18.23%" in text
+
+
+def test_format_basket_lists_each_coin_with_totals():
+    text = format_basket(
+        [
+            [
+                {"coin": "ETH", "dir": "Close Long", "sz": "1", "px": "3000", "closedPnl": "50"},
+                {"coin": "ETH", "dir": "Close Long", "sz": "1", "px": "3100", "closedPnl": "70"},
+            ],
+            [{"coin": "BTC", "dir": "Close Short", "sz": "0.1", "px": "90000", "closedPnl": "-20"}],
+        ],
+        HLP_VAULT_ADDRESS,
+    )
+
+    assert "Trades Basket 2 coins" in text
+    assert "<b>ETH:</b> Close Long 2.0000 @ $3,050.00, PnL +$120.00" in text
+    assert "<b>BTC:</b> Close Short 0.1000 @ $90,000.00, PnL $-20.00" in text
+    assert "<b>Notional:</b> $15,100.00" in text
+    assert "<b>Total PnL:</b> +$100.00" in text
+    assert "<b>Fills:</b> 3" in text
+
+
+def test_format_cluster_lists_each_wallet():
+    text = format_cluster([
+        (HLP_VAULT_ADDRESS, [{"coin": "SOL", "dir": "Open Long", "sz": "10", "px": "200"}]),
+        ("0x" + "a" * 40, [{"coin": "SOL", "dir": "Open Long", "sz": "30", "px": "204"}]),
+    ])
+
+    assert "Trades Open Long SOL · 2 wallets" in text
+    assert "<b>0xdfc2...f303:</b> 10.0000 @ $200.00" in text
+    assert "<b>Total:</b> 40.0000 SOL @ $203.00" in text
@@ -0,0 +1,71 @@
+import pytest
+
+from history import HistoryStore
+
+DAY_MS = 86_400_000
+START = 1_767_225_600_000
+
+
+def funding(time_ms, coin, usdc):
+    return {"time": time_ms, "coin": coin, "usdc": str(usdc), "szi": "1", "fundingRate": "0.0001"}
+
+
+@pytest.mark.anyio
+async def test_scan_prunes_by_time_wallet_and_coin(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.open()
+    for day in range(3):
+        for hour in range(24):
+            t = START + day * DAY_MS + hour * 3_600_000
+            store.append("0xaaa", "funding", funding(t, "ETH", -1))
+            store.append("0xaaa", "funding", funding(t, "BTC", -10))
+            store.append("0xbbb", "funding", funding(t, "ETH", 2))
+    await store.flush()
+
+    assert store.total("funding", "usdc", coins=["ETH"]) == pytest.approx(72 * -1 + 72 * 2)
+    assert store.total("funding", "usdc", wallets=["0xAAA"]) == pytest.approx(72 * -11)
+    assert store.count(
+        "funding",
+        start_ms=START + DAY_MS + 12 * 3_600_000,
+        end_ms=START + 2 * DAY_MS,
+        coins=["BTC"],
+    ) == 12
+    assert store.count("funding", coins=["SOL"]) == 0
+
+
+@pytest.mark.anyio
+async def test_rows_survive_reopen_and_summary_decodes_columns(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.open()
+    store.append("0xaaa", "fills", {
+        "time": START, "coin": "ETH", "dir": "Close Long", "px": "100", "sz": "2",
+        "closedPnl": "15", "fee": "0.5", "tid": 1, "oid": 1,
+    })
+    store.append("0xaaa", "liquidations", {
+        "time": START + 1, "coin": "SOL", "dir": "Close Long", "px": "10", "sz": "3",
+        "closedPnl": "-40", "fee": "0.1", "tid": 2, "oid": 2, "liquidation": {"method": "market"},
+    })
+    store.append("0xaaa", "transfers", {"time": START + 2, "hash": "0x1", "delta": {"type": "deposit", "usdc": "500"}})
+    await store.stop()
+
+    reopened = HistoryStore(tmp_path)
+    reopened.open()
+    summary = reopened.summary("0xaaa")
+
+    assert summary["fills"]["count"] == 2
+    assert summary["fills"]["volume"] == pytest.approx(230)
+    assert summary["fills"]["realized_pnl"] == pytest.approx(-25)
+    assert summary["fills"]["liquidations"] == 1
+    assert summary["fills"]["by_coin"]["SOL"]["pnl"] == pytest.approx(-40)
+    assert summary["transfers"]["by_kind"] == {"deposit": 500.0}
+
+
+@pytest.mark.anyio
+async def test_out_of_order_rows_are_filtered_by_mask(tmp_path):
+    store = HistoryStore(tmp_path)
+    store.open()
+    for offset in (5, 1, 9, 3):
+        store.append("0xaaa", "funding", funding(START + offset, "ETH", offset))
+    await store.flush()
+
+    assert store.total("funding", "usdc", start_ms=START + 2, end_ms=START + 6) == pytest.approx(8)
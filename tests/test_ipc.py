@@ -0,0 +1,190 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import BadRequest
+
+from ipc import (
+    CALL,
+    HEADER,
+    MAX_BODY,
+    UPDATE,
+    IPCClient,
+    IPCServer,
+    RemoteApplication,
+    RemoteBot,
+    RemoteUpdate,
+    encode,
+    parse_command,
+    read_message,
+)
+
+
+class RecordingBot:
+    def __init__(self):
+        self.calls = []
+
+    async def send_message(self, chat_id, text, **kwargs):
+        self.calls.append(("send_message", text, kwargs))
+        return SimpleNamespace(message_id=len(self.calls))
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None, **kwargs):
+        raise BadRequest("Message is not modified")
+
+    async def edit_message_reply_markup(self, chat_id, message_id, reply_markup=None):
+        self.calls.append(("edit_message_reply_markup", message_id, reply_markup))
+
+    async def answer_callback_query(self, callback_query_id, **kwargs):
+        self.calls.append(("answer_callback_query", callback_query_id, kwargs))
+
+
+class StalledBot(RecordingBot):
+    # Never finishes a send, so the call is still pending when the link drops.
+    async def send_message(self, chat_id, text, **kwargs):
+        await asyncio.Event().wait()
+
+
+async def connect(server, on_update=None):
+    client = IPCClient(server.path, on_update=on_update, connect_timeout=5)
+    await client.start()
+    await client.wait_connected(5)
+    return client
+
+
+def test_messages_are_framed_with_a_fixed_header():
+    frame = encode(UPDATE, 0, {"text": "/list"})
+    length, kind, request_id = HEADER.unpack(frame[:HEADER.size])
+    assert (kind, request_id) == (UPDATE, 0)
+    assert frame[HEADER.size:] == b'{"text":"/list"}' and length == len(frame) - HEADER.size
+    assert parse_command("/watch@hl_bot 0xabc main") == ("watch", ["0xabc", "main"])
+
+
+@pytest.mark.anyio
+async def test_calls_and_updates_cross_the_socket(tmp_path):
+    bot = RecordingBot()
+    server = IPCServer(tmp_path / "ipc.sock", bot)
+    await server.start()
+    updates = []
+
+    async def on_update(body):
+        updates.append(body)
+
+    client = await connect(server, on_update)
+    remote = RemoteBot(client)
+    try:
+        markup = InlineKeyboardMarkup([[InlineKeyboardButton("✅ fills", callback_data="toggle:0xabc:fills")]])
+        first, second = await asyncio.gather(
+            remote.send_message(123, "<b>one</b>", parse_mode="HTML"),
+            remote.send_message(123, "two", reply_markup=markup),
+        )
+        assert (first.message_id, second.message_id) == (1, 2)
+        assert bot.calls[0] == ("send_message", "<b>one</b>", {"parse_mode": "HTML"})
+        assert bot.calls[1][2]["reply_markup"] == markup
+
+        # Callers see the same error the real bot raises.
+        with pytest.raises(BadRequest, match="not modified"):
+            await remote.edit_message_text("same", chat_id=123, message_id=1)
+
+        assert await server.push_update({"user_id": 123, "chat_id": 123, "message_id": 7, "text": "/status"})
+        while not updates:
+            await asyncio.sleep(0.01)
+        update = RemoteUpdate(remote, updates[0])
+        assert update.effective_user.id == 123 and update.callback_query is None
+        await update.message.reply_text("ok")
+        assert bot.calls[-1] == ("send_message", "ok", {})
+    finally:
+        await client.stop()
+        await server.stop()
+    assert not server.path.exists()
+
+
+@pytest.mark.anyio
+async def test_oversized_messages_are_rejected():
+    reader = asyncio.StreamReader()
+    reader.feed_data(HEADER.pack(MAX_BODY + 1, CALL, 1))
+    with pytest.raises(ValueError, match="exceeds"):
+        await read_message(reader)
+
+
+@pytest.mark.anyio
+async def test_call_fails_when_delivery_is_not_running(tmp_path):
+    client = IPCClient(tmp_path / "missing.sock", connect_timeout=0.05)
+    await client.start()
+    try:
+        with pytest.raises(ConnectionError, match="not reachable"):
+            await client.call("send_message", chat_id=123, text="hi")
+    finally:
+        await client.stop()
+
+
+@pytest.mark.anyio
+async def test_unsupported_methods_are_refused(tmp_path):
+    bot = RecordingBot()
+    server = IPCServer(tmp_path / "ipc.sock", bot)
+    await server.start()
+    client = await connect(server)
+    try:
+        result = await client.call("delete_message", chat_id=123, message_id=1)
+        assert result == {"ok": False, "error": "Unsupported call delete_message"}
+        assert bot.calls == []
+    finally:
+        await client.stop()
+        await server.stop()
+
+
+@pytest.mark.anyio
+async def test_client_reconnects_after_delivery_restarts(tmp_path):
+    server = IPCServer(tmp_path / "ipc.sock", StalledBot())
+    await server.start()
+    client = await connect(server)
+    try:
+        pending = asyncio.create_task(client.call("send_message", chat_id=123, text="lost"))
+        while not server._tasks:
+            await asyncio.sleep(0.01)
+        await server.stop()
+        # Calls in flight fail instead of waiting forever for their result.
+        with pytest.raises(ConnectionError, match="lost"):
+            await pending
+
+        bot = RecordingBot()
+        server = IPCServer(tmp_path / "ipc.sock", bot)
+        await server.start()
+        await client.wait_connected(5)
+        assert client.reconnects == 1
+        assert (await client.call("send_message", chat_id=123, text="again"))["ok"]
+        assert bot.calls == [("send_message", "again", {})]
+    finally:
+        await client.stop()
+        await server.stop()
+
+
+@pytest.mark.anyio
+async def test_button_presses_reach_the_toggle_handler(tmp_path, monkeypatch):
+    import bot as bot_module
+
+    monkeypatch.setattr(bot_module.storage, "CONFIG_PATH", tmp_path / "config.json")
+    bot_module.storage.add_wallet("0xabc")
+    telegram_bot = RecordingBot()
+    server = IPCServer(tmp_path / "ipc.sock", telegram_bot)
+    await server.start()
+    client = await connect(server, on_update=bot_module.handle_remote_update)
+    monkeypatch.setattr(bot_module, "app", RemoteApplication(RemoteBot(client)))
+    try:
+        assert await server.push_update({
+            "user_id": bot_module.TELEGRAM_USER_ID,
+            "chat_id": 123,
+            "message_id": 7,
+            "callback_id": "q1",
+            "data": "toggle:0xabc:fills",
+        })
+        while len(telegram_bot.calls) < 2:
+            await asyncio.sleep(0.01)
+        assert telegram_bot.calls[0] == ("answer_callback_query", "q1", {})
+        name, message_id, markup = telegram_bot.calls[1]
+        assert (name, message_id) == ("edit_message_reply_markup", 7)
+        assert markup.inline_keyboard[0][0].text == "❌ fills"
+        assert bot_module.storage.get_events("0xabc")["fills"] is False
+    finally:
+        await client.stop()
+        await server.stop()
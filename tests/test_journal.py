@@ -0,0 +1,60 @@
+import pytest
+
+from journal import Journal
+
+
+@pytest.mark.anyio
+async def test_unacked_entries_are_returned_on_reopen(tmp_path):
+    journal = Journal(tmp_path)
+    assert journal.open() == []
+    first = journal.append("0xabc", "fills", {"tid": 1})
+    second = journal.append("0xabc", "fundings", {"coin": "ETH"})
+    journal.ack(first)
+    await journal.stop()
+
+    reopened = Journal(tmp_path)
+    entries = reopened.open()
+
+    assert [(e.offset, e.event_type, e.data) for e in entries] == [(second, "fundings", {"coin": "ETH"})]
+    assert reopened.append("0xabc", "fills", {"tid": 2}) == second + 1
+    await reopened.stop()
+
+
+@pytest.mark.anyio
+async def test_torn_tail_is_truncated(tmp_path):
+    journal = Journal(tmp_path)
+    journal.open()
+    journal.append("0xabc", "fills", {"tid": 1})
+    journal.append("0xabc", "fills", {"tid": 2})
+    await journal.stop()
+
+    segment = next(tmp_path.glob("*.seg"))
+    size = segment.stat().st_size
+    with open(segment, "r+b") as f:
+        f.truncate(size - 3)
+
+    reopened = Journal(tmp_path)
+    entries = reopened.open()
+
+    assert [e.data for e in entries] == [{"tid": 1}]
+    assert segment.stat().st_size < size - 3
+    await reopened.stop()
+
+
+@pytest.mark.anyio
+async def test_compaction_drops_acked_and_keeps_unacked_entries(tmp_path):
+    journal = Journal(tmp_path, segment_bytes=200, retention_sec=60)
+    journal.open()
+    offsets = [journal.append("0xabc", "fills", {"tid": i, "pad": "x" * 60}) for i in range(6)]
+    journal.ack(*offsets[:4])
+    await journal.flush()
+    assert len(list(tmp_path.glob("*.seg"))) > 2
+
+    journal.compact(now=journal._segments[-1].last_timestamp + 120)
+    await journal.stop()
+
+    reopened = Journal(tmp_path)
+    entries = reopened.open()
+    assert [e.data["tid"] for e in entries] == [4, 5]
+    assert len(list(tmp_path.glob("*.seg"))) <= 2
+    await reopened.stop()
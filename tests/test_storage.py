@@ -53,3 +53,42 @@ def test_set_label_rejects_duplicate(monkeypatch, tmp_path):
     storage.add_wallet("0xdef", label="Two")
 
     assert storage.set_label("0xdef", "One") is False
+
+
+def test_funding_digest_defaults_off_and_can_be_enabled(monkeypatch, tmp_path):
+    storage = load_storage_module(monkeypatch, tmp_path)
+    storage.add_wallet("0xabc")
+
+    assert storage.get_funding_digest("0xabc") is False
+    assert storage.set_funding_digest("0xabc", True) is True
+    assert storage.get_funding_digest("0xabc") is True
+    assert storage.set_funding_digest("0xmissing", True) is None
+
+
+def test_toggle_event_added_after_wallet_was_saved(monkeypatch, tmp_path):
+    storage = load_storage_module(monkeypatch, tmp_path)
+    (tmp_path / "config.json").write_text(
+        '{"wallets": {"0xabc": {"label": null, "events": {"fills": true}}}}'
+    )
+
+    assert storage.get_events("0xabc")["liq_proximity"] is True
+    assert storage.toggle_event("0xabc", "liq_proximity") is False
+    assert storage.is_event_enabled("0xabc", "liq_proximity") is False
+    assert storage.toggle_event("0xabc", "bogus") is None
+
+
+def test_get_wallet_parses_config_once_until_it_changes(monkeypatch, tmp_path):
+    storage = load_storage_module(monkeypatch, tmp_path)
+    storage.add_wallet("0xabc")
+    loads = []
+    load = storage._load
+    monkeypatch.setattr(storage, "_load", lambda: loads.append(1) or load())
+
+    assert storage.get_wallet("0xABC")["funding_digest"] is False
+    storage.get_wallet("0xabc")["events"]["fills"] = False
+    assert storage.get_wallet("0xabc")["events"]["fills"] is True
+    assert len(loads) == 1
+
+    storage.set_funding_digest("0xabc", True)
+    assert storage.get_wallet("0xabc")["funding_digest"] is True
+    assert storage.get_wallet("0xdef") is None
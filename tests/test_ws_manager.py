@@ -0,0 +1,361 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from clock import VirtualClock
+from ws_manager import WSManager
+
+
+def make_manager(clock, events):
+    async def on_event(wallet, event_type, data):
+        events.append((wallet, event_type, data))
+
+    return WSManager(on_event=on_event, clock=clock)
+
+
+def test_should_notify_ignores_events_from_before_subscription():
+    clock = VirtualClock(start=1_000.0)
+    manager = make_manager(clock, [])
+    manager._subscription_times["0xabc"] = clock.time()
+
+    assert not manager._should_notify("0xabc", {"time": 999_000})
+    assert manager._should_notify("0xabc", {"time": 1_000_500})
+    assert not manager._should_notify("0xdef", {"time": 1_000_500})
+
+
+@pytest.mark.anyio
+async def test_should_notify_without_event_time_waits_for_settle_period():
+    clock = VirtualClock(start=1_000.0)
+    manager = make_manager(clock, [])
+    manager._subscription_times["0xabc"] = clock.time()
+
+    assert not manager._should_notify("0xabc", {})
+    await clock.advance(3.5)
+    assert manager._should_notify("0xabc", {})
+
+
+@pytest.mark.anyio
+async def test_handle_message_routes_liquidations_and_funding():
+    clock = VirtualClock(start=1_000.0)
+    events = []
+    manager = make_manager(clock, events)
+    manager._subscription_times["0xabc"] = clock.time()
+
+    await manager._handle_message(json.dumps({
+        "channel": "userFills",
+        "data": {
+            "user": "0xABC",
+            "fills": [{"coin": "ETH", "time": 1_001_000, "liquidation": {"method": "market"}}],
+        },
+    }))
+    await manager._handle_message(json.dumps({
+        "channel": "userFundings",
+        "data": {"user": "0xabc", "fundings": [{"coin": "ETH", "time": 1_001_000}]},
+    }))
+
+    assert [(wallet, event_type) for wallet, event_type, _ in events] == [
+        ("0xabc", "liquidations"),
+        ("0xabc", "funding"),
+    ]
+
+
+@pytest.mark.anyio
+async def test_order_updates_are_subscribed_and_dispatched_when_requested():
+    clock = VirtualClock(start=1_000.0)
+    updates = []
+
+    async def on_order_update(update):
+        updates.append(update)
+
+    plain = make_manager(clock, [])
+    manager = WSManager(on_event=plain.on_event, clock=clock, on_order_update=on_order_update)
+
+    assert "orderUpdates" not in plain.subscription_types
+    assert "orderUpdates" in manager.subscription_types
+
+    update = {"order": {"coin": "ETH", "oid": 42}, "status": "filled", "statusTimestamp": 1_001_000}
+    await manager._handle_message(json.dumps({"channel": "orderUpdates", "data": [update]}))
+    await plain._handle_message(json.dumps({"channel": "orderUpdates", "data": [update]}))
+
+    assert updates == [update]
+
+
+@pytest.mark.anyio
+async def test_twap_slices_reach_twap_handler_once():
+    clock = VirtualClock(start=1_000.0)
+    events = []
+    fills = []
+    slices = []
+
+    async def on_fill(wallet, fill):
+        fills.append(fill["tid"])
+
+    async def on_twap_fill(wallet, twap_id, fill, seen):
+        slices.append((twap_id, fill["tid"], seen))
+
+    async def on_twap_update(wallet, entry, snapshot):
+        pass
+
+    plain = make_manager(clock, events)
+    manager = WSManager(
+        on_event=plain.on_event,
+        on_fill=on_fill,
+        clock=clock,
+        on_twap_fill=on_twap_fill,
+        on_twap_update=on_twap_update,
+    )
+    assert "userTwapSliceFills" not in plain.subscription_types
+    assert "userTwapSliceFills" in manager.subscription_types
+    manager._subscription_times["0xabc"] = clock.time()
+
+    def fill(tid):
+        return {"coin": "ETH", "tid": tid, "time": 1_001_000}
+
+    # tid 1 arrives on userFills first, tid 2 on the TWAP channel first.
+    await manager._handle_message(json.dumps({"channel": "userFills", "data": {"user": "0xabc", "fills": [fill(1)]}}))
+    slice_fills = [{"twapId": 9, "fill": fill(1)}, {"twapId": 9, "fill": fill(2)}]
+    message = {"channel": "userTwapSliceFills", "data": {"user": "0xabc", "twapSliceFills": slice_fills}}
+    await manager._handle_message(json.dumps(message))
+    await manager._handle_message(json.dumps(message))
+    await manager._handle_message(json.dumps({"channel": "userFills", "data": {"user": "0xabc", "fills": [fill(2)]}}))
+
+    assert fills == [1]
+    assert slices == [(9, 1, True), (9, 2, False)]
+
+    # A counterparty's regular fill shares the slice's tid but is its own.
+    manager._subscription_times["0xdef"] = clock.time()
+    await manager._handle_message(json.dumps({"channel": "userFills", "data": {"user": "0xdef", "fills": [fill(2)]}}))
+    assert fills == [1, 2]
+
+
+@pytest.mark.anyio
+async def test_events_mode_uses_user_events_for_one_wallet(monkeypatch):
+    clock = VirtualClock(start=1_000.0)
+    events = []
+    fills = []
+    sent = []
+
+    async def on_fill(wallet, fill):
+        fills.append((wallet, fill["tid"]))
+
+    plain = make_manager(clock, events)
+    manager = WSManager(
+        on_event=plain.on_event,
+        on_fill=on_fill,
+        clock=clock,
+        subscription_mode="events",
+        needs_ledger=lambda wallet: False,
+    )
+
+    async def send(raw):
+        msg = json.loads(raw)
+        sent.append((msg["method"], msg["subscription"]["type"], msg["subscription"]["user"]))
+
+    manager._connections[0].ws = SimpleNamespace(open=True, send=send)
+    await manager.subscribe("0xABC")
+    await manager.subscribe("0xdef")
+
+    assert sent == [
+        ("subscribe", "userEvents", "0xabc"),
+        ("subscribe", "userFills", "0xdef"),
+        ("subscribe", "userFundings", "0xdef"),
+        ("subscribe", "userNonFundingLedgerUpdates", "0xdef"),
+    ]
+
+    await clock.advance(5)
+    fill = {"coin": "ETH", "tid": 1, "time": 1_004_000}
+    funding = {"coin": "ETH", "usdc": "-1", "time": 1_004_000}
+    await manager._handle_message(json.dumps({"channel": "user", "data": {"fills": [fill]}}))
+    await manager._handle_message(json.dumps({"channel": "user", "data": {"funding": funding}}))
+
+    assert fills == [("0xabc", 1)]
+    assert events == [("0xabc", "funding", funding)]
+
+    sent.clear()
+    manager.needs_ledger = lambda wallet: True
+    await manager.refresh("0xabc")
+    assert sent == [("subscribe", "userNonFundingLedgerUpdates", "0xabc")]
+
+
+@pytest.mark.anyio
+async def test_redundant_connections_deliver_each_event_once():
+    clock = VirtualClock(start=1_000.0)
+    events = []
+    fills = []
+
+    async def on_fill(wallet, fill):
+        fills.append(fill["tid"])
+
+    plain = make_manager(clock, events)
+    manager = WSManager(on_event=plain.on_event, on_fill=on_fill, clock=clock, connections=2)
+    manager._subscription_times["0xabc"] = clock.time()
+    first, second = manager._connections
+
+    fills_frame = json.dumps({
+        "channel": "userFills",
+        "data": {"user": "0xabc", "fills": [{"coin": "ETH", "tid": 1, "time": 1_001_000}]},
+    })
+    funding_frame = json.dumps({
+        "channel": "userFundings",
+        "data": {"user": "0xabc", "fundings": [{"coin": "ETH", "usdc": "-1", "time": 1_001_000}]},
+    })
+    await manager._handle_message(fills_frame, first)
+    await manager._handle_message(funding_frame, second)
+    await clock.advance(0.25)
+    await manager._handle_message(fills_frame, second)
+    await manager._handle_message(funding_frame, first)
+
+    assert fills == [1]
+    assert [event_type for _, event_type, _ in events] == ["funding"]
+    stats = manager.stats()
+    assert stats["suppressed"] == 2 and stats["suppression_rate"] == 0.5
+    assert stats["connections"][1]["first"] == 1
+    assert stats["connections"][1]["max_lag_ms"] == 250.0
+
+
+@pytest.mark.anyio
+async def test_redundant_connections_keep_both_sides_of_a_trade():
+    clock = VirtualClock(start=1_000.0)
+    events = []
+    fills = []
+
+    async def on_fill(wallet, fill):
+        fills.append((wallet, fill["tid"]))
+
+    plain = make_manager(clock, events)
+    manager = WSManager(on_event=plain.on_event, on_fill=on_fill, clock=clock, connections=2)
+    first, second = manager._connections
+    for wallet in ("0xa", "0xb"):
+        manager._subscription_times[wallet] = clock.time()
+
+    # Two watched wallets trading with each other share the fill's tid.
+    for wallet in ("0xa", "0xb"):
+        frame = json.dumps({
+            "channel": "userFills",
+            "data": {"user": wallet, "fills": [{"coin": "ETH", "tid": 42, "time": 1_001_000}]},
+        })
+        await manager._handle_message(frame, first)
+        await manager._handle_message(frame, second)
+
+    assert fills == [("0xa", 42), ("0xb", 42)]
+    assert manager.stats()["suppressed"] == 2
+
+
+@pytest.mark.anyio
+async def test_heartbeat_pings_and_aborts_silent_connection():
+    clock = VirtualClock(start=1_000.0)
+    manager = WSManager(on_event=make_manager(clock, []).on_event, clock=clock, ping_interval_sec=5, stale_after_sec=12)
+    conn = manager._connections[0]
+    conn.last_frame_at = clock.time()
+    sent = []
+    aborted = []
+
+    async def send(message):
+        sent.append(message)
+
+    ws = SimpleNamespace(send=send, transport=SimpleNamespace(abort=lambda: aborted.append(True)))
+    task = asyncio.create_task(conn._heartbeat(ws))
+    await clock.advance(10)
+    assert len(sent) == 2 and not aborted
+
+    await clock.advance(5)
+    await task
+    assert aborted == [True] and conn.stale_reconnects == 1
+    assert len(sent) == 2
+
+
+@pytest.mark.anyio
+async def test_unacknowledged_subscriptions_are_retried_with_backoff():
+    clock = VirtualClock(start=1_000.0)
+    manager = WSManager(on_event=make_manager(clock, []).on_event, clock=clock, ack_timeout_sec=5)
+    conn = manager._connections[0]
+    sent = []
+
+    async def send(message):
+        msg = json.loads(message)
+        sent.append(msg["subscription"]["type"])
+
+    conn.ws = SimpleNamespace(open=True, send=send)
+    await manager.subscribe("0xABC")
+    assert sent == ["userFills", "userFundings", "userNonFundingLedgerUpdates"]
+
+    for sub_type in ("userFills", "userFundings"):
+        await manager._handle_message(json.dumps({
+            "channel": "subscriptionResponse",
+            "data": {"method": "subscribe", "subscription": {"type": sub_type, "user": "0xabc"}},
+        }), conn)
+    assert manager.pending_wallets() == []
+
+    sent.clear()
+    task = asyncio.create_task(conn._retry_pending())
+    await clock.advance(5)
+    assert sent == ["userNonFundingLedgerUpdates"]
+    assert manager.pending_wallets() == ["0xabc"]
+    # The second retry waits twice as long.
+    await clock.advance(5)
+    assert sent == ["userNonFundingLedgerUpdates"]
+    await clock.advance(5)
+    assert sent == ["userNonFundingLedgerUpdates"] * 2
+
+    await manager._handle_message(json.dumps({
+        "channel": "subscriptionResponse",
+        "data": {"method": "subscribe", "subscription": {"type": "userNonFundingLedgerUpdates", "user": "0xabc"}},
+    }), conn)
+    assert manager.pending_wallets() == [] and conn.retries == 2
+    # Subscribing an already confirmed wallet again sends nothing.
+    await manager.subscribe("0xabc")
+    assert sent == ["userNonFundingLedgerUpdates"] * 2
+
+    # When an ack is lost, the retry is refused as a duplicate; that refusal
+    # confirms the subscription.
+    await manager.subscribe("0xdef")
+    for sub_type in ("userFills", "userFundings", "userNonFundingLedgerUpdates"):
+        subscription = json.dumps({"type": sub_type, "user": "0xdef"})
+        await manager._handle_message(json.dumps({
+            "channel": "error",
+            "data": f"Already subscribed: {subscription}",
+        }), conn)
+    await manager._handle_message(json.dumps({"channel": "error", "data": "Invalid subscription"}), conn)
+    assert manager.pending_wallets() == []
+    task.cancel()
+
+
+@pytest.mark.anyio
+async def test_all_mids_subscribed_only_while_needed():
+    clock = VirtualClock(start=1_000.0)
+    mids = []
+    watching = []
+
+    async def on_mids(data):
+        mids.append(data)
+
+    manager = WSManager(
+        on_event=make_manager(clock, []).on_event,
+        clock=clock,
+        on_mids=on_mids,
+        needs_mids=lambda: bool(watching),
+    )
+    conn = manager._connections[0]
+    sent = []
+
+    async def send(message):
+        msg = json.loads(message)
+        sent.append((msg["method"], msg["subscription"]))
+
+    conn.ws = SimpleNamespace(open=True, send=send)
+    await manager.refresh_market()
+    assert sent == []
+
+    watching.append(1)
+    await manager.refresh_market()
+    assert sent == [("subscribe", {"type": "allMids"})]
+
+    await manager._handle_message(json.dumps({"channel": "allMids", "data": {"mids": {"ETH": "3000.5"}}}), conn)
+    assert mids == [{"ETH": "3000.5"}]
+
+    sent.clear()
+    watching.clear()
+    await manager.refresh_market()
+    assert sent == [("unsubscribe", {"type": "allMids"})]
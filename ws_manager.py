@@ -1,11 +1,12 @@
 import asyncio
 import json
 import logging
-import time
+from collections import OrderedDict, defaultdict
 from typing import Callable, Awaitable
 
 import websockets
 
+from clock import Clock
 from config import HL_WS_URL
 import storage
 
@@ -17,7 +18,208 @@ SUBSCRIPTION_TYPES = [
     "userFills",
     "userFundings",
     "userNonFundingLedgerUpdates",
+    "userTwapSliceFills",
+    "userTwapHistory",
 ]
+# Only subscribed when the manager is given TWAP callbacks.
+TWAP_SUBSCRIPTION_TYPES = {"userTwapSliceFills", "userTwapHistory"}
+# TWAP slices are also reported on userFills. Recent (wallet, tid) pairs from
+# both streams are remembered so each slice reaches the TWAP handler once and
+# is not also sent as a regular fill. Both sides of a trade share a tid, so
+# the wallet is part of the key.
+TWAP_TID_LIMIT = 10_000
+# subscription_mode="events" replaces userFills and userFundings with the
+# combined userEvents feed. Its frames carry no user field, so (like
+# Hyperliquid's own SDK) one connection holds at most one userEvents
+# subscription; other wallets keep the per-channel subscriptions. Ledger
+# updates are not part of userEvents and are only subscribed for the events
+# wallet when needs_ledger says the wallet wants transfers.
+SUBSCRIPTION_MODES = ("channels", "events")
+EVENTS_REPLACES = {"userFills", "userFundings"}
+# Market-wide subscriptions (allMids for price alerts) take no user and are
+# tracked under this key alongside the per-wallet ones. allMids is only
+# subscribed while needs_mids says there is something to watch.
+MARKET = ""
+
+
+# With connections > 1 every connection carries the same subscriptions and
+# events are merged through a bounded index of recently seen event keys, so
+# losing one connection costs no events and no reconnect delay.
+DEDUPE_LIMIT = 100_000
+# Hyperliquid answers {"method": "ping"} with a pong frame. Any frame counts
+# as a sign of life; a connection silent for longer than stale_after_sec
+# (a half-open socket, or a server that stopped sending) is torn down and
+# reconnected instead of waiting for TCP to notice.
+PING_MESSAGE = json.dumps({"method": "ping"})
+# Hyperliquid confirms every subscribe with a subscriptionResponse echoing
+# the subscription. Until then it is pending; pending subscriptions are sent
+# again after ack_timeout_sec, doubling per attempt up to ACK_MAX_BACKOFF_SEC,
+# so a lost or rejected subscribe cannot leave a wallet silently unwatched.
+ACK_TIMEOUT_SEC = 5.0
+ACK_MAX_BACKOFF_SEC = 60.0
+# Liquidation fills carry a "liquidation" object. Checking the raw frame for
+# the key is much cheaper than decoding, so frames without it skip the
+# reordering below and those with it dispatch their liquidations first.
+LIQUIDATION_MARKER = '"liquidation"'
+# Hyperliquid answers a repeated subscribe with an error naming the request
+# instead of a subscriptionResponse. A retry after a lost ack gets this, and
+# the subscription is live, so it counts as the ack.
+ALREADY_SUBSCRIBED = "Already subscribed"
+
+
+def event_key(wallet: str, event_type: str, data: dict) -> tuple | None:
+    # Both sides of a trade or transfer between two watched wallets share its
+    # tid or hash, so every key includes the wallet.
+    if event_type in ("fills", "liquidations"):
+        tid = data.get("tid")
+        return ("fill", wallet, tid) if tid is not None else None
+    if event_type == "funding":
+        return ("funding", wallet, data.get("time"), data.get("coin"))
+    if event_type == "transfers":
+        tx_hash = data.get("hash")
+        return ("ledger", wallet, tx_hash) if tx_hash else None
+    return None
+
+
+def already_subscribed(error) -> dict | None:
+    # The subscription named by an "Already subscribed: {...}" error, which
+    # may quote either the subscription or the whole subscribe request.
+    if not isinstance(error, str) or not error.startswith(ALREADY_SUBSCRIBED):
+        return None
+    start = error.find("{")
+    if start < 0:
+        return None
+    try:
+        payload = json.loads(error[start:])
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    subscription = payload.get("subscription", payload)
+    return subscription if isinstance(subscription, dict) and subscription.get("type") else None
+
+
+class WSConnection:
+    # One socket with its own reconnect loop and subscription state. Frames
+    # are handed to the manager, which owns routing and dedupe.
+    def __init__(self, manager: "WSManager", index: int):
+        self.manager = manager
+        self.index = index
+        self.ws = None
+        self.task: asyncio.Task | None = None
+        self.events_wallet: str | None = None
+        # Desired subscriptions per wallet, and which of them the server has
+        # confirmed or is still expected to confirm ((wallet, type) ->
+        # (attempts, last sent)). Both describe the current socket only.
+        self.wallet_subscriptions: dict[str, list[str]] = {}
+        self.acked: set[tuple[str, str]] = set()
+        self.pending: dict[tuple[str, str], tuple[int, float]] = {}
+        self.retries = 0
+        self.reconnects = 0
+        self.stale_reconnects = 0
+        self.last_frame_at: float | None = None
+        # Events this connection delivered first, duplicates it delivered
+        # after another connection, and how far behind it was when it did.
+        self.first = 0
+        self.duplicates = 0
+        self.lag_total = 0.0
+        self.lag_max = 0.0
+
+    @property
+    def name(self) -> str:
+        return f"WebSocket {self.index}" if self.manager.connection_count > 1 else "WebSocket"
+
+    @property
+    def connected(self) -> bool:
+        return self.ws is not None and self.ws.open
+
+    @property
+    def staleness(self) -> float | None:
+        # Seconds since the last frame on the current socket.
+        if not self.connected or self.last_frame_at is None:
+            return None
+        return self.manager.clock.time() - self.last_frame_at
+
+    def stats(self) -> dict:
+        compared = self.first + self.duplicates
+        return {
+            "connected": self.connected,
+            "staleness_sec": self.staleness,
+            "reconnects": self.reconnects,
+            "stale_reconnects": self.stale_reconnects,
+            "pending": len(self.pending),
+            "retries": self.retries,
+            "first": self.first,
+            "duplicates": self.duplicates,
+            "lead_rate": self.first / compared if compared else 0.0,
+            "avg_lag_ms": self.lag_total / self.duplicates * 1000 if self.duplicates else 0.0,
+            "max_lag_ms": self.lag_max * 1000,
+        }
+
+    async def run(self):
+        manager = self.manager
+        backoff = 1
+        while manager._running:
+            try:
+                async with websockets.connect(manager.url) as ws:
+                    self.ws = ws
+                    self.last_frame_at = manager.clock.time()
+                    backoff = 1
+                    logger.info(f"{self.name} connected")
+                    tasks = []
+                    if manager.ack_timeout_sec > 0:
+                        tasks.append(asyncio.create_task(self._retry_pending()))
+                    if manager.ping_interval_sec > 0:
+                        tasks.append(asyncio.create_task(self._heartbeat(ws)))
+                    try:
+                        await manager._resubscribe_all(self)
+                        async for raw in ws:
+                            self.last_frame_at = manager.clock.time()
+                            await manager._handle_message(raw, self)
+                    finally:
+                        for task in tasks:
+                            task.cancel()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"{self.name} error: {e}")
+                self.ws = None
+                self.reconnects += 1
+                if manager._running:
+                    logger.info(f"Reconnecting {self.name} in {backoff}s...")
+                    await manager.clock.sleep(backoff)
+                    backoff = min(backoff * 2, 60)
+
+    async def _heartbeat(self, ws):
+        manager = self.manager
+        while True:
+            await manager.clock.sleep(manager.ping_interval_sec)
+            silent = manager.clock.time() - self.last_frame_at
+            if manager.stale_after_sec and silent > manager.stale_after_sec:
+                logger.warning(f"{self.name} silent for {silent:.1f}s; reconnecting")
+                self.stale_reconnects += 1
+                # close() would wait on a handshake a dead peer never answers.
+                ws.transport.abort()
+                return
+            try:
+                await ws.send(PING_MESSAGE)
+            except Exception:
+                return
+
+    async def _retry_pending(self):
+        manager = self.manager
+        while True:
+            await manager.clock.sleep(manager.ack_timeout_sec)
+            now = manager.clock.time()
+            due: dict[str, list[str]] = defaultdict(list)
+            for (wallet, sub_type), (attempts, sent_at) in self.pending.items():
+                backoff = min(manager.ack_timeout_sec * 2 ** (attempts - 1), ACK_MAX_BACKOFF_SEC)
+                if now - sent_at >= backoff:
+                    due[wallet].append(sub_type)
+            for wallet, types in due.items():
+                logger.warning(f"{self.name}: no ack for {', '.join(types)} of {wallet}; resubscribing")
+                self.retries += len(types)
+                await manager._send(self, wallet, types, subscribe=True)
 
 
 class WSManager:
@@ -25,66 +227,219 @@ class WSManager:
         self,
         on_event: Callable[[str, str, dict], Awaitable[None]],
         on_fill: Callable[[str, dict], Awaitable[None]] | None = None,
+        url: str = HL_WS_URL,
+        clock: Clock | None = None,
+        on_order_update: Callable[[dict], Awaitable[None]] | None = None,
+        on_twap_fill: Callable[[str, int, dict, bool], Awaitable[None]] | None = None,
+        on_twap_update: Callable[[str, dict, bool], Awaitable[None]] | None = None,
+        subscription_mode: str = "channels",
+        needs_ledger: Callable[[str], bool] | None = None,
+        connections: int = 1,
+        ping_interval_sec: float = 10.0,
+        stale_after_sec: float = 30.0,
+        ack_timeout_sec: float = ACK_TIMEOUT_SEC,
+        on_mids: Callable[[dict], Awaitable[None]] | None = None,
+        needs_mids: Callable[[], bool] | None = None,
     ):
         self.on_event = on_event
         self.on_fill = on_fill
-        self._ws = None
+        self.on_order_update = on_order_update
+        self.on_twap_fill = on_twap_fill
+        self.on_twap_update = on_twap_update
+        self.on_mids = on_mids
+        self.needs_mids = needs_mids
+        self.subscription_types = [
+            sub_type
+            for sub_type in SUBSCRIPTION_TYPES
+            if on_twap_fill or sub_type not in TWAP_SUBSCRIPTION_TYPES
+        ]
+        self._twap_tids: OrderedDict[tuple[str, int], None] = OrderedDict()
+        self._fill_tids: OrderedDict[tuple[str, int], None] = OrderedDict()
+        if on_order_update:
+            self.subscription_types.append("orderUpdates")
+        self.subscription_mode = subscription_mode
+        self.needs_ledger = needs_ledger
+        self.url = url
+        self.clock = clock or Clock()
+        self.ping_interval_sec = ping_interval_sec
+        self.stale_after_sec = stale_after_sec
+        self.ack_timeout_sec = ack_timeout_sec
+        self.connection_count = max(1, connections)
+        self._connections = [WSConnection(self, i) for i in range(self.connection_count)]
         self._running = False
-        self._task: asyncio.Task | None = None
         self._subscription_times: dict[str, float] = {}
+        self._seen: OrderedDict[tuple, float] = OrderedDict()
+        self.events = 0
+        self.suppressed = 0
 
     async def start(self):
         if self._running:
             return
         self._running = True
-        self._task = asyncio.create_task(self._run_loop())
+        for conn in self._connections:
+            conn.task = asyncio.create_task(conn.run())
 
     async def stop(self):
         self._running = False
-        if self._ws:
-            await self._ws.close()
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
+        for conn in self._connections:
+            if conn.ws:
+                await conn.ws.close()
+            if conn.task:
+                conn.task.cancel()
+                try:
+                    await conn.task
+                except asyncio.CancelledError:
+                    pass
 
     @property
     def connected(self) -> bool:
-        return self._ws is not None and self._ws.open
+        return any(conn.connected for conn in self._connections)
+
+    @property
+    def staleness(self) -> float | None:
+        # Seconds since the freshest connected socket last saw a frame.
+        values = [conn.staleness for conn in self._connections if conn.staleness is not None]
+        return min(values) if values else None
+
+    @property
+    def connected_count(self) -> int:
+        return sum(1 for conn in self._connections if conn.connected)
+
+    def pending_wallets(self) -> list[str]:
+        # Wallets with a subscription a live socket has been waiting on for
+        # longer than ack_timeout_sec.
+        now = self.clock.time()
+        wallets = set()
+        for conn in self._connections:
+            if not conn.connected:
+                continue
+            for (wallet, _), (attempts, sent_at) in conn.pending.items():
+                if wallet == MARKET:
+                    continue
+                if attempts > 1 or now - sent_at >= self.ack_timeout_sec:
+                    wallets.add(wallet)
+        return sorted(wallets)
+
+    def stats(self) -> dict:
+        return {
+            "events": self.events,
+            "suppressed": self.suppressed,
+            "suppression_rate": self.suppressed / (self.events + self.suppressed)
+            if self.events + self.suppressed else 0.0,
+            "connections": [conn.stats() for conn in self._connections],
+        }
 
     async def subscribe(self, wallet: str):
         wallet = wallet.lower()
-        self._subscription_times[wallet] = time.time()
-        if self.connected:
-            await self._send_subscriptions(wallet, subscribe=True)
+        self._subscription_times[wallet] = self.clock.time()
+        for conn in self._connections:
+            if conn.connected:
+                await self._send_subscriptions(conn, wallet, subscribe=True)
 
     async def unsubscribe(self, wallet: str):
         wallet = wallet.lower()
         self._subscription_times.pop(wallet, None)
-        if self.connected:
-            await self._send_subscriptions(wallet, subscribe=False)
+        for conn in self._connections:
+            if conn.connected:
+                await self._send_subscriptions(conn, wallet, subscribe=False)
+
+    async def refresh(self, wallet: str):
+        # Re-evaluates needs_ledger for a subscribed wallet, e.g. after its
+        # transfer notifications were toggled.
+        wallet = wallet.lower()
+        for conn in self._connections:
+            # The market key needs no prior subscribe to be turned on.
+            current = conn.wallet_subscriptions.get(wallet, [] if wallet == MARKET else None)
+            if current is None or not conn.connected:
+                continue
+            wanted = conn.wallet_subscriptions[wallet] = self._subscriptions_for(conn, wallet)
+            await self._send(conn, wallet, [t for t in current if t not in wanted], subscribe=False)
+            await self._send(conn, wallet, [t for t in wanted if t not in current], subscribe=True)
+
+    async def refresh_market(self):
+        # Re-evaluates needs_mids, e.g. after the first alert was set or the
+        # last one removed.
+        await self.refresh(MARKET)
+
+    def _subscriptions_for(self, conn: WSConnection, wallet: str) -> list[str]:
+        if wallet == MARKET:
+            wanted = self.on_mids and (self.needs_mids is None or self.needs_mids())
+            return ["allMids"] if wanted else []
+        if self.subscription_mode != "events" or conn.events_wallet not in (None, wallet):
+            return list(self.subscription_types)
+        conn.events_wallet = wallet
+        types = ["userEvents"]
+        for sub_type in self.subscription_types:
+            if sub_type in EVENTS_REPLACES:
+                continue
+            if sub_type == "userNonFundingLedgerUpdates" and self.needs_ledger and not self.needs_ledger(wallet):
+                continue
+            types.append(sub_type)
+        return types
 
-    async def _send_subscriptions(self, wallet: str, subscribe: bool):
+    async def _send_subscriptions(self, conn: WSConnection, wallet: str, subscribe: bool):
+        if subscribe:
+            conn.wallet_subscriptions[wallet] = self._subscriptions_for(conn, wallet)
+            # Confirmed or in-flight subscriptions are left to the ack/retry
+            # bookkeeping instead of being sent again.
+            types = [
+                sub_type
+                for sub_type in conn.wallet_subscriptions[wallet]
+                if (wallet, sub_type) not in conn.acked and (wallet, sub_type) not in conn.pending
+            ]
+        else:
+            types = conn.wallet_subscriptions.pop(wallet, self.subscription_types)
+            if wallet == conn.events_wallet:
+                conn.events_wallet = None
+        await self._send(conn, wallet, types, subscribe)
+
+    async def _send(self, conn: WSConnection, wallet: str, types: list[str], subscribe: bool):
         method = "subscribe" if subscribe else "unsubscribe"
-        for sub_type in SUBSCRIPTION_TYPES:
-            msg = {
-                "method": method,
-                "subscription": {"type": sub_type, "user": wallet},
-            }
+        now = self.clock.time()
+        for sub_type in types:
+            key = (wallet, sub_type)
+            if subscribe:
+                attempts = conn.pending[key][0] if key in conn.pending else 0
+                conn.pending[key] = (attempts + 1, now)
+            else:
+                conn.pending.pop(key, None)
+                conn.acked.discard(key)
+            subscription = {"type": sub_type, "user": wallet} if wallet else {"type": sub_type}
+            msg = {"method": method, "subscription": subscription}
             try:
-                await self._ws.send(json.dumps(msg))
+                await conn.ws.send(json.dumps(msg))
             except Exception as e:
                 logger.error(f"Failed to {method} {sub_type} for {wallet}: {e}")
 
-    async def _resubscribe_all(self):
+    async def _resubscribe_all(self, conn: WSConnection):
         wallets = set(storage.get_wallets().keys())
-        sub_time = time.time()
+        sub_time = self.clock.time()
+        # While another connection is live its subscriptions already define
+        # what counts as new; resetting them would drop its in-flight events.
+        others_live = any(c.connected for c in self._connections if c is not conn)
+        # A new socket starts with no server-side subscriptions.
+        conn.events_wallet = None
+        conn.wallet_subscriptions.clear()
+        conn.acked.clear()
+        conn.pending.clear()
         for wallet in wallets:
-            self._subscription_times[wallet] = sub_time
-            await self._send_subscriptions(wallet, subscribe=True)
-        logger.info(f"Resubscribed to {len(wallets)} wallets")
+            if not others_live or wallet not in self._subscription_times:
+                self._subscription_times[wallet] = sub_time
+            await self._send_subscriptions(conn, wallet, subscribe=True)
+        if self.on_mids:
+            await self._send_subscriptions(conn, MARKET, subscribe=True)
+        logger.info(f"Resubscribed {conn.name} to {len(wallets)} wallets")
+
+    def _handle_ack(self, conn: WSConnection, data: dict):
+        subscription = data.get("subscription") or {}
+        key = ((subscription.get("user") or "").lower(), subscription.get("type"))
+        if data.get("method") == "unsubscribe":
+            conn.acked.discard(key)
+            return
+        # Late acks for a subscription we no longer want are ignored.
+        if key[1] in conn.wallet_subscriptions.get(key[0], ()):
+            conn.pending.pop(key, None)
+            conn.acked.add(key)
 
     def _should_notify(self, wallet: str, event: dict) -> bool:
         sub_time = self._subscription_times.get(wallet)
@@ -96,30 +451,65 @@ class WSManager:
             event_time = event_time_ms / 1000
             return event_time > sub_time
 
-        return time.time() - sub_time > 3
+        return self.clock.time() - sub_time > 3
 
-    async def _run_loop(self):
-        backoff = 1
-        while self._running:
-            try:
-                async with websockets.connect(HL_WS_URL) as ws:
-                    self._ws = ws
-                    backoff = 1
-                    logger.info("WebSocket connected")
-                    await self._resubscribe_all()
-                    async for raw in ws:
-                        await self._handle_message(raw)
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"WebSocket error: {e}")
-                self._ws = None
-                if self._running:
-                    logger.info(f"Reconnecting in {backoff}s...")
-                    await asyncio.sleep(backoff)
-                    backoff = min(backoff * 2, 60)
+    def _is_duplicate(self, conn: WSConnection, wallet: str, event_type: str, data: dict) -> bool:
+        if self.connection_count == 1:
+            return False
+        key = event_key(wallet, event_type, data)
+        if key is None:
+            return False
+        now = self.clock.time()
+        first_seen = self._seen.get(key)
+        if first_seen is not None:
+            lag = now - first_seen
+            conn.duplicates += 1
+            conn.lag_total += lag
+            conn.lag_max = max(conn.lag_max, lag)
+            self.suppressed += 1
+            return True
+        self._seen[key] = now
+        if len(self._seen) > DEDUPE_LIMIT:
+            self._seen.popitem(last=False)
+        conn.first += 1
+        self.events += 1
+        return False
 
-    async def _handle_message(self, raw: str):
+    @staticmethod
+    def _remember(tids: OrderedDict, wallet: str, tid):
+        if tid is None:
+            return
+        tids[(wallet, tid)] = None
+        if len(tids) > TWAP_TID_LIMIT:
+            tids.popitem(last=False)
+
+    async def _handle_fills(self, conn: WSConnection, wallet: str, fills: list[dict], urgent: bool = False):
+        if urgent and len(fills) > 1:
+            fills = sorted(fills, key=lambda fill: not fill.get("liquidation"))
+        for fill in fills:
+            if not self._should_notify(wallet, fill):
+                continue
+            if self._is_duplicate(conn, wallet, "fills", fill):
+                continue
+            if self.on_twap_fill and not fill.get("liquidation"):
+                tid = fill.get("tid")
+                if tid is not None and (wallet, tid) in self._twap_tids:
+                    continue
+                if fill.get("twapId") is not None:
+                    self._remember(self._twap_tids, wallet, tid)
+                    await self.on_twap_fill(wallet, fill["twapId"], fill, False)
+                    continue
+                self._remember(self._fill_tids, wallet, tid)
+            if fill.get("liquidation"):
+                await self.on_event(wallet, "liquidations", fill)
+            elif self.on_fill:
+                await self.on_fill(wallet, fill)
+            else:
+                await self.on_event(wallet, "fills", fill)
+
+    async def _handle_message(self, raw: str, conn: WSConnection | None = None):
+        conn = conn or self._connections[0]
+        urgent = LIQUIDATION_MARKER in raw
         try:
             msg = json.loads(raw)
         except json.JSONDecodeError:
@@ -130,28 +520,76 @@ class WSManager:
         if not channel or not data:
             return
 
-        if channel == "userFills":
-            wallet = data.get("user", "").lower()
-            for fill in data.get("fills", []):
-                if not self._should_notify(wallet, fill):
-                    continue
-                if fill.get("liquidation"):
-                    await self.on_event(wallet, "liquidations", fill)
-                elif self.on_fill:
-                    await self.on_fill(wallet, fill)
-                else:
-                    await self.on_event(wallet, "fills", fill)
+        if channel == "subscriptionResponse":
+            if isinstance(data, dict):
+                self._handle_ack(conn, data)
+
+        elif channel == "error":
+            subscription = already_subscribed(data)
+            if subscription is not None:
+                self._handle_ack(conn, {"method": "subscribe", "subscription": subscription})
+            else:
+                # Rejected subscriptions stay pending and are retried with backoff.
+                logger.warning(f"{conn.name} server error: {data}")
+
+        elif channel == "allMids":
+            if self.on_mids:
+                await self.on_mids(data.get("mids") or {})
+
+        elif channel == "userFills":
+            await self._handle_fills(conn, data.get("user", "").lower(), data.get("fills", []), urgent)
 
         elif channel == "userFundings":
             wallet = data.get("user", "").lower()
             for funding in data.get("fundings", []):
                 if not self._should_notify(wallet, funding):
                     continue
+                if self._is_duplicate(conn, wallet, "funding", funding):
+                    continue
                 await self.on_event(wallet, "funding", funding)
 
+        elif channel == "user":
+            # userEvents: one kind of event per frame. Liquidations of the
+            # wallet also arrive as fills with a liquidation field, and
+            # nonUserCancel is not something we notify about.
+            wallet = (data.get("user") or conn.events_wallet or "").lower()
+            if "fills" in data:
+                await self._handle_fills(conn, wallet, data["fills"], urgent)
+            elif "funding" in data:
+                funding = data["funding"]
+                if self._should_notify(wallet, funding) and not self._is_duplicate(conn, wallet, "funding", funding):
+                    await self.on_event(wallet, "funding", funding)
+
         elif channel == "userNonFundingLedgerUpdates":
             wallet = data.get("user", "").lower()
             for update in data.get("nonFundingLedgerUpdates", []):
                 if not self._should_notify(wallet, update):
                     continue
+                if self._is_duplicate(conn, wallet, "transfers", update):
+                    continue
                 await self.on_event(wallet, "transfers", update)
+
+        elif channel == "userTwapSliceFills" and self.on_twap_fill:
+            wallet = data.get("user", "").lower()
+            for slice_fill in data.get("twapSliceFills", []):
+                fill = slice_fill.get("fill") or {}
+                if not self._should_notify(wallet, fill):
+                    continue
+                tid = fill.get("tid")
+                if tid is not None and (wallet, tid) in self._twap_tids:
+                    continue
+                self._remember(self._twap_tids, wallet, tid)
+                seen = tid is not None and (wallet, tid) in self._fill_tids
+                await self.on_twap_fill(wallet, slice_fill.get("twapId"), fill, seen)
+
+        elif channel == "userTwapHistory" and self.on_twap_update:
+            wallet = data.get("user", "").lower()
+            snapshot = bool(data.get("isSnapshot"))
+            for entry in data.get("history", []):
+                await self.on_twap_update(wallet, entry, snapshot)
+
+        elif channel == "orderUpdates" and self.on_order_update:
+            # Order updates carry no user field; oids are unique across
+            # Hyperliquid, so they are handled by oid alone.
+            for update in data if isinstance(data, list) else [data]:
+                await self.on_order_update(update)